@@ -1,11 +1,25 @@
+from django import forms
 from django.contrib import admin
 from .models import Role, BusinessElement, AccessRule
+from .hierarchy import would_cycle
+
+class RoleAdminForm(forms.ModelForm):
+    class Meta:
+        model = Role
+        fields = "__all__"
+
+    def clean_inherits(self):
+        value = self.cleaned_data["inherits"]
+        if self.instance.pk is not None and would_cycle(self.instance.pk, [r.pk for r in value]):
+            raise forms.ValidationError("Role inheritance cannot contain cycles.")
+        return value
 
 @admin.register(Role)
 class RoleAdmin(admin.ModelAdmin):
+    form = RoleAdminForm
     list_display = ("id", "name")
     search_fields = ("name",)
-    filter_horizontal = ("users",)
+    filter_horizontal = ("users", "inherits")
 
 @admin.register(BusinessElement)
 class BusinessElementAdmin(admin.ModelAdmin):
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AccesscontrolConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accesscontrol'
+
+    def ready(self):
+        from .signals import connect
+        connect()
@@ -0,0 +1,249 @@
+"""
+RBAC change feed.
+
+Each change to Role, BusinessElement, AccessRule, role membership (Role.users) or role
+inheritance (Role.inherits) appends an RBACChange row. The row is written in the same
+transaction as the change. Its id is the feed version. Gateways, sidecars and other
+services that cache permissions remember the last version they applied. They ask for
+what came after it (GET /api/rbac/changes/?since=<version>, or the SSE stream) instead
+of downloading /api/rbac/rules/ again.
+
+    kind        op             data
+    role        upsert/delete  {"id", "name"}   (deleting a role also drops its rules,
+                                                 memberships and inheritance edges)
+    element     upsert/delete  same fields as /api/rbac/elements/
+    rule        upsert/delete  same fields as /api/rbac/rules/
+    membership  add/remove     {"roles": [...], "users": [...]}    applies to every pair
+    inherits    add/remove     {"roles": [...], "parents": [...]}  applies to every pair
+    reset       reset          {"reason"}  resync from scratch
+
+Applying a change twice is harmless. To bootstrap, read the current version, download
+the full lists, then apply everything after that version. A `reset` means the change
+history is not usable from that point. It is written by bulk loads that bypass the
+signals, and it replaces history removed by prune(). Consumers that hit one start over.
+
+Writers hold the lock on the "rbac" CacheVersion row while they append, so versions
+become visible in increasing order. A consumer therefore never skips a row whose
+transaction commits late.
+"""
+from __future__ import annotations
+import os
+import time
+import threading
+from datetime import timedelta
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+from asgiref.sync import sync_to_async
+from django.db import router, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from authn.coherency import RBAC
+from .models import RBACChange, AccessRule
+import logging
+log = logging.getLogger("accesscontrol.changes")
+
+RBAC_FEED_RETENTION_DAYS = int(os.getenv("RBAC_FEED_RETENTION_DAYS", "30"))
+RBAC_FEED_POLL_SECONDS = float(os.getenv("RBAC_FEED_POLL_SECONDS", "1"))
+RBAC_FEED_MAX_WAITERS = int(os.getenv("RBAC_FEED_MAX_WAITERS", "16"))  # long-polls + streams per worker
+HEARTBEAT_SECONDS = 15.0
+FIELDS = ("id", "kind", "op", "object_id", "data", "created_at")
+
+RULE_FLAGS = tuple(f.name for f in AccessRule._meta.fields if f.name.endswith("_permission"))
+
+
+def role_data(role) -> Dict[str, Any]:
+    return {"id": role.pk, "name": role.name}
+
+
+def element_data(element) -> Dict[str, Any]:
+    return {"id": element.pk, "slug": element.slug, "name": element.name, "description": element.description}
+
+
+def rule_data(rule) -> Dict[str, Any]:
+    data = {"id": rule.pk, "role": rule.role_id, "element": rule.element_id}
+    data.update((f, getattr(rule, f)) for f in RULE_FLAGS)
+    return data
+
+
+# --- writing --------------------------------------------------------------------
+
+def append(rows: List[RBACChange], using: Optional[str] = None) -> None:
+    if not rows:
+        return
+    from authn.models import CacheVersion
+
+    db = using or router.db_for_write(RBACChange)
+    with transaction.atomic(using=db, savepoint=False):
+        # held until commit: ids are handed out and committed in the same order
+        list(CacheVersion.objects.using(db).select_for_update().filter(namespace=RBAC).values_list("pk"))
+        RBACChange.objects.using(db).bulk_create(rows)
+    transaction.on_commit(_notify, using=db)
+
+
+def record(kind: str, op: str, object_id: Optional[int] = None, data: Optional[Dict[str, Any]] = None,
+           using: Optional[str] = None) -> None:
+    append([RBACChange(kind=kind, op=op, object_id=object_id, data=data or {})], using=using)
+
+
+def record_memberships(op: str, pairs: Iterable[Tuple[int, int]], using: Optional[str] = None) -> None:
+    """(role_id, user_id) pairs, one change per role; for callers that bypass m2m_changed."""
+    by_role: Dict[int, List[int]] = {}
+    for role_id, user_id in pairs:
+        by_role.setdefault(role_id, []).append(user_id)
+    append([RBACChange(kind="membership", op=op, object_id=rid, data={"roles": [rid], "users": sorted(set(uids))})
+            for rid, uids in by_role.items()], using=using)
+
+
+def record_reset(reason: str, using: Optional[str] = None) -> None:
+    record("reset", "reset", data={"reason": reason}, using=using)
+
+
+def prune(days: int = RBAC_FEED_RETENTION_DAYS) -> int:
+    """
+    Drop changes older than `days`. The newest of them becomes a `reset` marker, so
+    consumers that fall behind the retained history start over.
+    """
+    boundary = (RBACChange.objects.filter(created_at__lt=timezone.now() - timedelta(days=days))
+                .order_by("-id").values_list("id", flat=True).first())
+    if boundary is None:
+        return 0
+    with transaction.atomic():
+        deleted, _ = RBACChange.objects.filter(id__lt=boundary).delete()
+        RBACChange.objects.filter(id=boundary).update(kind="reset", op="reset", object_id=None, data={"reason": "pruned"})
+    log.info("rbac.changes.pruned rows=%s boundary=%s", deleted, boundary)
+    return deleted
+
+
+# --- reading --------------------------------------------------------------------
+
+def latest_version() -> int:
+    return RBACChange.objects.aggregate(v=Max("id"))["v"] or 0
+
+
+def as_dict(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {"version": row["id"], "kind": row["kind"], "op": row["op"],
+            "object": row["object_id"], "data": row["data"], "at": row["created_at"]}
+
+
+def changes_since(since: int, limit: int) -> Tuple[List[Dict[str, Any]], bool]:
+    """Up to `limit` changes after version `since`, oldest first, and whether more follow."""
+    rows = list(RBACChange.objects.filter(id__gt=since).order_by("id").values(*FIELDS)[:limit + 1])
+    return [as_dict(r) for r in rows[:limit]], len(rows) > limit
+
+
+# --- waiting --------------------------------------------------------------------
+# Waiters in a worker share one `latest_version()` query per poll interval. Commits in
+# this worker wake them at once; commits elsewhere are seen on the next poll.
+
+_cond = threading.Condition()
+_waiters = 0
+_seen: Tuple[float, int] = (0.0, 0)  # (monotonic time of the query, version)
+
+
+def _notify() -> None:
+    global _seen
+    with _cond:
+        _seen = (0.0, _seen[1])
+        _cond.notify_all()
+
+
+def _latest() -> int:
+    global _seen
+    checked, version = _seen
+    now = time.monotonic()
+    if now - checked >= RBAC_FEED_POLL_SECONDS:
+        version = latest_version()
+        _seen = (now, version)
+    return version
+
+
+def claim() -> bool:
+    """Reserve one of RBAC_FEED_MAX_WAITERS slots; each waiter pins a worker thread."""
+    global _waiters
+    with _cond:
+        if _waiters >= RBAC_FEED_MAX_WAITERS:
+            return False
+        _waiters += 1
+        return True
+
+
+def release() -> None:
+    global _waiters
+    with _cond:
+        _waiters -= 1
+
+
+def wait(since: int, timeout: float) -> bool:
+    """Block up to `timeout` seconds until a version after `since` exists (caller holds a slot)."""
+    deadline = time.monotonic() + timeout
+    while _latest() <= since:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        with _cond:
+            _cond.wait(min(remaining, RBAC_FEED_POLL_SECONDS))
+    return True
+
+
+class EventStream:
+    """
+    Server-Sent Events body: one `change` event per row (id: version), comments as
+    keepalives. It ends after `seconds`, and the client reconnects with Last-Event-ID.
+    Holds a claim()ed slot until the response is closed.
+    """
+
+    def __init__(self, since: int, seconds: float, page: int = 500):
+        self._iter = self._events(since, seconds, page)
+        self._open = True
+
+    def __iter__(self) -> Iterator[str]:
+        return self._iter
+
+    def close(self) -> None:
+        self._iter.close()
+        if self._open:
+            self._open = False
+            release()
+
+    @staticmethod
+    def _events(since: int, seconds: float, page: int) -> Iterator[str]:
+        from core.rendering import dumps  # DRF serializers stay out of app loading
+
+        yield f"retry: {int(RBAC_FEED_POLL_SECONDS * 1000)}\n\n"
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            batch, more = changes_since(since, page)
+            for change in batch:
+                yield f"id: {change['version']}\nevent: change\ndata: {dumps(change).decode()}\n\n"
+                since = change["version"]
+            if more:
+                continue
+            if not wait(since, min(HEARTBEAT_SECONDS, max(0.0, deadline - time.monotonic()))):
+                yield ": keepalive\n\n"
+
+
+class AsyncEventStream:
+    """
+    EventStream for ASGI. Given a sync iterator, Django's ASGI handler drains it with
+    list() before sending anything, which would hold every event until the stream ends.
+    This steps the same generator one event at a time in the request's own thread
+    (thread-sensitive sync_to_async), so blocking waits stay off the event loop.
+    """
+
+    def __init__(self, stream: EventStream):
+        self._stream = stream
+
+    def __aiter__(self) -> AsyncIterator[str]:
+        return self._events()
+
+    def close(self) -> None:
+        self._stream.close()
+
+    async def _events(self) -> AsyncIterator[str]:
+        step = sync_to_async(next)
+        events = iter(self._stream)
+        while True:
+            event = await step(events, None)
+            if event is None:
+                return
+            yield event
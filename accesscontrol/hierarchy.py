@@ -0,0 +1,67 @@
+"""
+Role inheritance closure maintenance.
+
+RoleClosure holds (role, included, depth) for every role reachable through
+Role.inherits, plus the (role, role, 0) self row. Only the roles whose reachable set
+can have changed (the current holders of the touched roles) are recomputed.
+"""
+from __future__ import annotations
+from collections import defaultdict
+from typing import Dict, Iterable, List, Set
+from django.db import transaction
+
+from .models import Role, RoleClosure
+
+
+def included_ids(role_id: int) -> Set[int]:
+    return set(RoleClosure.objects.filter(role_id=role_id).values_list("included_id", flat=True))
+
+
+def holder_ids(role_ids: Iterable[int]) -> Set[int]:
+    """Roles that currently include any of `role_ids` (themselves included)."""
+    ids = set(role_ids)
+    return ids | set(RoleClosure.objects.filter(included_id__in=ids).values_list("role_id", flat=True))
+
+
+def would_cycle(role_id: int, parent_ids: Iterable[int]) -> bool:
+    """True if making `role_id` inherit any of `parent_ids` closes a loop."""
+    parents = set(parent_ids)
+    if role_id in parents:
+        return True
+    return RoleClosure.objects.filter(role_id__in=parents, included_id=role_id).exists()
+
+
+def _edges() -> Dict[int, List[int]]:
+    edges: Dict[int, List[int]] = defaultdict(list)
+    for src, dst in Role.inherits.through.objects.values_list("from_role_id", "to_role_id"):
+        edges[src].append(dst)
+    return edges
+
+
+def rebuild(role_ids: Iterable[int]) -> int:
+    """Recompute the closure rows of `role_ids` (BFS over inherits); returns rows written."""
+    role_ids = set(Role.objects.filter(id__in=set(role_ids)).values_list("id", flat=True))
+    if not role_ids:
+        return 0
+    edges = _edges()
+    rows: List[RoleClosure] = []
+    for rid in role_ids:
+        depth = {rid: 0}
+        frontier = [rid]
+        while frontier:
+            nxt = []
+            for node in frontier:
+                for child in edges.get(node, ()):
+                    if child not in depth:
+                        depth[child] = depth[node] + 1
+                        nxt.append(child)
+            frontier = nxt
+        rows.extend(RoleClosure(role_id=rid, included_id=inc, depth=d) for inc, d in depth.items())
+    with transaction.atomic():
+        RoleClosure.objects.filter(role_id__in=role_ids).delete()
+        RoleClosure.objects.bulk_create(rows)
+    return len(rows)
+
+
+def rebuild_all() -> int:
+    return rebuild(Role.objects.values_list("id", flat=True))
@@ -0,0 +1,26 @@
+from __future__ import annotations
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from accesscontrol.snapshot import compile_snapshot
+
+
+class Command(BaseCommand):
+    help = "Compile roles/elements/rules/memberships into the mmap-able RBAC snapshot file."
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default=None, help="Output file (default: settings.RBAC_SNAPSHOT_PATH).")
+
+    def handle(self, *args, **options):
+        path = options.get("path") or settings.RBAC_SNAPSHOT_PATH
+        if not path:
+            raise CommandError("No output path: pass --path or set RBAC_SNAPSHOT_PATH")
+        t0 = time.perf_counter()
+        stats = compile_snapshot(path)
+        self.stdout.write(self.style.SUCCESS(
+            f"RBAC snapshot v{stats['version']} written to {path} in {time.perf_counter() - t0:.2f}s: "
+            f"{stats['elements']} elements, {stats['roles']} roles, {stats['users']} users, "
+            f"{stats['links']} memberships, {stats['bytes']} bytes"
+        ))
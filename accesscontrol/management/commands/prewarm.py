@@ -0,0 +1,14 @@
+from __future__ import annotations
+import json
+from django.core.management.base import BaseCommand
+
+from core.warmup import warmup
+
+
+class Command(BaseCommand):
+    help = "Run the worker warmup (DB, hashers, DRF, permissions, URLs, one GET per endpoint) and report timings."
+
+    def handle(self, *args, **options):
+        report = warmup()
+        self.stdout.write(json.dumps(report, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Warmup finished in {report['total_ms']} ms"))
@@ -0,0 +1,17 @@
+from __future__ import annotations
+from django.core.management.base import BaseCommand
+
+from accesscontrol.changes import prune, RBAC_FEED_RETENTION_DAYS
+
+
+class Command(BaseCommand):
+    help = "Drop RBAC change feed rows older than the retention window (run from cron)."
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=RBAC_FEED_RETENTION_DAYS,
+                            help="Keep this many days of changes (default: RBAC_FEED_RETENTION_DAYS).")
+
+    def handle(self, *args, **options):
+        deleted = prune(options["days"])
+        self.stdout.write(self.style.SUCCESS(f"RBAC change feed: {deleted} rows older than {options['days']} days pruned"))
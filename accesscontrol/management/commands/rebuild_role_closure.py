@@ -0,0 +1,15 @@
+from __future__ import annotations
+from django.core.management.base import BaseCommand
+
+from accesscontrol.hierarchy import rebuild_all
+from authn.coherency import bump, RBAC
+
+
+class Command(BaseCommand):
+    help = "Recompute the role inheritance closure table from Role.inherits."
+    requires_system_checks = []
+
+    def handle(self, *args, **options):
+        rows = rebuild_all()
+        bump(RBAC)
+        self.stdout.write(self.style.SUCCESS(f"Role closure rebuilt: {rows} rows"))
@@ -1,10 +1,19 @@
 from __future__ import annotations
-from typing import Dict, Any, Iterable, List, Tuple
+import random
+import secrets
+import time
+import uuid
+from datetime import timedelta
+from typing import Dict, Any, Iterable, Iterator, List, Tuple
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 from django.db import transaction
+from django.utils import timezone
 
+from accesscontrol import hierarchy
 from accesscontrol.models import Role, BusinessElement, AccessRule
+from accesscontrol.changes import record_reset
 
 User = get_user_model()
 
@@ -103,14 +112,133 @@ def ensure_user(email: str, password: str, first_name: str) -> User:
     return u
 
 
+# --- Scale mode (synthetic load-test data) ---
+
+LOAD_PREFIX = "load"
+LOAD_PASSWORD = "Passw0rd!"
+ACTIONS = ("read", "read_all", "create", "update", "update_all", "delete", "delete_all")
+
+
+def _chunks(seq: List[Any], size: int) -> Iterator[List[Any]]:
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+
+def _rate(count: int, started: float) -> str:
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    return f"{count} rows in {elapsed:.2f}s ({count / elapsed:,.0f}/s)"
+
+
+def _rule_kwargs(flags: Dict[str, bool]) -> Dict[str, bool]:
+    return {f"{a}_permission": bool(flags.get(a, False)) for a in ACTIONS}
+
+
+def bulk_users(n: int, *, chunk: int, password_hash: str) -> List[int]:
+    """Insert n synthetic users (one shared password hash) and return their ids."""
+    emails = [f"{LOAD_PREFIX}-{i:07d}@load.test" for i in range(n)]
+    for part in _chunks(emails, chunk):
+        User.objects.bulk_create(
+            [User(email=e, first_name="Load", last_name=e.split("@")[0], password=password_hash) for e in part],
+            batch_size=chunk,
+            ignore_conflicts=True,
+        )
+    # ignore_conflicts leaves pks unset on some backends: read them back
+    ids: List[int] = []
+    for part in _chunks(emails, chunk):
+        ids.extend(User.objects.filter(email__in=part).values_list("id", flat=True))
+    return ids
+
+
+def bulk_elements(n: int, *, chunk: int) -> List[BusinessElement]:
+    slugs = [f"{LOAD_PREFIX}-el-{i:04d}" for i in range(n)]
+    BusinessElement.objects.bulk_create(
+        [BusinessElement(slug=s, name=s.replace("-", " ").title()) for s in slugs],
+        batch_size=chunk,
+        ignore_conflicts=True,
+    )
+    return list(BusinessElement.objects.filter(slug__in=slugs).order_by("id"))
+
+
+def bulk_roles(n: int, *, chunk: int) -> List[Role]:
+    names = [f"{LOAD_PREFIX}-role-{i:03d}" for i in range(n)]
+    Role.objects.bulk_create([Role(name=nm) for nm in names], batch_size=chunk, ignore_conflicts=True)
+    roles = list(Role.objects.filter(name__in=names).order_by("id"))
+    # bulk_create skips the post_save that adds the (role, role, 0) closure row
+    hierarchy.rebuild(r.id for r in roles)
+    return roles
+
+
+def bulk_rules(roles: List[Role], elements: List[BusinessElement], *, chunk: int, rnd: random.Random) -> int:
+    """Give every synthetic role random flags on a random subset of elements."""
+    rows: List[AccessRule] = []
+    if not elements:
+        return 0
+    for role in roles:
+        k = rnd.randint(1, max(1, len(elements) // 4))
+        for el in rnd.sample(elements, k):
+            flags = {a: rnd.random() < 0.5 for a in ACTIONS}
+            rows.append(AccessRule(role=role, element=el, **_rule_kwargs(flags)))
+    AccessRule.objects.bulk_create(rows, batch_size=chunk, ignore_conflicts=True)
+    return len(rows)
+
+
+def bulk_memberships(user_ids: List[int], roles: List[Role], *, chunk: int, rnd: random.Random, max_roles: int) -> int:
+    """Insert Role.users rows directly into the through table."""
+    Through = Role.users.through
+    total = 0
+    batch: List[Any] = []
+    for uid in user_ids:
+        for role in rnd.sample(roles, rnd.randint(1, min(max_roles, len(roles)))):
+            batch.append(Through(role_id=role.id, user_id=uid))
+        if len(batch) >= chunk:
+            Through.objects.bulk_create(batch, batch_size=chunk, ignore_conflicts=True)
+            total += len(batch)
+            batch = []
+    if batch:
+        Through.objects.bulk_create(batch, batch_size=chunk, ignore_conflicts=True)
+        total += len(batch)
+    return total
+
+
+def bulk_refresh_tokens(user_ids: List[int], per_user: int, *, chunk: int) -> int:
+    from authn.models import RefreshToken
+    from authn.services import _hash_token, REFRESH_TOKEN_BYTES, REFRESH_TOKEN_DAYS
+
+    expires_at = timezone.now() + timedelta(days=REFRESH_TOKEN_DAYS)
+    total = 0
+    batch: List[RefreshToken] = []
+    for uid in user_ids:
+        family = uuid.uuid4()
+        for _ in range(per_user):
+            raw = secrets.token_urlsafe(REFRESH_TOKEN_BYTES)
+            batch.append(RefreshToken(user_id=uid, token_hash=_hash_token(raw), expires_at=expires_at, family=family))
+        if len(batch) >= chunk:
+            RefreshToken.objects.bulk_create(batch, batch_size=chunk)
+            total += len(batch)
+            batch = []
+    if batch:
+        RefreshToken.objects.bulk_create(batch, batch_size=chunk)
+        total += len(batch)
+    return total
+
+
 class Command(BaseCommand):
     help = "Seed roles/elements/rules (idempotent). Optional demo users and mock items."
+    requires_system_checks = []  # DB-only: system checks would import the URLconf, every view and DRF
 
     def add_arguments(self, parser):
         parser.add_argument("--with-users", action="store_true", help="Create demo users and assign roles.")
         parser.add_argument("--with-items", action="store_true", help="Create mock items for each user (if supported).")
         parser.add_argument("--admin-email", default=None, help="Ensure a superuser with this email.")
         parser.add_argument("--admin-password", default=None, help="Password for the ensured superuser (non-interactive).")
+        # scale mode
+        parser.add_argument("--users", type=int, default=0, help="Scale mode: number of synthetic users to bulk-insert.")
+        parser.add_argument("--elements", type=int, default=0, help="Scale mode: number of synthetic business elements.")
+        parser.add_argument("--roles", type=int, default=0, help="Scale mode: number of synthetic roles (random rules per role).")
+        parser.add_argument("--roles-per-user", type=int, default=2, help="Scale mode: max synthetic roles assigned per user.")
+        parser.add_argument("--tokens-per-user", type=int, default=0, help="Scale mode: refresh tokens per synthetic user.")
+        parser.add_argument("--chunk-size", type=int, default=5000, help="Scale mode: rows per bulk_create batch.")
+        parser.add_argument("--seed", type=int, default=0, help="Scale mode: RNG seed for reproducible datasets.")
 
     @transaction.atomic
     def handle(self, *args, **options):
@@ -184,4 +312,47 @@ class Command(BaseCommand):
             except Exception as e:
                 self.stdout.write(self.style.WARNING(f"Mock items seeding skipped: {e}"))
 
+        if any(options.get(k) for k in ("users", "elements", "roles")):
+            self._seed_scale(options)
+
         self.stdout.write(self.style.SUCCESS("Seed complete."))
+
+    def _seed_scale(self, options: Dict[str, Any]) -> None:
+        chunk = max(1, options["chunk_size"])
+        rnd = random.Random(options["seed"])
+        self.stdout.write(self.style.MIGRATE_HEADING("Seeding scale dataset…"))
+        t_all = time.perf_counter()
+
+        t0 = time.perf_counter()
+        elements = bulk_elements(options["elements"], chunk=chunk)
+        self.stdout.write(self.style.SUCCESS(f"Elements: {_rate(len(elements), t0)}"))
+
+        t0 = time.perf_counter()
+        roles = bulk_roles(options["roles"], chunk=chunk)
+        self.stdout.write(self.style.SUCCESS(f"Roles: {_rate(len(roles), t0)}"))
+
+        t0 = time.perf_counter()
+        n_rules = bulk_rules(roles, elements, chunk=chunk, rnd=rnd)
+        self.stdout.write(self.style.SUCCESS(f"Rules: {_rate(n_rules, t0)}"))
+
+        user_ids: List[int] = []
+        if options["users"]:
+            t0 = time.perf_counter()
+            # hash once; every synthetic user shares it (bcrypt per row would dominate)
+            password_hash = make_password(LOAD_PASSWORD)
+            user_ids = bulk_users(options["users"], chunk=chunk, password_hash=password_hash)
+            self.stdout.write(self.style.SUCCESS(f"Users: {_rate(len(user_ids), t0)} (password: {LOAD_PASSWORD})"))
+
+        if user_ids and roles:
+            t0 = time.perf_counter()
+            n = bulk_memberships(user_ids, roles, chunk=chunk, rnd=rnd, max_roles=max(1, options["roles_per_user"]))
+            self.stdout.write(self.style.SUCCESS(f"Role memberships: {_rate(n, t0)}"))
+
+        if user_ids and options["tokens_per_user"]:
+            t0 = time.perf_counter()
+            n = bulk_refresh_tokens(user_ids, options["tokens_per_user"], chunk=chunk)
+            self.stdout.write(self.style.SUCCESS(f"Refresh tokens: {_rate(n, t0)}"))
+
+        # bulk_create skipped the feed signals: tell feed consumers to resync
+        record_reset("seed_demo")
+        self.stdout.write(self.style.SUCCESS(f"Scale dataset done in {time.perf_counter() - t_all:.2f}s"))
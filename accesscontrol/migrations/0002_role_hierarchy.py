@@ -0,0 +1,42 @@
+# Generated by Django 5.1.2 on 2026-10-19 11:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def seed_self_rows(apps, schema_editor):
+    Role = apps.get_model("accesscontrol", "Role")
+    RoleClosure = apps.get_model("accesscontrol", "RoleClosure")
+    RoleClosure.objects.bulk_create(
+        [RoleClosure(role_id=pk, included_id=pk, depth=0) for pk in Role.objects.values_list("id", flat=True)],
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accesscontrol', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='role',
+            name='inherits',
+            field=models.ManyToManyField(blank=True, related_name='inherited_by', to='accesscontrol.role'),
+        ),
+        migrations.CreateModel(
+            name='RoleClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveSmallIntegerField(default=0)),
+                ('included', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='included_in', to='accesscontrol.role')),
+                ('role', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='closure', to='accesscontrol.role')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['included', 'role'], name='accesscontr_include_22b061_idx')],
+                'unique_together': {('role', 'included')},
+            },
+        ),
+        migrations.RunPython(seed_self_rows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.2 on 2026-10-19 12:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accesscontrol', '0002_role_hierarchy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RBACChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('role', 'role'), ('element', 'element'), ('rule', 'rule'), ('membership', 'membership'), ('inherits', 'inherits'), ('reset', 'reset')], max_length=16)),
+                ('op', models.CharField(choices=[('upsert', 'upsert'), ('delete', 'delete'), ('add', 'add'), ('remove', 'remove'), ('reset', 'reset')], max_length=8)),
+                ('object_id', models.BigIntegerField(blank=True, null=True)),
+                ('data', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
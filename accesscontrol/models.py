@@ -8,11 +8,33 @@ class Role(models.Model):
     users = models.ManyToManyField(
         settings.AUTH_USER_MODEL, related_name="roles", blank=True
     )
+    # "manager inherits user": every rule of the inherited role applies to this one
+    inherits = models.ManyToManyField(
+        "self", symmetrical=False, related_name="inherited_by", blank=True
+    )
 
     def __str__(self) -> str:
         return self.name
 
 
+class RoleClosure(models.Model):
+    """
+    Materialized transitive closure of Role.inherits, including (role, role, 0).
+    A user's effective rules are the rules of every `included` role of their roles.
+    Maintained by accesscontrol.hierarchy; never edit by hand.
+    """
+    role = models.ForeignKey(Role, on_delete=models.CASCADE, related_name="closure")
+    included = models.ForeignKey(Role, on_delete=models.CASCADE, related_name="included_in")
+    depth = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        unique_together = (("role", "included"),)
+        indexes = [models.Index(fields=["included", "role"])]
+
+    def __str__(self) -> str:
+        return f"{self.role_id}->{self.included_id}@{self.depth}"
+
+
 class BusinessElement(models.Model):
     slug = models.SlugField(max_length=64, unique=True)  # e.g., "users", "items"
     name = models.CharField(max_length=128)
@@ -39,3 +61,22 @@ class AccessRule(models.Model):
 
     def __str__(self) -> str:
         return f"{self.role}:{self.element}"
+
+
+class RBACChange(models.Model):
+    """
+    Append-only log of RBAC mutations; `id` is the feed version (see accesscontrol.changes).
+    Written by signals in the same transaction as the change itself.
+    """
+    KINDS = ("role", "element", "rule", "membership", "inherits", "reset")
+    OPS = ("upsert", "delete", "add", "remove", "reset")
+
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=16, choices=[(k, k) for k in KINDS])
+    op = models.CharField(max_length=8, choices=[(o, o) for o in OPS])
+    object_id = models.BigIntegerField(null=True, blank=True)
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self) -> str:
+        return f"{self.id}:{self.kind}.{self.op}({self.object_id})"
@@ -1,11 +1,21 @@
 from __future__ import annotations
+import os
 from rest_framework.permissions import BasePermission
 
+INTROSPECTION_ROLE = os.getenv("INTROSPECTION_ROLE", "introspector")
+
+def has_role(user, name: str) -> bool:
+    """Direct or inherited (through Role.inherits) role membership."""
+    from .models import Role
+    if not user or not getattr(user, "pk", None):
+        return False
+    return Role.objects.filter(name__iexact=name, included_in__role__users=user).exists()
+
 class IsAdminRole(BasePermission):
     """
     Admin if:
     - is_superuser OR
-    - has role with name 'admin'
+    - has role with name 'admin' (directly or inherited)
     """
     def has_permission(self, request, view):
         u = getattr(request, "user", None)
@@ -13,6 +23,15 @@ class IsAdminRole(BasePermission):
             return False
         if getattr(u, "is_superuser", False):
             return True
-        # hasattr guard for anonymous None
-        roles = getattr(u, "roles", None)
-        return bool(roles and roles.filter(name__iexact="admin").exists())
+        return has_role(u, "admin")
+
+class CanIntrospect(IsAdminRole):
+    """
+    Token introspection (sidecars / internal services):
+    - anything IsAdminRole allows OR
+    - has role INTROSPECTION_ROLE (default 'introspector')
+    """
+    def has_permission(self, request, view):
+        if super().has_permission(request, view):
+            return True
+        return has_role(getattr(request, "user", None), INTROSPECTION_ROLE)
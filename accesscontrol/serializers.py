@@ -1,11 +1,17 @@
 from __future__ import annotations
 from rest_framework import serializers
 from .models import Role, BusinessElement, AccessRule
+from .hierarchy import would_cycle
 
 class RoleSerializer(serializers.ModelSerializer):
     class Meta:
         model = Role
-        fields = ("id", "name", "users")
+        fields = ("id", "name", "users", "inherits")
+
+    def validate_inherits(self, value):
+        if self.instance is not None and would_cycle(self.instance.pk, [r.pk for r in value]):
+            raise serializers.ValidationError("Role inheritance cannot contain cycles.")
+        return value
 
 class BusinessElementSerializer(serializers.ModelSerializer):
     class Meta:
@@ -1,47 +1,122 @@
 from __future__ import annotations
-from typing import Optional
-from django.db.models import Q
+import os
+import hashlib
+from typing import Dict, Optional, Tuple
 from django.contrib.auth import get_user_model
-from .models import AccessRule
+from audit import services as audit
+from authn.coherency import LocalCache, RBAC
+from core.metrics import metrics, OTHER_ELEMENT
+from .models import AccessRule, BusinessElement
+from .changes import latest_version
+from .snapshot import current_snapshot, decide, rule_mask, RULE_FIELDS, ACTION_BITS
 import logging
 log = logging.getLogger("accesscontrol.services")
 User = get_user_model()
 
+# (user_id, element_slug) -> flags OR-ed over the user's roles; cleared on any RBAC change
+_masks = LocalCache(
+    RBAC,
+    maxsize=int(os.getenv("PERMISSION_CACHE_SIZE", "50000")),
+    ttl=float(os.getenv("PERMISSION_CACHE_SECONDS", "60")),
+)
+
+def element_mask(user_id: int, element_slug: str) -> int:
+    # one query per key in flight after an RBAC change; concurrent checks share it (authn.coherency)
+    return _masks.get_or_load((int(user_id), element_slug), lambda: _load_mask(user_id, element_slug))
+
+def _load_mask(user_id: int, element_slug: str) -> int:
+    mask = 0
+    # any role that grants is enough (direct or inherited via RoleClosure: one join)
+    for flags in AccessRule.objects.filter(
+        role__included_in__role__users__id=user_id, element__slug=element_slug
+    ).values_list(*RULE_FIELDS):
+        mask |= rule_mask(flags)
+    return mask
+
+# live change feed version; dropped on every RBAC change, so a snapshot goes stale with it
+_feed_version = LocalCache(RBAC, maxsize=1, ttl=60.0)
+
+def fresh_snapshot():
+    """The compiled snapshot, unless RBAC changed since it was compiled (then the DB answers)."""
+    snap = current_snapshot()
+    if snap is None or snap.version < _feed_version.get_or_load("v", latest_version):
+        return None
+    return snap
+
+_matrices = LocalCache(RBAC, maxsize=int(os.getenv("PERMISSION_CACHE_SIZE", "50000")), ttl=60.0)
+
+def user_masks(user) -> Dict[str, int]:
+    """slug -> flags merged over all the user's roles (one query, or the snapshot)."""
+    if getattr(user, "is_superuser", False):
+        full = sum(ACTION_BITS.values())
+        return {slug: full for slug in BusinessElement.objects.values_list("slug", flat=True)}
+    snap = fresh_snapshot()
+    if snap is not None:
+        masks = snap.masks_for_user(user.id)
+        if masks is not None:
+            return masks
+    masks: Dict[str, int] = {}
+    for row in AccessRule.objects.filter(role__included_in__role__users__id=user.id).values_list("element__slug", *RULE_FIELDS):
+        masks[row[0]] = masks.get(row[0], 0) | rule_mask(tuple(row[1:]))
+    return {slug: m for slug, m in masks.items() if m}
+
+def permission_matrix(user) -> Tuple[str, Dict[str, dict]]:
+    """
+    (etag, {slug: {"create": bool, "read"|"update"|"delete": {"own": bool, "all": bool}}})
+    The etag changes whenever the user's effective permissions change.
+    """
+    key = (int(user.id), bool(getattr(user, "is_superuser", False)))
+    return _matrices.get_or_load(key, lambda: _compile_matrix(user, key[1]))
+
+def _compile_matrix(user, is_superuser: bool) -> Tuple[str, Dict[str, dict]]:
+    masks = user_masks(user)
+    matrix: Dict[str, dict] = {}
+    for slug in sorted(masks):
+        m = masks[slug]
+        entry: dict = {"create": bool(m & ACTION_BITS["create"])}
+        for action in ("read", "update", "delete"):
+            entry[action] = {"own": bool(m & ACTION_BITS[action]), "all": bool(m & ACTION_BITS[f"{action}_all"])}
+        matrix[slug] = entry
+    digest = hashlib.sha1(repr((is_superuser, sorted(masks.items()))).encode("utf-8")).hexdigest()[:20]
+    return (f'"perm-{digest}"', matrix)
+
+# known slugs for metric labels: caller-supplied slugs (forward-auth) must not claim metric slots
+_element_slugs = LocalCache(RBAC, maxsize=1, ttl=60.0)
+
+def _metric_element(element_slug: str) -> str:
+    known = _element_slugs.get_or_load(
+        "slugs", lambda: frozenset(BusinessElement.objects.values_list("slug", flat=True)))
+    return element_slug if element_slug in known else OTHER_ELEMENT
+
 # action in {"read","create","update","delete"}
-def has_permission(user: Optional[User], element_slug: str, action: str, owner_id: Optional[int] = None) -> bool:
+def has_permission(user: Optional[User], element_slug: str, action: str, owner_id: Optional[int] = None,
+                   *, probe: bool = False) -> bool:
+    """
+    probe=True: the caller falls back to a narrower check when this one fails (read_all
+    before own-scope read), so a denial here is not a decision and is neither audited nor counted.
+    """
+    allowed = _has_permission(user, element_slug, action, owner_id)
+    if probe and not allowed:
+        return False
+    metrics.inc("rbac_checks_total")
+    if not allowed:
+        metrics.deny(_metric_element(element_slug))
+    audit.record_permission(getattr(user, "id", None), element_slug, action, allowed)
+    return allowed
+
+def _has_permission(user: Optional[User], element_slug: str, action: str, owner_id: Optional[int] = None) -> bool:
     if not user or not getattr(user, "is_active", False):
         log.debug("perm.deny unauth element=%s action=%s", element_slug, action)
         return False
     if getattr(user, "is_superuser", False):
         return True
 
-    # aggregate rules across user roles
-    qs = AccessRule.objects.filter(
-        role__in=user.roles.all(),
-        element__slug=element_slug,
-    ).distinct()
-
-    if not qs.exists():
-        return False
+    # precompiled snapshot (if configured and current); users and elements newer than it fall through to the DB
+    snap = fresh_snapshot()
+    if snap is not None:
+        verdict = snap.check(user.id, element_slug, action, owner_id)
+        if verdict is not None:
+            return verdict
 
-    # any role that grants is enough
-    for rule in qs:
-        if action == "read":
-            if rule.read_all_permission:
-                return True
-            if rule.read_permission and owner_id and int(owner_id) == int(user.id):
-                return True
-        elif action == "create":
-            if rule.create_permission:
-                return True
-        elif action == "update":
-            if rule.update_all_permission:
-                return True
-            if rule.update_permission and owner_id and int(owner_id) == int(user.id):
-                return True
-        elif action == "delete":
-            if rule.delete_all_permission:
-                return True
-            if rule.delete_permission and owner_id and int(owner_id) == int(user.id):
-                return True
-    return False
+    is_owner = bool(owner_id) and int(owner_id) == int(user.id)
+    return decide(element_mask(user.id, element_slug), action, is_owner)
@@ -0,0 +1,94 @@
+from __future__ import annotations
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
+
+from .models import Role, RoleClosure, BusinessElement, AccessRule
+from . import hierarchy, changes
+
+_pending_holders: dict = {}
+
+
+def _role_saved(sender, instance, created=False, **kwargs):
+    if created:
+        RoleClosure.objects.get_or_create(role=instance, included=instance, defaults={"depth": 0})
+
+
+def _role_deleting(sender, instance, **kwargs):
+    # roles that reached other roles *through* this one must be recomputed afterwards
+    _pending_holders[instance.pk] = hierarchy.holder_ids([instance.pk]) - {instance.pk}
+
+
+def _role_deleted(sender, instance, **kwargs):
+    holders = _pending_holders.pop(instance.pk, set())
+    if holders:
+        hierarchy.rebuild(holders)
+
+
+def _inherits_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # cycles are rejected by RoleSerializer / RoleAdminForm; rebuild() tolerates them anyway
+    if action in ("post_add", "post_remove", "post_clear"):
+        # closure is still the old one here, so holders cover removed paths too
+        hierarchy.rebuild(hierarchy.holder_ids({instance.pk} | set(pk_set or ())))
+
+
+# --- change feed (accesscontrol.changes) --------------------------------------------
+
+_FEED = {Role: ("role", changes.role_data), BusinessElement: ("element", changes.element_data),
+         AccessRule: ("rule", changes.rule_data)}
+_pending_clears: dict = {}
+
+
+def _feed_saved(sender, instance, using=None, **kwargs):
+    kind, data = _FEED[sender]
+    changes.record(kind, "upsert", instance.pk, data(instance), using=using)
+
+
+def _feed_deleted(sender, instance, using=None, **kwargs):
+    kind, data = _FEED[sender]
+    changes.record(kind, "delete", instance.pk, data(instance), using=using)
+
+
+def _m2m_feed(kind: str, target: str, source_col: str, target_col: str):
+    """m2m_changed receiver recording (roles x targets) pairs; clear() is recorded as remove."""
+    def receiver(sender, instance, action, reverse, pk_set, using=None, **kwargs):
+        if action == "pre_clear":
+            col, other = (target_col, source_col) if reverse else (source_col, target_col)
+            _pending_clears[(kind, instance.pk)] = set(
+                sender.objects.using(using).filter(**{col: instance.pk}).values_list(other, flat=True))
+            return
+        if action == "post_clear":
+            pk_set, op = _pending_clears.pop((kind, instance.pk), None), "remove"
+        elif action in ("post_add", "post_remove"):
+            op = "add" if action == "post_add" else "remove"
+        else:
+            return
+        if not pk_set:
+            return
+        ids = sorted(pk_set)
+        roles, targets = (ids, [instance.pk]) if reverse else ([instance.pk], ids)
+        changes.record(kind, op, roles[0] if len(roles) == 1 else None,
+                       {"roles": roles, target: targets}, using=using)
+    return receiver
+
+
+_membership_feed = _m2m_feed("membership", "users", "role_id", "user_id")
+_inherits_feed = _m2m_feed("inherits", "parents", "from_role_id", "to_role_id")
+
+
+def _user_deleting(sender, instance, using=None, **kwargs):
+    # the through rows go with the user without an m2m_changed signal
+    role_ids = Role.users.through.objects.using(using).filter(user_id=instance.pk).values_list("role_id", flat=True)
+    changes.record_memberships("remove", ((rid, instance.pk) for rid in role_ids), using=using)
+
+
+def connect() -> None:
+    post_save.connect(_role_saved, sender=Role, dispatch_uid="hierarchy.role.save")
+    pre_delete.connect(_role_deleting, sender=Role, dispatch_uid="hierarchy.role.pre_delete")
+    post_delete.connect(_role_deleted, sender=Role, dispatch_uid="hierarchy.role.delete")
+    m2m_changed.connect(_inherits_changed, sender=Role.inherits.through, dispatch_uid="hierarchy.inherits")
+    for model in _FEED:
+        post_save.connect(_feed_saved, sender=model, dispatch_uid=f"changes.{model.__name__}.save")
+        post_delete.connect(_feed_deleted, sender=model, dispatch_uid=f"changes.{model.__name__}.delete")
+    m2m_changed.connect(_membership_feed, sender=Role.users.through, dispatch_uid="changes.role_users")
+    m2m_changed.connect(_inherits_feed, sender=Role.inherits.through, dispatch_uid="changes.role_inherits")
+    pre_delete.connect(_user_deleting, sender=get_user_model(), dispatch_uid="changes.user.delete")
@@ -0,0 +1,264 @@
+"""
+Precompiled RBAC snapshot.
+
+`compile_snapshot()` flattens Role / BusinessElement / AccessRule / Role.users into
+one binary file; workers mmap it read-only and answer has_permission() from it,
+so every process on the host shares the same pages instead of its own copy.
+
+`version` is the RBAC change feed version (accesscontrol.changes) the snapshot was
+compiled at. Once the live feed has moved past it, services ignores the file and
+answers from the DB until the snapshot is compiled again.
+
+Layout (native byte order, marked by the magic):
+    header   : magic(4s) fmt(H) reserved(H) version(Q) n_elements(I) n_roles(I) n_users(I) n_links(I)
+    user_ids : Q * n_users          sorted ascending
+    starts   : I * (n_users + 1)    CSR offsets into `links`
+    links    : I * n_links          role indexes per user
+    masks    : B * (n_roles * n_elements)   ACTION_BITS per (role, element)
+    slugs    : (H len + utf-8 bytes) * n_elements
+"""
+from __future__ import annotations
+import os
+import sys
+import mmap
+import time
+import struct
+import tempfile
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Dict, Optional, Tuple
+from django.conf import settings
+import logging
+log = logging.getLogger("accesscontrol.snapshot")
+
+MAGIC = b"RBAC" if sys.byteorder == "little" else b"CABR"
+FORMAT = 2  # 2: version is the change feed version (was a timestamp)
+HEADER = struct.Struct("=4sHHQIIII")
+
+# flag bits per (role, element); OR-ed across a user's roles
+ACTION_BITS: Dict[str, int] = {
+    "read": 1,
+    "read_all": 2,
+    "create": 4,
+    "update": 8,
+    "update_all": 16,
+    "delete": 32,
+    "delete_all": 64,
+}
+RULE_FIELDS: Tuple[str, ...] = tuple(f"{name}_permission" for name in ACTION_BITS)
+
+
+def rule_mask(flags) -> int:
+    """Pack one AccessRule (or a values() dict / tuple of RULE_FIELDS) into a bitmask."""
+    if isinstance(flags, dict):
+        values = (flags[f] for f in RULE_FIELDS)
+    elif isinstance(flags, tuple):
+        values = flags
+    else:
+        values = (getattr(flags, f) for f in RULE_FIELDS)
+    mask = 0
+    for bit, on in zip(ACTION_BITS.values(), values):
+        if on:
+            mask |= bit
+    return mask
+
+
+def decide(mask: int, action: str, is_owner: bool) -> bool:
+    """Same semantics as services.has_permission: *_all grants, own flag needs ownership."""
+    if action == "create":
+        return bool(mask & ACTION_BITS["create"])
+    if action not in ("read", "update", "delete"):
+        return False
+    if mask & ACTION_BITS[f"{action}_all"]:
+        return True
+    return bool(is_owner and mask & ACTION_BITS[action])
+
+
+def compile_snapshot(path: str, version: Optional[int] = None) -> Dict[str, int]:
+    """Build the snapshot from the DB and atomically replace `path`."""
+    from django.contrib.auth import get_user_model
+    from .changes import latest_version
+    from .models import Role, BusinessElement, AccessRule, RoleClosure
+
+    User = get_user_model()
+    # read before the data: a change that lands while compiling makes the file stale, never wrong
+    version = latest_version() if version is None else version
+
+    slugs = list(BusinessElement.objects.order_by("id").values_list("id", "slug"))
+    el_index = {pk: i for i, (pk, _) in enumerate(slugs)}
+    role_ids = list(Role.objects.order_by("id").values_list("id", flat=True))
+    role_index = {pk: i for i, pk in enumerate(role_ids)}
+
+    n_el = len(slugs)
+    masks = bytearray(len(role_ids) * n_el)
+    for rule in AccessRule.objects.values_list("role_id", "element_id", *RULE_FIELDS).iterator(chunk_size=5000):
+        masks[role_index[rule[0]] * n_el + el_index[rule[1]]] |= rule_mask(tuple(rule[2:]))
+
+    # role -> every role it includes (itself + inherited), from the closure table
+    includes: Dict[int, set] = {}
+    for rid, inc in RoleClosure.objects.values_list("role_id", "included_id").iterator(chunk_size=20000):
+        includes.setdefault(rid, set()).add(role_index[inc])
+
+    # CSR: all users (so "no roles" is answered from the file too), effective roles per user
+    user_ids = array("Q", User.objects.order_by("id").values_list("id", flat=True).iterator(chunk_size=20000))
+    per_user: Dict[int, set] = {}
+    for uid, rid in Role.users.through.objects.values_list("user_id", "role_id").iterator(chunk_size=20000):
+        per_user.setdefault(uid, set()).update(includes.get(rid, (role_index[rid],)))
+    starts = array("I", [0])
+    links = array("I")
+    for uid in user_ids:
+        links.extend(sorted(per_user.get(uid, ())))
+        starts.append(len(links))
+
+    slug_blob = bytearray()
+    for _, slug in slugs:
+        raw = slug.encode("utf-8")
+        slug_blob += struct.pack("=H", len(raw)) + raw
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=".rbac-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(HEADER.pack(MAGIC, FORMAT, 0, version, n_el, len(role_ids), len(user_ids), len(links)))
+            fh.write(user_ids.tobytes())
+            fh.write(starts.tobytes())
+            fh.write(links.tobytes())
+            fh.write(bytes(masks))
+            fh.write(bytes(slug_blob))
+        os.replace(tmp, path)  # readers keep their old mapping until they swap
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return {
+        "version": version,
+        "elements": n_el,
+        "roles": len(role_ids),
+        "users": len(user_ids),
+        "links": len(links),
+        "bytes": HEADER.size + len(user_ids) * 8 + len(starts) * 4 + len(links) * 4 + len(masks) + len(slug_blob),
+    }
+
+
+class RBACSnapshot:
+    """Read-only view over a compiled snapshot file."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as fh:
+            self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, fmt, _, version, n_el, n_roles, n_users, n_links = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or fmt != FORMAT:
+            raise ValueError(f"not an RBAC snapshot (magic={magic!r}, format={fmt})")
+        self.path = path
+        self.version = version
+        self.n_elements = n_el
+        self.n_roles = n_roles
+
+        view = memoryview(self._mm)
+        off = HEADER.size
+        self._user_ids = view[off:off + 8 * n_users].cast("Q"); off += 8 * n_users
+        self._starts = view[off:off + 4 * (n_users + 1)].cast("I"); off += 4 * (n_users + 1)
+        self._links = view[off:off + 4 * n_links].cast("I"); off += 4 * n_links
+        self._masks = view[off:off + n_roles * n_el]; off += n_roles * n_el
+
+        # interned slug -> element index (the only per-process structure)
+        self.elements: Dict[str, int] = {}
+        for i in range(n_el):
+            (ln,) = struct.unpack_from("=H", self._mm, off)
+            self.elements[sys.intern(bytes(self._mm[off + 2:off + 2 + ln]).decode("utf-8"))] = i
+            off += 2 + ln
+
+    def _user_pos(self, user_id: int) -> Optional[int]:
+        ids = self._user_ids
+        pos = bisect_left(ids, user_id)
+        if pos < len(ids) and ids[pos] == user_id:
+            return pos
+        return None
+
+    def mask_for(self, user_id: int, element_slug: str) -> Optional[int]:
+        """Merged flags of all the user's roles on the element; None if the user or element is not in the snapshot."""
+        ei = self.elements.get(element_slug)
+        if ei is None:
+            return None
+        pos = self._user_pos(int(user_id))
+        if pos is None:
+            return None
+        n_el, masks = self.n_elements, self._masks
+        mask = 0
+        for r in self._links[self._starts[pos]:self._starts[pos + 1]]:
+            mask |= masks[r * n_el + ei]
+        return mask
+
+    def masks_for_user(self, user_id: int) -> Optional[Dict[str, int]]:
+        """slug -> merged flags for every element the user has any flag on; None if unknown user."""
+        pos = self._user_pos(int(user_id))
+        if pos is None:
+            return None
+        n_el, masks = self.n_elements, self._masks
+        roles = self._links[self._starts[pos]:self._starts[pos + 1]]
+        out: Dict[str, int] = {}
+        for slug, ei in self.elements.items():
+            mask = 0
+            for r in roles:
+                mask |= masks[r * n_el + ei]
+            if mask:
+                out[slug] = mask
+        return out
+
+    def check(self, user_id: int, element_slug: str, action: str, owner_id: Optional[int] = None) -> Optional[bool]:
+        mask = self.mask_for(user_id, element_slug)
+        if mask is None:
+            return None
+        is_owner = bool(owner_id) and int(owner_id) == int(user_id)
+        return decide(mask, action, is_owner)
+
+
+_lock = threading.Lock()
+_current: Optional[RBACSnapshot] = None
+_stat_key: Optional[Tuple[int, int]] = None
+_checked_at = float("-inf")
+
+
+def current_snapshot() -> Optional[RBACSnapshot]:
+    """
+    Snapshot configured by settings.RBAC_SNAPSHOT_PATH, or None.
+    The file is re-stat'ed at most every RBAC_SNAPSHOT_CHECK_SECONDS and swapped in
+    when a newer version has been written.
+    """
+    global _current, _stat_key, _checked_at
+    path = getattr(settings, "RBAC_SNAPSHOT_PATH", "")
+    if not path:
+        return None
+    now = time.monotonic()
+    if now - _checked_at < getattr(settings, "RBAC_SNAPSHOT_CHECK_SECONDS", 2.0):
+        return _current
+    with _lock:
+        if now - _checked_at < getattr(settings, "RBAC_SNAPSHOT_CHECK_SECONDS", 2.0):
+            return _current
+        _checked_at = now
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return _current
+        key = (st.st_ino, st.st_mtime_ns)
+        if key == _stat_key:
+            return _current
+        try:
+            snap = RBACSnapshot(path)
+        except (OSError, ValueError, struct.error) as e:
+            log.warning("rbac.snapshot.load_failed path=%s err=%s", path, e)
+            return _current
+        _stat_key = key
+        if _current is None or snap.version >= _current.version:  # same version: recompiled for new users
+            log.info("rbac.snapshot.swap version=%s path=%s", snap.version, path)
+            _current = snap
+        return _current
+
+
+def reset_snapshot() -> None:
+    """Forget the loaded snapshot (next call re-reads the file)."""
+    global _current, _stat_key, _checked_at
+    with _lock:
+        _current, _stat_key, _checked_at = None, None, float("-inf")
@@ -1,3 +1,208 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from authn.coherency import invalidate_local, RBAC
+from .admin import RoleAdminForm
+from .models import Role, RoleClosure, BusinessElement, AccessRule, RBACChange
+from .serializers import RoleSerializer
+from .services import has_permission, user_masks, fresh_snapshot
+from .snapshot import compile_snapshot, reset_snapshot
+from . import changes, hierarchy
+
+User = get_user_model()
+
+
+def closure(role):
+    return dict(RoleClosure.objects.filter(role=role).values_list("included__name", "depth"))
+
+
+class RoleClosureTests(TestCase):
+    def setUp(self):
+        invalidate_local([RBAC])  # TestCase never runs the on_commit invalidation
+        self.guest, self.user, self.manager = (Role.objects.create(name=n) for n in ("guest", "user", "manager"))
+        self.items = BusinessElement.objects.create(slug="items", name="Items")
+        AccessRule.objects.create(role=self.guest, element=self.items, read_permission=True)
+        self.alice = User.objects.create_user(email="alice@example.com", password="x")
+        self.manager.users.add(self.alice)
+
+    def test_self_row_on_create(self):
+        self.assertEqual(closure(self.guest), {"guest": 0})
+
+    def test_inherits_is_transitive(self):
+        self.manager.inherits.add(self.user)
+        self.user.inherits.add(self.guest)
+        self.assertEqual(closure(self.manager), {"manager": 0, "user": 1, "guest": 2})
+        self.assertTrue(has_permission(self.alice, "items", "read", owner_id=self.alice.id))
+
+    def test_remove_and_clear_shrink_closure(self):
+        self.manager.inherits.add(self.user)
+        self.user.inherits.add(self.guest)
+        self.user.inherits.remove(self.guest)
+        self.assertEqual(closure(self.manager), {"manager": 0, "user": 1})
+        self.user.inherits.add(self.guest)
+        self.guest.inherited_by.clear()
+        self.assertEqual(closure(self.manager), {"manager": 0, "user": 1})
+        invalidate_local([RBAC])
+        self.assertFalse(has_permission(self.alice, "items", "read", owner_id=self.alice.id))
+
+    def test_deleting_a_middle_role_rebuilds_holders(self):
+        self.manager.inherits.add(self.user)
+        self.user.inherits.add(self.guest)
+        self.user.delete()
+        self.assertEqual(closure(self.manager), {"manager": 0})
+
+    def test_rebuild_all_matches_incremental(self):
+        self.manager.inherits.add(self.user)
+        self.user.inherits.add(self.guest)
+        before = set(RoleClosure.objects.values_list("role_id", "included_id", "depth"))
+        RoleClosure.objects.all().delete()
+        hierarchy.rebuild_all()
+        self.assertEqual(set(RoleClosure.objects.values_list("role_id", "included_id", "depth")), before)
+
+    def test_serializer_rejects_cycles(self):
+        self.manager.inherits.add(self.user)
+        s = RoleSerializer(self.user, data={"name": "user", "users": [], "inherits": [self.manager.pk]})
+        self.assertFalse(s.is_valid())
+        self.assertIn("inherits", s.errors)
+
+    def test_admin_form_rejects_cycles(self):
+        self.manager.inherits.add(self.user)
+        form = RoleAdminForm(instance=self.user, data={"name": "user", "users": [], "inherits": [self.manager.pk]})
+        self.assertFalse(form.is_valid())
+        self.assertIn("inherits", form.errors)
+
+
+class SeedScaleTests(TestCase):
+    def test_scale_users_get_their_role_rules(self):
+        call_command("seed_demo", users=20, elements=5, roles=3, seed=1, stdout=StringIO())
+        invalidate_local([RBAC])
+        roles = Role.objects.filter(name__startswith="load-role-")
+        self.assertEqual(RoleClosure.objects.filter(role__in=roles, depth=0).count(), roles.count())
+
+        rule = AccessRule.objects.filter(role__in=roles, create_permission=True).select_related("element").first()
+        self.assertIsNotNone(rule)
+        member = rule.role.users.first()
+        self.assertIsNotNone(member)
+        self.assertIn(rule.element.slug, user_masks(member))
+        self.assertTrue(has_permission(member, rule.element.slug, "create"))
+
+
+class ChangeFeedTests(TestCase):
+    def setUp(self):
+        invalidate_local([RBAC])
+        self.start = changes.latest_version()
+        self.alice = User.objects.create_user(email="alice@example.com", password="x")
+        self.bob = User.objects.create_user(email="bob@example.com", password="x")
+
+    def feed(self):
+        rows, more = changes.changes_since(self.start, 1000)
+        self.assertFalse(more)
+        return [(c["kind"], c["op"], c["data"]) for c in rows]
+
+    def test_changes_come_in_write_order(self):
+        role = Role.objects.create(name="editor")
+        element = BusinessElement.objects.create(slug="docs", name="Docs")
+        AccessRule.objects.create(role=role, element=element, read_permission=True)
+        role.users.add(self.alice)
+        rows, _ = changes.changes_since(self.start, 1000)
+        self.assertEqual([(c["kind"], c["op"]) for c in rows],
+                         [("role", "upsert"), ("element", "upsert"), ("rule", "upsert"), ("membership", "add")])
+        versions = [c["version"] for c in rows]
+        self.assertEqual(versions, sorted(set(versions)))
+        self.assertEqual(changes.latest_version(), versions[-1])
+
+    def test_since_pages_without_gaps(self):
+        for n in range(5):
+            Role.objects.create(name=f"r{n}")
+        seen, since = [], self.start
+        while True:
+            rows, more = changes.changes_since(since, 2)
+            self.assertLessEqual(len(rows), 2)
+            seen += [c["data"]["name"] for c in rows]
+            if not more:
+                break
+            since = rows[-1]["version"]
+        self.assertEqual(seen, [f"r{n}" for n in range(5)])
+
+    def test_clear_is_recorded_as_remove(self):
+        role = Role.objects.create(name="editor")
+        role.users.add(self.alice, self.bob)
+        parent = Role.objects.create(name="viewer")
+        role.inherits.add(parent)
+        self.start = changes.latest_version()
+        role.users.clear()
+        parent.inherited_by.clear()
+        self.assertEqual(self.feed(), [
+            ("membership", "remove", {"roles": [role.pk], "users": sorted([self.alice.pk, self.bob.pk])}),
+            ("inherits", "remove", {"roles": [role.pk], "parents": [parent.pk]}),
+        ])
+
+    def test_clearing_nothing_records_nothing(self):
+        Role.objects.create(name="editor").users.clear()
+        self.start = changes.latest_version()
+        Role.objects.get(name="editor").users.clear()
+        self.assertEqual(self.feed(), [])
+
+    def test_api_pages_and_rejects_future_versions(self):
+        for n in range(3):
+            Role.objects.create(name=f"r{n}")
+        client = APIClient()
+        client.force_authenticate(User.objects.create_superuser(email="root@example.com", password="x"))
+        body = client.get("/api/rbac/changes/", {"since": self.start, "limit": 2}).json()
+        self.assertTrue(body["more"])
+        self.assertEqual(body["version"], body["changes"][-1]["version"])
+        rest = client.get("/api/rbac/changes/", {"since": body["version"]}).json()
+        self.assertFalse(rest["more"])
+        self.assertEqual([c["data"]["name"] for c in body["changes"] + rest["changes"]], ["r0", "r1", "r2"])
+        self.assertEqual(client.get("/api/rbac/changes/", {"since": rest["version"] + 1}).status_code, 410)
+        self.assertEqual(RBACChange.objects.filter(id__gt=self.start).count(), 3)
+
+
+class SnapshotTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        self.path = os.path.join(tmp, "rbac.bin")
+        override = override_settings(RBAC_SNAPSHOT_PATH=self.path)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(reset_snapshot)
+
+        self.editor = Role.objects.create(name="editor")
+        self.items = BusinessElement.objects.create(slug="items", name="Items")
+        AccessRule.objects.create(role=self.editor, element=self.items, read_all_permission=True)
+        self.alice = User.objects.create_user(email="alice@example.com", password="x")
+        self.editor.users.add(self.alice)
+        self.compile()
+
+    def compile(self):
+        compile_snapshot(self.path)
+        reset_snapshot()
+        invalidate_local([RBAC])
+
+    def test_fresh_snapshot_answers(self):
+        snap = fresh_snapshot()
+        self.assertIsNotNone(snap)
+        self.assertEqual(snap.version, changes.latest_version())
+        self.assertTrue(has_permission(self.alice, "items", "read"))
+
+    def test_rbac_change_after_compile_falls_back_to_db(self):
+        self.editor.users.remove(self.alice)
+        invalidate_local([RBAC])  # what the on_commit hook does outside TestCase
+        self.assertIsNone(fresh_snapshot())
+        self.assertFalse(has_permission(self.alice, "items", "read"))
+        self.compile()
+        self.assertIsNotNone(fresh_snapshot())
+        self.assertFalse(has_permission(self.alice, "items", "read"))
+
+    def test_unknown_element_is_not_a_denial(self):
+        snap = fresh_snapshot()
+        self.assertIsNone(snap.mask_for(self.alice.id, "docs"))
+        self.assertIsNone(snap.check(self.alice.id, "docs", "read"))
+        self.assertEqual(snap.mask_for(self.alice.id, "items") & 2, 2)
@@ -1,6 +1,9 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import RoleViewSet, BusinessElementViewSet, AccessRuleViewSet
+from .views import (
+    RoleViewSet, BusinessElementViewSet, AccessRuleViewSet, MyPermissionsView,
+    RBACChangesView, RBACChangeStreamView,
+)
 
 router = DefaultRouter()
 router.register("roles", RoleViewSet)
@@ -8,5 +11,8 @@ router.register("elements", BusinessElementViewSet)
 router.register("rules", AccessRuleViewSet)
 
 urlpatterns = [
+    path("me/permissions/", MyPermissionsView.as_view(), name="rbac-my-permissions"),
+    path("changes/", RBACChangesView.as_view(), name="rbac-changes"),
+    path("changes/stream/", RBACChangeStreamView.as_view(), name="rbac-changes-stream"),
     path("", include(router.urls)),
 ]
@@ -1,21 +1,148 @@
 from __future__ import annotations
-from rest_framework import viewsets
+import os
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework import viewsets, status
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from .models import Role, BusinessElement, AccessRule
 from .serializers import RoleSerializer, BusinessElementSerializer, AccessRuleSerializer
-from .permissions import IsAdminRole
+from .permissions import IsAdminRole, CanIntrospect
+from . import changes
+from .services import permission_matrix
+from authn.concurrency import concurrency_limited, WRITE_METHODS
 
+@concurrency_limited("rbac.write", methods=WRITE_METHODS)
 class RoleViewSet(viewsets.ModelViewSet):
     queryset = Role.objects.all().order_by("id")
     serializer_class = RoleSerializer
     permission_classes = [IsAdminRole]
 
+@concurrency_limited("rbac.write", methods=WRITE_METHODS)
 class BusinessElementViewSet(viewsets.ModelViewSet):
     queryset = BusinessElement.objects.all().order_by("id")
     serializer_class = BusinessElementSerializer
     permission_classes = [IsAdminRole]
 
+@concurrency_limited("rbac.write", methods=WRITE_METHODS)
 class AccessRuleViewSet(viewsets.ModelViewSet):
     queryset = AccessRule.objects.select_related("role", "element").all().order_by("id")
     serializer_class = AccessRuleSerializer
     permission_classes = [IsAdminRole]
+
+class MyPermissionsView(APIView):
+    """
+    GET /api/rbac/me/permissions/ -> the caller's merged permission matrix.
+    ETag-versioned: send If-None-Match to get 304 when nothing changed.
+    """
+    max_age = int(os.getenv("PERMISSIONS_MAX_AGE", "60"))
+
+    def get(self, request):
+        user = getattr(request, "user", None)
+        if not (user and getattr(user, "is_authenticated", False)):
+            return Response({"detail": "Unauthorized"}, status=status.HTTP_401_UNAUTHORIZED)
+        etag, matrix = permission_matrix(user)
+        if etag in [t.strip() for t in request.headers.get("If-None-Match", "").split(",")]:
+            resp = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            resp = Response({"version": etag.strip('"'), "superuser": bool(user.is_superuser), "elements": matrix})
+        resp["ETag"] = etag
+        resp["Cache-Control"] = f"private, max-age={self.max_age}"
+        resp["Vary"] = "Authorization"
+        return resp
+
+
+def _busy() -> Response:
+    resp = Response({"detail": "Too many open change feed waits, retry later."}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    resp["Retry-After"] = str(max(1, int(changes.RBAC_FEED_POLL_SECONDS)))
+    return resp
+
+
+def _version(value, name: str):
+    try:
+        v = int(value)
+    except (TypeError, ValueError):
+        return None, Response({"detail": f"{name} must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+    if v < 0:
+        return None, Response({"detail": f"{name} must be >= 0"}, status=status.HTTP_400_BAD_REQUEST)
+    latest = changes.latest_version()
+    if v > latest:
+        # the feed was reset (e.g. database restored): the consumer's state is unusable
+        return None, Response({"detail": "Unknown version, resync.", "version": latest}, status=status.HTTP_410_GONE)
+    return v, None
+
+
+class RBACChangesView(APIView):
+    """
+    GET /api/rbac/changes/ -> {"version": <latest>}  (starting point before a full download)
+    GET /api/rbac/changes/?since=<version>&limit=500&wait=<seconds>
+        -> {"version": <last returned>, "changes": [...], "more": bool}
+    `wait` long-polls (up to RBAC_FEED_MAX_WAIT) when nothing is newer than `since`.
+    Admins or the introspection role; see accesscontrol.changes for the change shapes.
+    """
+    permission_classes = [CanIntrospect]
+    max_limit = 1000
+    max_wait = float(os.getenv("RBAC_FEED_MAX_WAIT", "30"))
+
+    def get(self, request):
+        q = request.query_params
+        if "since" not in q:
+            return Response({"version": changes.latest_version()})
+        since, error = _version(q["since"], "since")
+        if error:
+            return error
+        try:
+            limit = max(1, min(int(q.get("limit", 500)), self.max_limit))
+            wait = max(0.0, min(float(q.get("wait", 0)), self.max_wait))
+        except ValueError:
+            return Response({"detail": "limit and wait must be numbers"}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows, more = changes.changes_since(since, limit)
+        if not rows and wait:
+            if not changes.claim():
+                return _busy()
+            try:
+                if changes.wait(since, wait):
+                    rows, more = changes.changes_since(since, limit)
+            finally:
+                changes.release()
+        resp = Response({"version": rows[-1]["version"] if rows else since, "changes": rows, "more": more})
+        resp["Cache-Control"] = "no-store"
+        return resp
+
+
+class EventStreamRenderer(JSONRenderer):
+    """Lets `Accept: text/event-stream` through negotiation; only error bodies are rendered (as JSON)."""
+    media_type = "text/event-stream"
+    format = "sse"
+
+
+class RBACChangeStreamView(APIView):
+    """
+    GET /api/rbac/changes/stream/?since=<version>  (or the Last-Event-ID header)
+    Server-Sent Events: `event: change` with `id: <version>` per change, `: keepalive`
+    comments in between. It closes after RBAC_FEED_STREAM_SECONDS, so access is checked
+    again when the client reconnects. Under ASGI the body is an async iterator, so events
+    are flushed as they happen there too.
+    """
+    permission_classes = [CanIntrospect]
+    renderer_classes = list(APIView.renderer_classes) + [EventStreamRenderer]
+    seconds = float(os.getenv("RBAC_FEED_STREAM_SECONDS", "300"))
+
+    def get(self, request):
+        raw = request.headers.get("Last-Event-ID") or request.query_params.get("since")
+        since, error = _version(raw if raw is not None else changes.latest_version(), "since")
+        if error:
+            return error
+        if not changes.claim():
+            return _busy()
+        stream = changes.EventStream(since, self.seconds)
+        if isinstance(request._request, ASGIRequest):
+            stream = changes.AsyncEventStream(stream)
+        resp = StreamingHttpResponse(stream, content_type="text/event-stream")
+        resp["Cache-Control"] = "no-store"
+        resp["X-Accel-Buffering"] = "no"  # nginx: pass events through unbuffered
+        return resp
+
@@ -1,8 +1,28 @@
 from django.contrib import admin
 from .models import User
+from .directory import prefix_filter
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
     list_display = ("id", "email", "first_name", "last_name", "is_active", "is_staff")
     search_fields = ("email", "first_name", "last_name")
     list_filter = ("is_active", "is_staff", "is_superuser")
+    actions = ("deactivate_users", "reactivate_users")
+
+    def get_search_results(self, request, queryset, search_term):
+        # "alice@ex*" is an email prefix: use the lower(email) index instead of icontains scans
+        if search_term.endswith("*"):
+            return prefix_filter(queryset, "email", search_term.rstrip("*")), False
+        return super().get_search_results(request, queryset, search_term)
+
+    @admin.action(description="Deactivate selected users and revoke their refresh tokens")
+    def deactivate_users(self, request, queryset):
+        from .bulk import set_active  # keeps csv/concurrent.futures out of admin autodiscovery
+        result = set_active(queryset.exclude(pk=request.user.pk), active=False)
+        self.message_user(request, f"{result['users']} deactivated, {result['tokens_revoked']} refresh tokens revoked.")
+
+    @admin.action(description="Reactivate selected users")
+    def reactivate_users(self, request, queryset):
+        from .bulk import set_active
+        result = set_active(queryset, active=True)
+        self.message_user(request, f"{result['users']} reactivated.")
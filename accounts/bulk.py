@@ -0,0 +1,222 @@
+"""
+Bulk user operations: streaming import/export (NDJSON or CSV) and set-based
+(de)activation.
+
+Import reads the input lazily, hashes passwords in a process pool (bcrypt is CPU-bound),
+inserts users with bulk_create per chunk and assigns roles with bulk inserts into the
+Role.users through table. Export walks the table with .iterator() and yields one line
+per user, so memory stays flat in both directions. `set_active` flips is_active for a
+whole selection with one UPDATE and revokes the selection's live refresh tokens with another.
+"""
+from __future__ import annotations
+import csv
+import io
+import json
+import logging
+from concurrent.futures import Executor
+from itertools import islice
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+User = get_user_model()
+log = logging.getLogger("accounts.bulk")
+
+FORMATS = ("ndjson", "csv")
+EXPORT_FIELDS = ("id", "email", "first_name", "last_name", "patronymic", "is_active", "created_at")
+IMPORT_FIELDS = ("email", "first_name", "last_name", "patronymic", "is_active")
+
+
+def _hash(password: Optional[str]) -> str:
+    # top-level so the process pool can pickle it; None -> unusable password
+    return make_password(password or None)
+
+
+def init_worker() -> None:
+    """Process-pool initializer for spawn-based platforms (fork inherits a configured Django)."""
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def _parse_bool(value: Any, default: bool = True) -> bool:
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes", "y", "t")
+
+
+def _parse_roles(value: Any) -> List[str]:
+    if not value:
+        return []
+    if isinstance(value, list):
+        return [str(v).strip() for v in value if str(v).strip()]
+    return [r.strip() for r in str(value).split("|") if r.strip()]
+
+
+def iter_records(fh: IO[str], fmt: str) -> Iterator[Optional[Dict[str, Any]]]:
+    if fmt == "ndjson":
+        for n, line in enumerate(fh, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                log.warning("import.bad_line line=%s", n)
+                yield None  # counted as invalid; one bad line must not abort a streaming import
+    elif fmt == "csv":
+        yield from csv.DictReader(fh)
+    else:
+        raise ValueError(f"unknown format {fmt!r}")
+
+
+def _chunks(it: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    it = iter(it)
+    while True:
+        part = list(islice(it, size))
+        if not part:
+            return
+        yield part
+
+
+def import_users(records: Iterable[Optional[Dict[str, Any]]], *, chunk_size: int = 2000,
+                 pool: Optional[Executor] = None, default_roles: Iterable[str] = ()) -> Dict[str, int]:
+    """
+    Create users that don't exist yet (matched by normalized email) and add roles.
+    Existing users are left untouched apart from role assignment.
+    """
+    from accesscontrol.models import Role
+    from accesscontrol.changes import record_memberships
+    from authn.coherency import bump, RBAC
+
+    role_ids = dict(Role.objects.values_list("name", "id"))
+    Through = Role.users.through
+    stats = {"read": 0, "created": 0, "skipped": 0, "invalid": 0, "role_links": 0, "unknown_roles": 0}
+    default_roles = list(default_roles)
+
+    for chunk in _chunks(records, chunk_size):
+        stats["read"] += len(chunk)
+        rows: List[Dict[str, Any]] = []
+        seen = set()
+        for rec in chunk:
+            if not isinstance(rec, dict):
+                stats["invalid"] += 1
+                continue
+            email = User.objects.normalize_email(str(rec.get("email") or "").strip())
+            if not email or "@" not in email or email.lower() in seen:
+                stats["invalid"] += 1
+                continue
+            seen.add(email.lower())
+            rows.append({"email": email, "rec": rec})
+
+        existing = set(User.objects.filter(email__in=[r["email"] for r in rows]).values_list("email", flat=True))
+        new_rows = [r for r in rows if r["email"] not in existing]
+        stats["skipped"] += len(rows) - len(new_rows)
+
+        passwords = [r["rec"].get("password") for r in new_rows]
+        hashes = list(pool.map(_hash, passwords, chunksize=max(1, len(passwords) // 32))) if pool else [_hash(p) for p in passwords]
+
+        with transaction.atomic():
+            User.objects.bulk_create(
+                [
+                    User(
+                        email=r["email"],
+                        password=h,
+                        first_name=str(r["rec"].get("first_name") or "")[:150],
+                        last_name=str(r["rec"].get("last_name") or "")[:150],
+                        patronymic=str(r["rec"].get("patronymic") or "")[:150],
+                        is_active=_parse_bool(r["rec"].get("is_active")),
+                    )
+                    for r, h in zip(new_rows, hashes)
+                ],
+                batch_size=chunk_size,
+                ignore_conflicts=True,  # a concurrent import may have inserted the same email
+            )
+            # ignore_conflicts hides which rows went in: ours carry one of the (salted) hashes above
+            ours = set(hashes)
+            ids = {}
+            inserted = 0
+            for email, pk, password in User.objects.filter(
+                email__in=[r["email"] for r in rows]
+            ).values_list("email", "id", "password"):
+                ids[email] = pk
+                inserted += password in ours
+            stats["created"] += inserted
+            stats["skipped"] += len(new_rows) - inserted
+            links = []
+            for r in rows:
+                for name in _parse_roles(r["rec"].get("roles")) or default_roles:
+                    rid = role_ids.get(name)
+                    if rid is None:
+                        stats["unknown_roles"] += 1
+                    elif r["email"] in ids:
+                        links.append(Through(role_id=rid, user_id=ids[r["email"]]))
+            if links:
+                Through.objects.bulk_create(links, batch_size=chunk_size, ignore_conflicts=True)
+                stats["role_links"] += len(links)
+                # bulk inserts bypass the m2m_changed signal
+                bump(RBAC)
+                record_memberships("add", ((link.role_id, link.user_id) for link in links))
+    return stats
+
+
+def iter_export(fmt: str = "ndjson", *, chunk_size: int = 2000, queryset=None) -> Iterator[str]:
+    """Yield the user table as NDJSON lines or CSV rows (header first), roles as a list / 'a|b'."""
+    from accesscontrol.models import Role
+
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown format {fmt!r}")
+    qs = (queryset if queryset is not None else User.objects.all()).order_by("id").values_list(*EXPORT_FIELDS)
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    if fmt == "csv":
+        writer.writerow(EXPORT_FIELDS + ("roles",))
+        yield buf.getvalue()
+
+    for chunk in _chunks(qs.iterator(chunk_size=chunk_size), chunk_size):
+        roles: Dict[int, List[str]] = {}
+        for uid, name in Role.users.through.objects.filter(
+            user_id__in=[row[0] for row in chunk]
+        ).order_by("role__name").values_list("user_id", "role__name"):
+            roles.setdefault(uid, []).append(name)
+        for row in chunk:
+            rec = dict(zip(EXPORT_FIELDS, row))
+            rec["created_at"] = rec["created_at"].isoformat() if rec["created_at"] else None
+            if fmt == "ndjson":
+                rec["roles"] = roles.get(rec["id"], [])
+                yield json.dumps(rec, ensure_ascii=False) + "\n"
+            else:
+                buf.seek(0)
+                buf.truncate()
+                writer.writerow([rec[f] for f in EXPORT_FIELDS] + ["|".join(roles.get(rec["id"], []))])
+                yield buf.getvalue()
+
+
+def set_active(users: QuerySet, active: bool) -> Dict[str, int]:
+    """
+    Deactivate (revoking every live refresh token) or reactivate the users in `users`.
+    One UPDATE per table in a single transaction; returns affected row counts.
+    Reactivation leaves revoked tokens revoked, users log in again.
+    """
+    from authn.models import RefreshToken
+    from authn.coherency import bump, USERS
+
+    now = timezone.now()
+    ids = users.order_by().values("pk")  # subquery, evaluated inside each UPDATE
+    with transaction.atomic():
+        revoked = 0
+        if not active:
+            # tokens first: `users` may filter on is_active, which the next UPDATE changes
+            revoked = RefreshToken.objects.filter(
+                user__in=ids, revoked_at__isnull=True, expires_at__gt=now
+            ).update(revoked_at=now)
+        changed = User.objects.filter(pk__in=ids, is_active=not active).update(is_active=active, updated_at=now)
+        # update() bypasses post_save, so cached principals are invalidated here
+        bump(USERS)
+    return {"users": changed, "tokens_revoked": revoked}
@@ -0,0 +1,69 @@
+"""
+User directory helpers: index-backed case-insensitive prefix search and keyset cursors.
+
+Prefix search uses the lower(email) / lower(last_name) expression indexes created in
+migration 0002: Postgres matches `lower(col) LIKE 'p%'` against a text_pattern_ops index,
+SQLite gets an equivalent range scan (`lower(col) >= 'p' AND < 'p' || U+10FFFF`),
+because its LIKE is not index-assisted for expression indexes.
+"""
+from __future__ import annotations
+import base64
+import json
+from typing import Any, List, Optional, Tuple
+from django.db import connection
+from django.db.models import Q, QuerySet
+from django.db.models.functions import Lower
+
+PUBLIC_FIELDS = ("id", "email", "first_name", "last_name", "patronymic", "is_active", "created_at")
+ORDERINGS = ("id", "last_name")
+_MAX_CHAR = "\U0010ffff"
+
+
+def prefix_filter(qs: QuerySet, field: str, prefix: str) -> QuerySet:
+    p = prefix.strip().lower()
+    if not p:
+        return qs
+    alias = f"_{field}_lower"
+    qs = qs.annotate(**{alias: Lower(field)})
+    if connection.vendor == "sqlite":
+        return qs.filter(**{f"{alias}__gte": p, f"{alias}__lt": p + _MAX_CHAR})
+    return qs.filter(**{f"{alias}__startswith": p})
+
+
+def encode_cursor(values: List[Any]) -> str:
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Optional[List[Any]]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+def keyset_page(qs: QuerySet, ordering: str, cursor: Optional[str], limit: int,
+                fields: Tuple[str, ...]) -> Tuple[List[dict], Optional[str]]:
+    """One page after `cursor`; returns (rows restricted to `fields`, next cursor or None)."""
+    keys = ("id",) if ordering == "id" else ("last_name", "id")
+    if cursor:
+        after = decode_cursor(cursor)
+        if not after or len(after) != len(keys):
+            raise ValueError("invalid cursor")
+        try:
+            if ordering == "id":
+                qs = qs.filter(id__gt=int(after[0]))
+            elif isinstance(after[0], str):
+                qs = qs.filter(Q(last_name__gt=after[0]) | Q(last_name=after[0], id__gt=int(after[1])))
+            else:
+                raise ValueError
+        except (TypeError, ValueError):
+            raise ValueError("invalid cursor") from None
+    select = tuple(dict.fromkeys(fields + keys))
+    rows = list(qs.order_by(*keys).values(*select)[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    nxt = encode_cursor([rows[-1][k] for k in keys]) if has_more and rows else None
+    return [{f: r[f] for f in fields} for r in rows], nxt
@@ -0,0 +1,30 @@
+from __future__ import annotations
+import sys
+from django.core.management.base import BaseCommand
+
+from accounts.bulk import FORMATS, iter_export
+
+
+class Command(BaseCommand):
+    help = "Stream all users (without password hashes) as NDJSON or CSV."
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", default="-", help="Output file (default: stdout).")
+        parser.add_argument("--format", choices=FORMATS, default=None, help="Default: from the file extension.")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **opts):
+        path = opts["path"]
+        fmt = opts["format"] or ("csv" if path.endswith(".csv") else "ndjson")
+        out = sys.stdout if path == "-" else open(path, "w", encoding="utf-8", newline="")
+        n = 0
+        try:
+            for line in iter_export(fmt, chunk_size=max(1, opts["chunk_size"])):
+                out.write(line)
+                n += 1
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        if out is not sys.stdout:
+            self.stdout.write(self.style.SUCCESS(f"Wrote {n} lines to {path}"))
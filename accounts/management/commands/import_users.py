@@ -0,0 +1,51 @@
+from __future__ import annotations
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from accounts.bulk import FORMATS, import_users, init_worker, iter_records
+
+
+class Command(BaseCommand):
+    help = "Stream users from NDJSON/CSV (email, password, first_name, last_name, patronymic, is_active, roles)."
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Input file, or '-' for stdin.")
+        parser.add_argument("--format", choices=FORMATS, default=None, help="Default: from the file extension.")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Password hashing processes (0 = inline).")
+        parser.add_argument("--role", action="append", default=[], help="Role(s) for records without a 'roles' field.")
+
+    def handle(self, *args, **opts):
+        path = opts["path"]
+        fmt = opts["format"] or ("csv" if path.endswith(".csv") else "ndjson")
+        try:
+            fh = sys.stdin if path == "-" else open(path, encoding="utf-8", newline="")
+        except OSError as e:
+            raise CommandError(str(e))
+        pool = None
+        if opts["workers"] > 0:
+            connections.close_all()  # don't share DB sockets with forked workers
+            pool = ProcessPoolExecutor(max_workers=opts["workers"], initializer=init_worker)
+        t0 = time.perf_counter()
+        try:
+            stats = import_users(
+                iter_records(fh, fmt),
+                chunk_size=max(1, opts["chunk_size"]),
+                pool=pool,
+                default_roles=opts["role"],
+            )
+        finally:
+            if pool:
+                pool.shutdown()
+            if fh is not sys.stdin:
+                fh.close()
+        elapsed = time.perf_counter() - t0
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported in {elapsed:.2f}s ({stats['read'] / max(elapsed, 1e-9):,.0f} records/s): "
+            + ", ".join(f"{k}={v}" for k, v in stats.items())
+        ))
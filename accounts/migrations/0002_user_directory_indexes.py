@@ -0,0 +1,41 @@
+# Generated by Django 5.1.2 on 2026-10-19 11:36
+
+from django.db import migrations, models
+
+# Case-insensitive prefix search (accounts/directory.py). Expression indexes differ per
+# backend: Postgres needs text_pattern_ops for LIKE 'p%', SQLite is searched by range.
+PREFIX_INDEXES = (
+    ("accounts_user_email_lower_idx", "email"),
+    ("accounts_user_lname_lower_idx", "last_name"),
+)
+
+
+def create_prefix_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for name, column in PREFIX_INDEXES:
+        if vendor == "postgresql":
+            schema_editor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON accounts_user (lower({column}) text_pattern_ops)")
+        elif vendor == "sqlite":
+            schema_editor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON accounts_user (lower({column}))")
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor in ("postgresql", "sqlite"):
+        for name, _ in PREFIX_INDEXES:
+            schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['last_name', 'id'], name='accounts_user_lname_id_idx'),
+        ),
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
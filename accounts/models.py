@@ -38,6 +38,14 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     objects = UserManager()
 
+    class Meta:
+        indexes = [
+            # keyset pagination of the user directory ordered by last name
+            models.Index(fields=["last_name", "id"], name="accounts_user_lname_id_idx"),
+        ]
+
     def soft_delete(self):
+        """Deactivate and revoke all live refresh tokens (same path as bulk offboarding)."""
+        from .bulk import set_active
+        set_active(User.objects.filter(pk=self.pk), active=False)
         self.is_active = False
-        self.save(update_fields=["is_active"])
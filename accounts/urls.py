@@ -1,5 +1,6 @@
 from django.urls import path
-from .views import RegisterView, LoginView, LogoutView, MeView,DebugAuthView,RefreshView
+from .views import RegisterView, LoginView, LogoutView, MeView,DebugAuthView,RefreshView,IntrospectView,UserExportView
+from authn.gateway import forward_auth
 
 urlpatterns = [
     path("register/", RegisterView.as_view(), name="register"),
@@ -8,4 +9,7 @@ urlpatterns = [
     path("me/",       MeView.as_view(),       name="me"),
     path("refresh/",  RefreshView.as_view(),  name="refresh"),
     path("debug/",    DebugAuthView.as_view(), name="auth-debug"),
+    path("forward/",  forward_auth,           name="forward-auth"),
+    path("introspect/", IntrospectView.as_view(), name="introspect"),
+    path("users/export/", UserExportView.as_view(), name="users-export"),
 ]
\ No newline at end of file
@@ -0,0 +1,8 @@
+from django.urls import path
+from .views import UserDirectoryView, UserActivationView
+
+urlpatterns = [
+    path("", UserDirectoryView.as_view(), name="users-directory"),
+    path("deactivate/", UserActivationView.as_view(active=False), name="users-deactivate"),
+    path("reactivate/", UserActivationView.as_view(active=True), name="users-reactivate"),
+]
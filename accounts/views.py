@@ -1,22 +1,41 @@
 from __future__ import annotations
+import os
 from django.contrib.auth import get_user_model
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from authn.jwt import verify_jwt_verbose
 from authn.jwt import make_jwt
+from authn.idempotency import idempotent
+from authn.concurrency import concurrency_limited
 from .serializers import RegisterSerializer, LoginSerializer, UserMeSerializer
-from authn.services import issue_refresh_token, get_refresh_row, rotate_refresh, revoke_refresh
+from authn.services import issue_refresh_token, get_refresh_row, rotate_refresh, revoke_refresh, introspect_tokens
+from accesscontrol.permissions import CanIntrospect, IsAdminRole
+from .bulk import FORMATS, iter_export, set_active
+from .directory import ORDERINGS, PUBLIC_FIELDS, keyset_page, prefix_filter
+from accesscontrol.services import has_permission
+from audit.services import record_request as audit
+from core.metrics import metrics
+from core.rendering import compile_serializer, json_response
+from authn.coherency import LocalCache, USERS
 import logging
 log = logging.getLogger("accounts.views")
 
 User = get_user_model()
 
+_me_dict = compile_serializer(UserMeSerializer)
+# encoded GET /me bodies, keyed by the values they were rendered from
+_me_json = LocalCache(USERS, maxsize=int(os.getenv("ME_JSON_CACHE_SIZE", "10000")), ttl=300)
 
+
+@concurrency_limited("auth.register")
 class RegisterView(APIView):
     authentication_classes = []  # handled by middleware
     permission_classes = []
 
+    @idempotent("auth.register")
     def post(self, request):
         s = RegisterSerializer(data=request.data)
         if not s.is_valid():
@@ -25,17 +44,23 @@ class RegisterView(APIView):
         return Response({"id": user.id, "email": user.email}, status=status.HTTP_201_CREATED)
 
 
+@concurrency_limited("auth.login")
 class LoginView(APIView):
     authentication_classes = []
     permission_classes = []
 
+    @idempotent("auth.login", credentials=True)
     def post(self, request):
         s = LoginSerializer(data=request.data)
         if not s.is_valid():
             log.info("login.invalid email=%s errs=%s", request.data.get("email"), s.errors)
+            audit("login.fail", request, detail=str(request.data.get("email") or ""))
+            metrics.inc("auth_login_failure_total")
             return Response(s.errors, status=status.HTTP_400_BAD_REQUEST)
         user = s.validated_data["user"]
         log.info("login.ok user_id=%s email=%s", user.id, user.email)
+        audit("login.ok", request, user_id=user.id)
+        metrics.inc("auth_login_success_total")
         access = make_jwt(user.id) 
         refresh_raw, _ = issue_refresh_token(user, request=request)
 
@@ -49,6 +74,7 @@ class LoginView(APIView):
 class LogoutView(APIView):
     """Stateless logout; client forgets token."""
     def post(self, request):
+        audit("logout", request, user_id=getattr(getattr(request, "user", None), "id", None))
         return Response({"detail": "Logged out (stateless)."}, status=status.HTTP_200_OK)
 
 
@@ -73,7 +99,8 @@ class MeView(APIView):
     def get(self, request):
         unauth = self._ensure_auth(request)
         if unauth: return unauth
-        return Response(UserMeSerializer(request.user).data)
+        data = _me_dict(request.user)
+        return json_response(request, data, cache=_me_json, key=tuple(data.values()))
 
     def patch(self, request):
         unauth = self._ensure_auth(request)
@@ -87,8 +114,8 @@ class MeView(APIView):
     def delete(self, request):
         unauth = self._ensure_auth(request)
         if unauth: return unauth
-        request.user.is_active = False
-        request.user.save(update_fields=["is_active"])
+        request.user.soft_delete()
+        audit("account.deactivate", request, user_id=request.user.id)
         return Response({"detail": "Account deactivated."})
 
 class DebugAuthView(APIView):
@@ -102,14 +129,38 @@ class DebugAuthView(APIView):
             parts = raw.strip().split()
             if len(parts) == 2 and parts[0].lower() == "bearer":
                 token = parts[1].strip().strip('"').strip("'")
+        scheme = raw.strip().split()[0] if raw.strip() else ""
         return Response({
-            "authorization_raw": raw,
+            # never echo the credential itself
+            "authorization_scheme": scheme,
+            "token_preview": f"{token[:12]}...{token[-8:]}" if len(token) > 24 else ("<short>" if token else ""),
             "verify": verify_jwt_verbose(token),
             "user_resolved": getattr(request, "user", None) and getattr(request.user, "id", None),
         })
     
 
 
+class IntrospectView(APIView):
+    """
+    Batch access-token introspection for sidecars.
+    - Accepts: {"tokens": ["<jwt>", ...]} (up to INTROSPECT_MAX_TOKENS)
+    - Returns: {"results": [{"active": true, "sub", "email", "exp", "iat", "roles"} | {"active": false}, ...]}
+    """
+    permission_classes = [CanIntrospect]
+    max_tokens = int(os.getenv("INTROSPECT_MAX_TOKENS", "500"))
+
+    def post(self, request):
+        tokens = request.data.get("tokens") if isinstance(request.data, dict) else None
+        if not isinstance(tokens, list) or not all(isinstance(t, str) for t in tokens):
+            return Response({"detail": "tokens must be a list of strings"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(tokens) > self.max_tokens:
+            return Response({"detail": f"at most {self.max_tokens} tokens per call"}, status=status.HTTP_400_BAD_REQUEST)
+        results = introspect_tokens([t.strip() for t in tokens])
+        log.info("introspect.ok caller=%s n=%s active=%s", request.user.id, len(tokens), sum(r["active"] for r in results))
+        return Response({"results": results})
+
+
+@concurrency_limited("auth.refresh")
 class RefreshView(APIView):
     """
     Exchange a valid refresh token for a NEW access token and a ROTATED refresh token.
@@ -119,6 +170,7 @@ class RefreshView(APIView):
     authentication_classes = []  # uses refresh token only
     permission_classes = []
 
+    @idempotent("auth.refresh", credentials=True)
     def post(self, request):
         refresh_raw = str(request.data.get("refresh") or "").strip()
         if not refresh_raw:
@@ -127,15 +179,131 @@ class RefreshView(APIView):
 
         rt = get_refresh_row(refresh_raw)
         if not rt:
+            audit("refresh.fail", request, detail="unknown token")
+            metrics.inc("auth_refresh_failures_total")
             return Response({"detail": "invalid refresh token"}, status=status.HTTP_401_UNAUTHORIZED)
         if not rt.is_active:
+            audit("refresh.fail", request, user_id=rt.user_id, detail="expired or revoked")
+            metrics.inc("auth_refresh_failures_total")
             return Response({"detail": "refresh token expired or revoked"}, status=status.HTTP_401_UNAUTHORIZED)
 
         log.info("refresh.ok user_id=%s family=%s", rt.user_id, rt.family)
+        audit("refresh.ok", request, user_id=rt.user_id)
         # Rotate refresh token
         new_refresh_raw, _ = rotate_refresh(rt, request=request)
+        metrics.inc("auth_refresh_rotations_total")
 
         # Issue new short-lived access
         access = make_jwt(rt.user.id)
 
-        return Response({"access": access, "refresh": new_refresh_raw}, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response({"access": access, "refresh": new_refresh_raw}, status=status.HTTP_200_OK)
+
+
+class UserExportView(APIView):
+    """
+    GET /api/auth/users/export/?fmt=ndjson|csv  (admins)
+    Streams the whole user table without password hashes.
+    """
+    permission_classes = [IsAdminRole]
+
+    def get(self, request):
+        fmt = request.query_params.get("fmt", "ndjson")
+        if fmt not in FORMATS:
+            return Response({"detail": f"fmt must be one of {', '.join(FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        log.info("users.export user_id=%s fmt=%s", request.user.id, fmt)
+        resp = StreamingHttpResponse(
+            iter_export(fmt),
+            content_type="application/x-ndjson" if fmt == "ndjson" else "text/csv; charset=utf-8",
+        )
+        resp["Content-Disposition"] = f'attachment; filename="users.{fmt}"'
+        return resp
+
+
+
+class UserDirectoryView(APIView):
+    """
+    GET /api/users/?email=<prefix>&last_name=<prefix>&order=id|last_name&fields=id,email&limit=50&cursor=<next>
+    Needs read on element 'users' (read_all -> everyone, read -> only yourself).
+    Keyset-paginated: pass the returned `next` as `cursor`.
+    """
+    max_limit = 200
+
+    def get(self, request):
+        user = getattr(request, "user", None)
+        if not (user and getattr(user, "is_authenticated", False)):
+            return Response({"detail": "Unauthorized"}, status=status.HTTP_401_UNAUTHORIZED)
+        qs = User.objects.all()
+        if not has_permission(user, "users", "read", None, probe=True):
+            if not has_permission(user, "users", "read", owner_id=user.id):
+                return Response({"detail": "Forbidden"}, status=status.HTTP_403_FORBIDDEN)
+            qs = qs.filter(pk=user.id)
+
+        q = request.query_params
+        order = q.get("order", "id")
+        if order not in ORDERINGS:
+            return Response({"detail": f"order must be one of {', '.join(ORDERINGS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        fields = tuple(f.strip() for f in q.get("fields", "").split(",") if f.strip()) or PUBLIC_FIELDS
+        unknown = [f for f in fields if f not in PUBLIC_FIELDS]
+        if unknown:
+            return Response({"detail": f"unknown fields: {', '.join(unknown)}"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = max(1, min(int(q.get("limit", 50)), self.max_limit))
+        except ValueError:
+            return Response({"detail": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        for param in ("email", "last_name"):
+            if q.get(param):
+                qs = prefix_filter(qs, param, q[param])
+        try:
+            rows, nxt = keyset_page(qs, order, q.get("cursor"), limit, fields)
+        except ValueError:
+            return Response({"detail": "invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"results": rows, "next": nxt})
+
+
+class UserActivationView(APIView):
+    """
+    POST /api/users/deactivate/ | /api/users/reactivate/  (admins)
+    - Accepts: {"ids": [1, 2, ...]} or {"filter": {"email": "<prefix>", "role": "<name>", "created_before": "<iso>"}}
+    - Returns: {"users": <changed>, "tokens_revoked": <n>}
+    Deactivation revokes live refresh tokens; the caller and superusers are never deactivated.
+    """
+    permission_classes = [IsAdminRole]
+    active = False
+    max_ids = int(os.getenv("BULK_ACTIVATION_MAX_IDS", "50000"))
+
+    def _selection(self, data):
+        qs = User.objects.all()
+        ids, flt = data.get("ids"), data.get("filter")
+        if ids is not None:
+            if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+                return None, "ids must be a list of integers"
+            if len(ids) > self.max_ids:
+                return None, f"at most {self.max_ids} ids per call"
+            return qs.filter(pk__in=ids), None
+        if not isinstance(flt, dict) or not any(flt.get(k) for k in ("email", "role", "created_before")):
+            return None, "pass ids or a non-empty filter (email, role, created_before)"
+        if flt.get("email"):
+            qs = prefix_filter(qs, "email", str(flt["email"]))
+        if flt.get("role"):
+            qs = qs.filter(roles__name__iexact=str(flt["role"]))
+        if flt.get("created_before"):
+            before = parse_datetime(str(flt["created_before"]))
+            if before is None:
+                return None, "created_before must be an ISO 8601 datetime"
+            qs = qs.filter(created_at__lt=before)
+        return qs, None
+
+    def post(self, request):
+        if not isinstance(request.data, dict):
+            return Response({"detail": "expected a JSON object"}, status=status.HTTP_400_BAD_REQUEST)
+        qs, error = self._selection(request.data)
+        if error:
+            return Response({"detail": error}, status=status.HTTP_400_BAD_REQUEST)
+        if not self.active:
+            qs = qs.exclude(pk=request.user.id).exclude(is_superuser=True)
+        result = set_active(qs, self.active)
+        kind = "users.reactivate" if self.active else "users.deactivate"
+        log.info("%s caller=%s users=%s tokens_revoked=%s", kind, request.user.id, result["users"], result["tokens_revoked"])
+        audit(kind, request, user_id=request.user.id, detail=f"users={result['users']} tokens={result['tokens_revoked']}")
+        return Response(result)
@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import AuditEvent
+
+@admin.register(AuditEvent)
+class AuditEventAdmin(admin.ModelAdmin):
+    list_display = ("id", "created_at", "kind", "user_id", "element", "action", "allowed", "ip")
+    list_filter = ("kind", "allowed")
+    search_fields = ("element",)
+    date_hierarchy = "created_at"
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.2 on 2026-10-19 11:31
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('kind', models.CharField(max_length=32)),
+                ('user_id', models.BigIntegerField(blank=True, null=True)),
+                ('element', models.CharField(blank=True, max_length=64)),
+                ('action', models.CharField(blank=True, max_length=16)),
+                ('allowed', models.BooleanField(null=True)),
+                ('ip', models.GenericIPAddressField(blank=True, null=True)),
+                ('detail', models.CharField(blank=True, max_length=256)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user_id', 'created_at'], name='audit_audit_user_id_39eebe_idx'), models.Index(fields=['element', 'created_at'], name='audit_audit_element_6fd609_idx'), models.Index(fields=['created_at'], name='audit_audit_created_7710b7_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.2 on 2026-10-19 12:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='auditevent',
+            name='audit_audit_user_id_39eebe_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='auditevent',
+            name='audit_audit_element_6fd609_idx',
+        ),
+        migrations.AddIndex(
+            model_name='auditevent',
+            index=models.Index(fields=['user_id', 'id'], name='audit_audit_user_id_9b64f2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditevent',
+            index=models.Index(fields=['element', 'id'], name='audit_audit_element_32bd7a_idx'),
+        ),
+    ]
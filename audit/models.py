@@ -0,0 +1,30 @@
+from __future__ import annotations
+from django.db import models
+from django.utils import timezone
+
+
+class AuditEvent(models.Model):
+    """
+    Append-only audit trail (logins, refreshes, logouts, permission decisions).
+    Written in batches by audit.services; user_id is a plain column (no FK) so
+    inserts never wait on the users table and history survives user deletion.
+    """
+    created_at = models.DateTimeField(default=timezone.now)
+    kind = models.CharField(max_length=32)           # e.g. "login.ok", "perm.deny"
+    user_id = models.BigIntegerField(null=True, blank=True)
+    element = models.CharField(max_length=64, blank=True)
+    action = models.CharField(max_length=16, blank=True)
+    allowed = models.BooleanField(null=True)
+    ip = models.GenericIPAddressField(null=True, blank=True)
+    detail = models.CharField(max_length=256, blank=True)
+
+    class Meta:
+        # the API pages newest-first by id (`before` cursor); created_at serves since/until alone
+        indexes = [
+            models.Index(fields=["user_id", "id"]),
+            models.Index(fields=["element", "id"]),
+            models.Index(fields=["created_at"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.created_at:%Y-%m-%d %H:%M:%S} {self.kind} user={self.user_id}"
@@ -0,0 +1,153 @@
+"""
+Buffered audit writer.
+
+`record()` only does a non-blocking put on a bounded queue; a daemon thread drains it
+and writes with bulk_create every AUDIT_BATCH_SIZE events or AUDIT_FLUSH_SECONDS,
+whichever comes first. A full queue drops the event (counted) instead of slowing the
+request down. The buffer is flushed on interpreter exit. With `synchronous` set (the
+test runner does) events are written in the calling thread instead.
+"""
+from __future__ import annotations
+import os
+import time
+import queue
+import atexit
+import threading
+from typing import Any, Dict, List, Optional
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+import logging
+log = logging.getLogger("audit.services")
+
+AUDIT_ENABLED = os.getenv("AUDIT_ENABLED", "1") == "1"
+AUDIT_PERMISSION_GRANTS = os.getenv("AUDIT_PERMISSION_GRANTS", "0") == "1"  # denials are always recorded
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+AUDIT_FLUSH_SECONDS = float(os.getenv("AUDIT_FLUSH_SECONDS", "1"))
+
+_STOP = object()
+
+
+class AuditBuffer:
+    def __init__(self, maxsize: int = AUDIT_QUEUE_SIZE, batch_size: int = AUDIT_BATCH_SIZE,
+                 flush_interval: float = AUDIT_FLUSH_SECONDS):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._q: "queue.Queue[Any]" = queue.Queue(maxsize=maxsize)
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._start_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self.synchronous = False
+        self.stats: Dict[str, int] = {"enqueued": 0, "written": 0, "dropped": 0, "flush_errors": 0}
+
+    # --- producer side (request threads) ---
+
+    def record(self, kind: str, **fields: Any) -> bool:
+        fields["kind"] = kind
+        fields.setdefault("created_at", timezone.now())
+        if self.synchronous:
+            self.stats["enqueued"] += 1
+            self._write([fields])
+            return True
+        self._ensure_thread()
+        try:
+            self._q.put_nowait(fields)
+        except queue.Full:
+            self.stats["dropped"] += 1
+            return False
+        self.stats["enqueued"] += 1
+        return True
+
+    def _ensure_thread(self) -> None:
+        # started lazily and restarted after fork (threads don't survive it)
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+
+    # --- consumer side (writer thread) ---
+
+    def _run(self) -> None:
+        batch: List[Dict[str, Any]] = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._q.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                self._write(batch)
+                close_old_connections()
+                return
+            if item is not None:
+                batch.append(item)
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._write(batch)
+                close_old_connections()
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        if not batch:
+            return
+        from .models import AuditEvent
+        with self._write_lock:
+            try:
+                with transaction.atomic():
+                    AuditEvent.objects.bulk_create([AuditEvent(**f) for f in batch], batch_size=self.batch_size)
+                self.stats["written"] += len(batch)
+            except Exception as e:  # not just DatabaseError: an exception here would kill the writer thread
+                self.stats["flush_errors"] += 1
+                self.stats["dropped"] += len(batch)
+                log.warning("audit.flush_failed n=%s err=%s", len(batch), e)
+
+    # --- control ---
+
+    def flush(self) -> None:
+        """Write everything queued so far from the calling thread."""
+        batch: List[Dict[str, Any]] = []
+        while True:
+            try:
+                item = self._q.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                batch.append(item)
+        self._write(batch)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            try:
+                self._q.put(_STOP, timeout=timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+        self.flush()
+
+
+buffer = AuditBuffer()
+atexit.register(buffer.stop)
+
+
+def record(kind: str, *, user_id: Optional[int] = None, element: str = "", action: str = "",
+           allowed: Optional[bool] = None, ip: Optional[str] = None, detail: str = "") -> None:
+    if not AUDIT_ENABLED:
+        return
+    buffer.record(kind, user_id=user_id, element=element[:64], action=action[:16],
+                  allowed=allowed, ip=ip, detail=detail[:256])
+
+
+def record_request(kind: str, request, *, user_id: Optional[int] = None, detail: str = "") -> None:
+    ip = request.META.get("REMOTE_ADDR") if request is not None else None
+    record(kind, user_id=user_id, ip=ip, detail=detail)
+
+
+def record_permission(user_id: Optional[int], element: str, action: str, allowed: bool) -> None:
+    if allowed and not AUDIT_PERMISSION_GRANTS:
+        return
+    record("perm.grant" if allowed else "perm.deny", user_id=user_id, element=element, action=action, allowed=allowed)
@@ -0,0 +1,29 @@
+from django.test import TestCase
+
+from .models import AuditEvent
+from .services import AuditBuffer, buffer, record
+
+
+class AuditBufferTests(TestCase):
+    def test_test_runner_writes_synchronously(self):
+        self.assertTrue(buffer.synchronous)
+        record("auth.login", user_id=7, ip="127.0.0.1")
+        self.assertTrue(AuditEvent.objects.filter(kind="auth.login", user_id=7).exists())
+
+    def test_any_write_error_is_counted_not_raised(self):
+        b = AuditBuffer()
+        b.synchronous = True
+        b.record("auth.login", no_such_field=1)  # AuditEvent(**fields) raises TypeError
+        self.assertEqual(b.stats["flush_errors"], 1)
+        self.assertEqual(b.stats["dropped"], 1)
+        b.record("auth.login", user_id=1)
+        self.assertEqual(b.stats["written"], 1)
+
+    def test_writer_thread_survives_a_bad_batch(self):
+        b = AuditBuffer(flush_interval=0.01)
+        b.record("auth.login", no_such_field=1)
+        b._thread.join(0.3)
+        self.assertTrue(b._thread.is_alive())
+        self.assertEqual(b.stats["dropped"], 1)
+        b.stop()
+        self.assertFalse(b._thread.is_alive())
@@ -0,0 +1,7 @@
+from django.urls import path
+from .views import AuditEventListView, AuditStatsView
+
+urlpatterns = [
+    path("events/", AuditEventListView.as_view(), name="audit-events"),
+    path("stats/",  AuditStatsView.as_view(),     name="audit-stats"),
+]
@@ -0,0 +1,57 @@
+from __future__ import annotations
+from django.utils.dateparse import parse_datetime
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+
+from accesscontrol.permissions import IsAdminRole
+from .models import AuditEvent
+from .services import buffer
+
+FIELDS = ("id", "created_at", "kind", "user_id", "element", "action", "allowed", "ip", "detail")
+MAX_LIMIT = 500
+
+
+class AuditEventListView(APIView):
+    """
+    GET /api/audit/events/?user=&element=&kind=&allowed=&since=&until=&before=&limit=
+    Newest first; pass the returned `next_before` as `before` for the next page.
+    """
+    permission_classes = [IsAdminRole]
+
+    def get(self, request):
+        q = request.query_params
+        qs = AuditEvent.objects.all()
+        try:
+            if q.get("user"):
+                qs = qs.filter(user_id=int(q["user"]))
+            if q.get("before"):
+                qs = qs.filter(id__lt=int(q["before"]))
+            limit = min(int(q.get("limit", 100)), MAX_LIMIT)
+        except ValueError:
+            return Response({"detail": "user/before/limit must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+        if q.get("element"):
+            qs = qs.filter(element=q["element"])
+        if q.get("kind"):
+            qs = qs.filter(kind=q["kind"])
+        if q.get("allowed") in ("true", "false"):
+            qs = qs.filter(allowed=q["allowed"] == "true")
+        for param, lookup in (("since", "created_at__gte"), ("until", "created_at__lt")):
+            if q.get(param):
+                ts = parse_datetime(q[param])
+                if ts is None:
+                    return Response({"detail": f"{param} must be an ISO datetime"}, status=status.HTTP_400_BAD_REQUEST)
+                qs = qs.filter(**{lookup: ts})
+        rows = list(qs.order_by("-id").values(*FIELDS)[:limit])
+        return Response({
+            "results": rows,
+            "next_before": rows[-1]["id"] if len(rows) == limit else None,
+        })
+
+
+class AuditStatsView(APIView):
+    """GET /api/audit/stats/ -> this worker's buffer counters (enqueued/written/dropped/flush_errors)."""
+    permission_classes = [IsAdminRole]
+
+    def get(self, request):
+        return Response({**buffer.stats, "queued": buffer._q.qsize()})
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class AuthnConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'authn'
+
+    def ready(self):
+        from core.db_profiles import install
+        install()
+        from .signals import connect
+        connect()
@@ -0,0 +1,219 @@
+"""
+Cross-process coherency for in-process caches.
+
+Every worker keeps its own caches (principals, RBAC). Writers call `bump()`
+inside their transaction; each worker polls the `CacheVersion` table at most every
+CACHE_COHERENCY_SECONDS (`sync()`) and clears only the namespaces whose version moved.
+
+`LocalCache.get_or_load` keeps the burst of misses after such a clear from becoming a
+query storm: one load per key is in flight and concurrent callers share its result, and
+while it runs they get the previous value if it went stale less than CACHE_STALE_SECONDS
+ago. TTLs and the poll interval are jittered so workers do not refresh in lockstep.
+"""
+from __future__ import annotations
+import os
+import time
+import random
+import threading
+from collections import OrderedDict
+from functools import partial
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+from django.db import transaction, DatabaseError
+from django.db.models import F
+import logging
+log = logging.getLogger("authn.coherency")
+
+USERS = "users"
+RBAC = "rbac"
+NAMESPACES = (USERS, RBAC)
+
+CACHE_COHERENCY_SECONDS = float(os.getenv("CACHE_COHERENCY_SECONDS", "1"))
+CACHE_STALE_SECONDS = float(os.getenv("CACHE_STALE_SECONDS", "2"))
+CACHE_TTL_JITTER = float(os.getenv("CACHE_TTL_JITTER", "0.1"))  # +-10% per entry and per poll
+CACHE_LOAD_WAIT_SECONDS = float(os.getenv("CACHE_LOAD_WAIT_SECONDS", "5"))
+
+_lock = threading.Lock()
+_listeners: Dict[str, List[Callable[[], None]]] = {}
+_seen: Dict[str, int] = {}
+_next_check = float("-inf")
+
+
+def register(namespace: str, clear: Callable[[], None]) -> None:
+    """Call `clear()` whenever `namespace` is invalidated (locally or by another worker)."""
+    with _lock:
+        _listeners.setdefault(namespace, []).append(clear)
+
+
+def invalidate_local(namespaces) -> None:
+    for ns in namespaces:
+        for clear in list(_listeners.get(ns, ())):
+            try:
+                clear()
+            except Exception:
+                log.exception("coherency.clear_failed ns=%s", ns)
+
+
+def bump(*namespaces: str, using: Optional[str] = None) -> None:
+    """
+    Advance the version of `namespaces` in the current transaction.
+    Local caches are cleared on commit; other workers notice on their next sync().
+    """
+    from .models import CacheVersion
+
+    ns = list(dict.fromkeys(namespaces))
+    if not ns:
+        return
+    qs = CacheVersion.objects.using(using) if using else CacheVersion.objects
+    updated = qs.filter(namespace__in=ns).update(version=F("version") + 1)
+    if updated < len(ns):
+        qs.bulk_create([CacheVersion(namespace=n, version=1) for n in ns], ignore_conflicts=True)
+    transaction.on_commit(partial(invalidate_local, ns), using=using)
+
+
+def sync(force: bool = False) -> List[str]:
+    """Throttled poll of the versions table; returns the namespaces that were invalidated."""
+    global _next_check
+    from .models import CacheVersion
+
+    now = time.monotonic()
+    if not force and now < _next_check:
+        return []
+    with _lock:
+        if not force and now < _next_check:
+            return []
+        _next_check = now + _jittered(CACHE_COHERENCY_SECONDS)
+        try:
+            current = dict(CacheVersion.objects.values_list("namespace", "version"))
+        except DatabaseError as e:
+            log.warning("coherency.sync_failed err=%s", e)
+            return []
+        changed = [ns for ns, v in current.items() if _seen.get(ns, v) != v]
+        _seen.update(current)
+    if changed:
+        log.debug("coherency.invalidate ns=%s", changed)
+        invalidate_local(changed)
+    return changed
+
+
+def _jittered(seconds: float) -> float:
+    return seconds * (1 + random.uniform(-CACHE_TTL_JITTER, CACHE_TTL_JITTER)) if CACHE_TTL_JITTER > 0 else seconds
+
+
+class _Flight:
+    __slots__ = ("event", "value", "ok", "generation")
+
+    def __init__(self, generation: int):
+        self.event = threading.Event()
+        self.value: Any = None
+        self.ok = False
+        self.generation = generation
+
+
+class LocalCache:
+    """
+    Small thread-safe LRU with TTL, registered for coherency invalidation.
+    Values should be immutable (tuples / dicts that are never mutated).
+
+    Invalidation bumps a generation instead of dropping entries: `get` treats older
+    generations as misses, `get_or_load` may still hand out the previous generation
+    for CACHE_STALE_SECONDS while the replacement is being loaded.
+    """
+
+    def __init__(self, namespace: str, maxsize: int = 10000, ttl: float = 30.0, stale: float = CACHE_STALE_SECONDS):
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale = stale
+        self._data: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()  # key -> (expires, generation, value)
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._invalidated_at = float("-inf")
+        self._flights: Dict[Hashable, _Flight] = {}
+        register(namespace, self.invalidate)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                return default
+            expires, generation, value = hit
+            if generation != self._generation or expires < time.monotonic():
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._store(key, value, self._generation)
+
+    def _store(self, key: Hashable, value: Any, generation: int) -> None:
+        # caller holds self._lock
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+        self._data[key] = (time.monotonic() + _jittered(self.ttl), generation, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def get_or_load(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        """
+        Cached value, else `load()` (None results are not cached). Concurrent misses on a key
+        share one load; meanwhile they get the previous value if it is recently stale.
+        """
+        now = time.monotonic()
+        with self._lock:
+            hit = self._data.get(key)
+            stale = None
+            if hit is not None:
+                expires, generation, value = hit
+                if generation == self._generation and expires >= now:
+                    self._data.move_to_end(key)
+                    return value
+                # previous generation (stale since the invalidation) or expired (stale since expiry)
+                since = min(expires, self._invalidated_at) if generation != self._generation else expires
+                if generation >= self._generation - 1 and now - since <= self.stale:
+                    stale = hit
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight(self._generation)
+
+        if not leader:
+            if stale is not None:
+                return stale[2]
+            if flight.event.wait(CACHE_LOAD_WAIT_SECONDS) and flight.ok:
+                return flight.value
+            return load()  # the shared load failed or hangs: don't pile up behind it
+
+        try:
+            value = load()
+            flight.value, flight.ok = value, True
+            if value is not None:
+                with self._lock:
+                    # loaded under the generation it started in: an invalidation that raced
+                    # the load leaves the result stale right away
+                    self._store(key, value, flight.generation)
+            return value
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.event.set()
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate(self) -> None:
+        """Coherency hook: every entry becomes stale (still usable by get_or_load, briefly)."""
+        with self._lock:
+            self._generation += 1
+            self._invalidated_at = time.monotonic()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._generation += 1
+            self._invalidated_at = float("-inf")
+
+    def __len__(self) -> int:
+        return len(self._data)
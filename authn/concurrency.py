@@ -0,0 +1,168 @@
+"""
+Adaptive concurrency limits for expensive views (bcrypt / DB-heavy writes).
+
+Each limiter caps the requests a worker runs at once for one endpoint group. The cap
+follows a latency gradient, similar to Netflix's concurrency-limits. Observed latency
+is compared with what the same requests would take without contention: the request
+thread's own CPU time plus the non-CPU (DB / IO) time seen by requests admitted while
+almost nothing else ran. While observed latency stays within CONCURRENCY_TOLERANCE x
+that, the limit grows by about sqrt(limit). When bcrypt threads start fighting for
+cores, or queries start queueing, it shrinks in proportion. The uncontended DB / IO
+time is the smallest non-CPU time seen lately. Every few hundred requests that minimum
+restarts from the current sample (the TCP Vegas / concurrency-limits probe), so it
+follows a database that got slower without ever lowering the limit to measure it.
+Requests over the limit are not queued: they get 503 with Retry-After right away, so
+a login flood cannot take the CPU and DB connections from cheap reads.
+
+    @concurrency_limited("auth.login")
+    class LoginView(APIView): ...
+
+State is exported through core.metrics (app_concurrency_limit / _inflight / _shed_total).
+"""
+from __future__ import annotations
+import os
+import math
+import time
+import random
+import functools
+import threading
+from typing import Dict, Iterable, Optional
+from django.core.exceptions import ImproperlyConfigured
+from django.http import JsonResponse
+
+from core.metrics import metrics, LIMITERS
+import logging
+log = logging.getLogger("authn.concurrency")
+
+CONCURRENCY_LIMITING = os.getenv("CONCURRENCY_LIMITING", "1") == "1"
+CONCURRENCY_LIMIT_INITIAL = int(os.getenv("CONCURRENCY_LIMIT_INITIAL", "8"))
+CONCURRENCY_LIMIT_MIN = int(os.getenv("CONCURRENCY_LIMIT_MIN", "2"))
+CONCURRENCY_LIMIT_MAX = int(os.getenv("CONCURRENCY_LIMIT_MAX", "128"))
+CONCURRENCY_TOLERANCE = float(os.getenv("CONCURRENCY_TOLERANCE", "1.5"))
+SMOOTHING = 0.2
+SHORT_WINDOW = 10    # samples in the latency EWMAs
+PROBE_EVERY = 500    # completions between resets of the IO floor (jittered +-50%)
+
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+
+class Limiter:
+    def __init__(self, name: str, initial: int = CONCURRENCY_LIMIT_INITIAL,
+                 min_limit: int = CONCURRENCY_LIMIT_MIN, max_limit: int = CONCURRENCY_LIMIT_MAX,
+                 tolerance: float = CONCURRENCY_TOLERANCE):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.limit = float(max(min_limit, min(initial, max_limit)))
+        self.inflight = 0
+        self.shed = 0
+        self._wall: Optional[float] = None   # EWMA of observed latency
+        self._ideal: Optional[float] = None  # ... and of the uncontended estimate
+        self._io_floor: Optional[float] = None
+        self._probe_in = self._next_probe()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _next_probe() -> int:
+        return int(PROBE_EVERY * random.uniform(0.5, 1.5))
+
+    def try_acquire(self) -> int:
+        """Requests in flight including this one; 0 = shed."""
+        with self._lock:
+            if self.inflight >= int(self.limit):
+                self.shed += 1
+                admitted = 0
+            else:
+                self.inflight += 1
+                admitted = self.inflight
+            limit, inflight = int(self.limit), self.inflight
+        metrics.limiter(self.name, limit, inflight, shed=0 if admitted else 1)
+        return admitted
+
+    def release(self, seconds: float, cpu_seconds: float, admitted: int, failed: bool = False) -> None:
+        with self._lock:
+            used = self.inflight
+            self.inflight -= 1
+            self._update(seconds, cpu_seconds, admitted, failed, used)
+            limit, inflight = int(self.limit), self.inflight
+        metrics.limiter(self.name, limit, inflight)
+
+    def _update(self, wall: float, cpu: float, admitted: int, failed: bool, used: int) -> None:
+        if failed:
+            # 5xx / exceptions (e.g. DB timeouts) count as overload
+            self.limit = max(self.min_limit, self.limit * 0.9)
+            return
+        io = max(0.0, wall - cpu)
+        self._probe_in -= 1
+        if self._probe_in <= 0:
+            # probe: forget the old minimum so a slower database is picked up; the limit stays put
+            self._probe_in = self._next_probe()
+            self._io_floor = io
+        elif self._io_floor is None or io < self._io_floor:
+            self._io_floor = io  # any sample bounds the uncontended IO time from above
+        elif max(admitted, used) <= self.min_limit:
+            # (nearly) alone: what is left after CPU is the DB / IO time without contention
+            self._io_floor += (io - self._io_floor) * 0.1
+        ideal = cpu + (self._io_floor or 0.0)
+        if self._wall is None:
+            self._wall, self._ideal = wall, ideal
+        a = 2 / (SHORT_WINDOW + 1)
+        self._wall += (wall - self._wall) * a
+        self._ideal += (ideal - self._ideal) * a
+        if used < self.limit / 2:
+            return  # limit not in use, so latency says nothing about it
+        gradient = max(0.5, min(1.0, self.tolerance * self._ideal / max(self._wall, 1e-6)))
+        target = self.limit * gradient + math.sqrt(self.limit)
+        self.limit = max(self.min_limit, min(self.max_limit, self.limit * (1 - SMOOTHING) + target * SMOOTHING))
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self._wall or 1))
+
+
+_limiters: Dict[str, Limiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def limiter(name: str) -> Limiter:
+    lim = _limiters.get(name)
+    if lim is None:
+        with _limiters_lock:
+            lim = _limiters.setdefault(name, Limiter(name))
+    return lim
+
+
+def concurrency_limited(name: str, methods: Optional[Iterable[str]] = None):
+    """Class decorator for APIView/ViewSet: limit `methods` (default: all) through limiter `name`."""
+    only = frozenset(m.upper() for m in methods) if methods else None
+    if name not in LIMITERS:
+        # the shared metrics file has a fixed slot per limiter name
+        raise ImproperlyConfigured(f"limiter {name!r} is not listed in core.metrics.LIMITERS")
+
+    def decorate(cls):
+        dispatch = cls.dispatch
+
+        @functools.wraps(dispatch)
+        def limited_dispatch(self, request, *args, **kwargs):
+            if not CONCURRENCY_LIMITING or (only is not None and request.method not in only):
+                return dispatch(self, request, *args, **kwargs)
+            lim = limiter(name)
+            admitted = lim.try_acquire()
+            if not admitted:
+                log.debug("concurrency.shed name=%s limit=%s", name, int(lim.limit))
+                resp = JsonResponse({"detail": "Server busy, retry later."}, status=503)
+                resp["Retry-After"] = str(lim.retry_after())
+                return resp
+            t0, c0 = time.perf_counter(), time.thread_time()
+            failed = True
+            try:
+                response = dispatch(self, request, *args, **kwargs)
+                failed = response.status_code >= 500
+                return response
+            finally:
+                lim.release(time.perf_counter() - t0, time.thread_time() - c0, admitted, failed)
+
+        cls.dispatch = limited_dispatch
+        return cls
+
+    return decorate
@@ -2,6 +2,7 @@ from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 from django.contrib.auth import get_user_model
 from .jwt import verify_jwt
+from .services import get_user
 import logging
 log = logging.getLogger("authn.drf_auth")
 User = get_user_model()
@@ -21,10 +22,9 @@ class JWTHeaderAuthentication(BaseAuthentication):
             log.info("access JWT invalid/expired")
             raise AuthenticationFailed("Invalid or expired token")
         sub = payload.get("sub")
-        try:
-            user = User.objects.get(pk=int(sub))
-        except Exception:
-            log.info("inactive user id=%s", user.id)
+        user = get_user(sub)
+        if user is None:
+            log.info("user not found id=%s", sub)
             raise AuthenticationFailed("User not found")
         if not user.is_active:
             raise AuthenticationFailed("User inactive")
@@ -0,0 +1,110 @@
+"""
+Forward-auth for a reverse proxy (nginx `auth_request`, Traefik/Envoy ext-auth).
+
+    GET <FORWARD_AUTH_PATH>?element=items&action=update&owner=42
+    Authorization: Bearer <access>
+
+-> 200 (+ X-Auth-User-Id / X-Auth-User-Email), 401 (no/invalid token, inactive user)
+   or 403 (RBAC denies). element/action/owner may also come as X-Auth-Element /
+   X-Auth-Action / X-Auth-Owner headers. Without an element only identity is checked.
+
+`ForwardAuthWSGI` answers that path before Django's handler (no middleware, no DRF);
+`forward_auth` is the same check as a plain Django view for ASGI deployments.
+"""
+from __future__ import annotations
+import os
+from typing import List, Optional, Tuple
+from urllib.parse import parse_qs
+from django.core import signals
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+
+from accesscontrol.services import has_permission
+from .coherency import sync
+from .jwt import verify_jwt
+from .services import get_user
+import logging
+log = logging.getLogger("authn.gateway")
+
+FORWARD_AUTH_PATH = os.getenv("FORWARD_AUTH_PATH", "/api/auth/forward/")
+ACTIONS = frozenset({"read", "create", "update", "delete"})
+
+Headers = List[Tuple[str, str]]
+
+
+def _bearer(raw: Optional[str]) -> str:
+    if not raw:
+        return ""
+    parts = raw.strip().split()
+    if len(parts) != 2 or parts[0].lower() != "bearer":
+        return ""
+    return parts[1].strip().strip('"').strip("'")
+
+
+def decide(authorization: Optional[str], element: str, action: str, owner: str) -> Tuple[int, Headers]:
+    """Core allow/deny decision shared by the WSGI fast path and the Django view."""
+    payload = verify_jwt(_bearer(authorization)) if authorization else None
+    if not payload:
+        return 401, [("WWW-Authenticate", 'Bearer error="invalid_token"')]
+    user = get_user(payload.get("sub"))
+    if user is None or not user.is_active:
+        return 401, [("WWW-Authenticate", 'Bearer error="invalid_token"')]
+    identity = [("X-Auth-User-Id", str(user.id)), ("X-Auth-User-Email", user.email)]
+    if element:
+        action = action or "read"
+        if action not in ACTIONS:
+            return 400, []
+        try:
+            owner_id = int(owner) if owner else None
+        except ValueError:
+            return 400, []
+        if not has_permission(user, element, action, owner_id=owner_id):
+            log.debug("forward.deny user_id=%s element=%s action=%s", user.id, element, action)
+            return 403, identity
+    return 200, identity
+
+
+_REASONS = {200: "200 OK", 400: "400 Bad Request", 401: "401 Unauthorized", 403: "403 Forbidden"}
+
+
+class ForwardAuthWSGI:
+    """Wraps the Django WSGI app; serves FORWARD_AUTH_PATH itself, passes everything else through."""
+
+    def __init__(self, app, path: str = FORWARD_AUTH_PATH):
+        self.app = app
+        self.path = path
+
+    def __call__(self, environ, start_response):
+        if environ.get("PATH_INFO") != self.path:
+            return self.app(environ, start_response)
+        # keep Django's per-request housekeeping (DB connection age, router pinning)
+        signals.request_started.send(sender=self.__class__, environ=environ)
+        try:
+            sync()
+            q = parse_qs(environ.get("QUERY_STRING", ""))
+            status, headers = decide(
+                environ.get("HTTP_AUTHORIZATION"),
+                (q.get("element") or [environ.get("HTTP_X_AUTH_ELEMENT", "")])[0],
+                (q.get("action") or [environ.get("HTTP_X_AUTH_ACTION", "")])[0],
+                (q.get("owner") or [environ.get("HTTP_X_AUTH_OWNER", "")])[0],
+            )
+        finally:
+            signals.request_finished.send(sender=self.__class__)
+        start_response(_REASONS[status], headers + [("Content-Length", "0"), ("Cache-Control", "no-store")])
+        return [b""]
+
+
+@csrf_exempt
+def forward_auth(request):
+    q = request.GET
+    status, headers = decide(
+        request.META.get("HTTP_AUTHORIZATION"),
+        q.get("element") or request.META.get("HTTP_X_AUTH_ELEMENT", ""),
+        q.get("action") or request.META.get("HTTP_X_AUTH_ACTION", ""),
+        q.get("owner") or request.META.get("HTTP_X_AUTH_OWNER", ""),
+    )
+    resp = HttpResponse(status=status)
+    for k, v in headers:
+        resp[k] = v
+    resp["Cache-Control"] = "no-store"
+    return resp
@@ -0,0 +1,16 @@
+from __future__ import annotations
+from django.contrib.auth.hashers import BCryptSHA256PasswordHasher
+
+from core.metrics import metrics
+
+
+class TimedBCryptSHA256PasswordHasher(BCryptSHA256PasswordHasher):
+    """BCryptSHA256 that records hash/verify time; same algorithm id, so stored hashes keep working."""
+
+    def encode(self, password, salt):
+        with metrics.timer("auth_password_hash_seconds"):
+            return super().encode(password, salt)
+
+    def verify(self, password, encoded):
+        with metrics.timer("auth_password_hash_seconds"):
+            return super().verify(password, encoded)
@@ -0,0 +1,243 @@
+"""
+Idempotency-Key support for retried POSTs.
+
+    POST /api/auth/refresh/
+    Idempotency-Key: 6f1c0e9a-...
+
+The first request with a given (caller, endpoint, key) runs the view; its response
+(status < 500) is stored for IDEMPOTENCY_TTL_SECONDS and replayed to retries with an
+`Idempotent-Replayed: true` header. The caller is the authenticated user id, or the
+client IP for anonymous endpoints. Concurrent duplicates wait for the first request
+instead of running the view again. Reusing a key with a different body -> 422.
+
+Storage is a per-worker LRU; IDEMPOTENCY_STORE=db adds the shared `IdempotencyRecord`
+table so retries that land on another worker are coalesced too. Bodies are fingerprinted
+with an HMAC keyed by SECRET_KEY. Token-bearing responses (login, refresh) stay in worker
+memory; the table only records that they completed.
+"""
+from __future__ import annotations
+import os
+import json
+import time
+import hmac
+import hashlib
+import threading
+from datetime import timedelta
+from functools import wraps
+from typing import Any, Dict, Hashable, Optional, Tuple
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.db_router import use_primary
+from .coherency import LocalCache
+import logging
+log = logging.getLogger("authn.idempotency")
+
+IDEMPOTENCY_STORE = os.getenv("IDEMPOTENCY_STORE", "local")  # "local" | "db"
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "600"))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+IDEMPOTENCY_LOCK_SECONDS = float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "30"))  # stale in-flight claim in the DB
+MAX_KEY_LENGTH = 255
+_FINGERPRINT_KEY = hashlib.sha256(b"idempotency-fingerprint:" + settings.SECRET_KEY.encode("utf-8")).digest()
+_NOT_STORED = object()  # DB marker of a credential-bearing response
+
+# (fingerprint, status, data, headers)
+Stored = Tuple[str, int, Any, Tuple[Tuple[str, str], ...]]
+
+# not tied to a CacheVersion row: entries only expire or get evicted
+_responses = LocalCache("idempotency", maxsize=IDEMPOTENCY_CACHE_SIZE, ttl=IDEMPOTENCY_TTL_SECONDS)
+_lock = threading.Lock()
+_inflight: Dict[Hashable, "_Flight"] = {}
+_stores = 0
+
+
+class _Flight:
+    __slots__ = ("event", "result")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Optional[Stored] = None
+
+
+class _InProgress(Exception):
+    pass
+
+
+def _scope(request) -> str:
+    user = getattr(request, "user", None)
+    if user is not None and getattr(user, "is_authenticated", False):
+        return f"u:{user.id}"
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def _fingerprint(request) -> str:
+    # keyed: bodies carry passwords / refresh tokens, and the digest may be stored in the DB
+    body = json.dumps(request.data, sort_keys=True, default=str, separators=(",", ":"))
+    return hmac.new(_FINGERPRINT_KEY, body.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def _response(stored: Stored, fingerprint: str, replayed: bool) -> Response:
+    fp, code, data, headers = stored
+    if fp != fingerprint:
+        return Response({"detail": "Idempotency-Key was already used with a different request"},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+    if data is _NOT_STORED:
+        return Response({"detail": "A request with this Idempotency-Key was already processed; "
+                                   "its response held credentials and is not kept"},
+                        status=status.HTTP_409_CONFLICT)
+    resp = Response(data, status=code, headers=dict(headers))
+    if replayed:
+        resp["Idempotent-Replayed"] = "true"
+    return resp
+
+
+# --- shared store ---
+
+def _db_key(key: Tuple[str, str, str]) -> str:
+    return hashlib.sha256("\x1f".join(key).encode("utf-8")).hexdigest()
+
+
+def _db_claim(key: Tuple[str, str, str], fingerprint: str) -> Optional[Stored]:
+    """Insert an in-flight row (-> None) or return the finished response of another worker."""
+    from .models import IdempotencyRecord
+
+    pk = _db_key(key)
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+    with use_primary():
+        while True:
+            now = timezone.now()
+            try:
+                with transaction.atomic():
+                    IdempotencyRecord.objects.create(
+                        key=pk, fingerprint=fingerprint,
+                        expires_at=now + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS),
+                    )
+                return None
+            except IntegrityError:
+                pass
+            row = IdempotencyRecord.objects.filter(key=pk).first()
+            if row is None:
+                continue
+            if row.expires_at <= now:
+                # expired response or abandoned claim
+                IdempotencyRecord.objects.filter(key=pk, expires_at__lte=now).delete()
+                continue
+            if row.status is not None:
+                if not row.body:
+                    return row.fingerprint, row.status, _NOT_STORED, ()
+                return row.fingerprint, row.status, json.loads(row.body), tuple(map(tuple, json.loads(row.headers)))
+            if time.monotonic() >= deadline:
+                raise _InProgress
+            time.sleep(0.05)
+
+
+def _db_store(key: Tuple[str, str, str], stored: Stored, marker_only: bool = False) -> None:
+    global _stores
+    from .models import IdempotencyRecord
+
+    fp, code, data, headers = stored
+    now = timezone.now()
+    with use_primary():
+        IdempotencyRecord.objects.filter(key=_db_key(key)).update(
+            status=code,
+            body="" if marker_only else json.dumps(data, cls=DjangoJSONEncoder),
+            headers="" if marker_only else json.dumps(headers),
+            expires_at=now + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS),
+        )
+        _stores += 1
+        if _stores % 256 == 0:
+            IdempotencyRecord.objects.filter(expires_at__lte=now).delete()
+
+
+def _db_release(key: Tuple[str, str, str]) -> None:
+    from .models import IdempotencyRecord
+    with use_primary():
+        IdempotencyRecord.objects.filter(key=_db_key(key), status__isnull=True).delete()
+
+
+# --- decorator ---
+
+def idempotent(endpoint: str, credentials: bool = False):
+    """
+    Decorate an APIView handler (`def post(self, request)`) that returns a DRF Response.
+    `credentials=True`: responses carry tokens, so the DB store keeps only a "done" marker
+    and retries that reach another worker get 409 instead of a replay.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(view, request, *args, **kwargs):
+            raw = request.META.get("HTTP_IDEMPOTENCY_KEY")
+            if raw is None:
+                return func(view, request, *args, **kwargs)
+            raw = raw.strip()
+            if not raw or len(raw) > MAX_KEY_LENGTH:
+                return Response({"detail": f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters"},
+                                status=status.HTTP_400_BAD_REQUEST)
+            key = (_scope(request), endpoint, raw)
+            fingerprint = _fingerprint(request)
+
+            stored = _responses.get(key)
+            if stored is not None:
+                return _response(stored, fingerprint, replayed=True)
+
+            with _lock:
+                flight = _inflight.get(key)
+                leader = flight is None
+                if leader:
+                    flight = _inflight[key] = _Flight()
+            if not leader:
+                if not flight.event.wait(IDEMPOTENCY_WAIT_SECONDS):
+                    return _in_progress()
+                if flight.result is None:
+                    # first attempt failed (5xx / exception): this one runs it
+                    return wrapper(view, request, *args, **kwargs)
+                return _response(flight.result, fingerprint, replayed=True)
+
+            try:
+                if IDEMPOTENCY_STORE == "db":
+                    try:
+                        stored = _db_claim(key, fingerprint)
+                    except _InProgress:
+                        return _in_progress()
+                    if stored is not None:
+                        _responses.set(key, stored)
+                        flight.result = stored
+                        return _response(stored, fingerprint, replayed=True)
+                try:
+                    resp = func(view, request, *args, **kwargs)
+                except Exception:
+                    if IDEMPOTENCY_STORE == "db":
+                        _db_release(key)
+                    raise
+                if not isinstance(resp, Response) or resp.status_code >= 500:
+                    if IDEMPOTENCY_STORE == "db":
+                        _db_release(key)
+                    return resp
+                # Content-Type is set again by the renderer on replay
+                headers = tuple((k, v) for k, v in resp.items() if k.lower() != "content-type")
+                stored = (fingerprint, resp.status_code, resp.data, headers)
+                _responses.set(key, stored)
+                if IDEMPOTENCY_STORE == "db":
+                    _db_store(key, stored, marker_only=credentials)
+                flight.result = stored
+                return resp
+            finally:
+                with _lock:
+                    _inflight.pop(key, None)
+                flight.event.set()
+
+        return wrapper
+
+    return decorator
+
+
+def _in_progress() -> Response:
+    log.info("idempotency.in_progress")
+    return Response({"detail": "A request with this Idempotency-Key is still in progress"},
+                    status=status.HTTP_409_CONFLICT)
@@ -1,8 +1,7 @@
 from __future__ import annotations
 import os
 import datetime as dt
-from typing import Optional, Tuple, Dict, Any
-import jwt
+from typing import Optional, Tuple, Dict, Any, List
 
 JWT_SECRET = os.getenv("JWT_SECRET", "dev")
 JWT_ALG = os.getenv("JWT_ALG", "HS256")
@@ -13,11 +12,13 @@ def make_jwt(user_id: int) -> str:
     now = dt.datetime.utcnow()
     exp = now + dt.timedelta(minutes=JWT_EXPIRES_MIN)
     payload = {"sub": str(user_id), "iat": int(now.timestamp()), "exp": int(exp.timestamp())}
+    import jwt  # PyJWT is imported on first use: ~20 ms off worker boot and management commands
     token = jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALG)
     log.debug("jwt.issue sub=%s", user_id)
     return token if isinstance(token, str) else token.decode("utf-8")
 
 def verify_jwt(token: str) -> Optional[dict]:
+    import jwt
     try:
         return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
     except jwt.ExpiredSignatureError:
@@ -25,9 +26,22 @@ def verify_jwt(token: str) -> Optional[dict]:
     except jwt.InvalidTokenError:
         return None
 
+def verify_jwt_many(tokens: List[str]) -> List[Optional[dict]]:
+    """verify_jwt over a batch (same order); None for invalid/expired entries."""
+    import jwt
+    key, algorithms, decode = JWT_SECRET, [JWT_ALG], jwt.decode
+    out: List[Optional[dict]] = []
+    for token in tokens:
+        try:
+            out.append(decode(token, key, algorithms=algorithms))
+        except jwt.InvalidTokenError:  # includes ExpiredSignatureError
+            out.append(None)
+    return out
+
 # verbose checker to show the exact error/payload
 def verify_jwt_verbose(token: str) -> Dict[str, Any]:
     out: Dict[str, Any] = {"ok": False, "alg": JWT_ALG}
+    import jwt
     try:
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
         out["ok"] = True
@@ -0,0 +1,401 @@
+from __future__ import annotations
+import io
+import sys
+import itertools
+import json
+import time
+import asyncio
+import logging
+import threading
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from authn import concurrency as limits
+from authn.jwt import make_jwt
+from authn.services import issue_refresh_token
+from .bench_db import _pct
+
+User = get_user_model()
+
+PASSWORD = "Passw0rd!"
+PRINCIPALS = {"user": "bench-user@bench.test", "manager": "bench-manager@bench.test", "admin": "bench-admin@bench.test"}
+SLOW = ("register", "login")  # bcrypt-bound; run --slow-requests of them
+
+# (method, path, json body or None, role whose access token to send or None)
+Request = Tuple[str, str, Optional[dict], Optional[str]]
+
+
+class Scenario(NamedTuple):
+    expect: int
+    build: Callable[[Dict[str, Any], Dict[str, Any], int], Request]  # (ctx, worker state, i)
+    after: Optional[Callable[[Dict[str, Any], bytes], None]] = None
+
+
+def _set_refresh(state: Dict[str, Any], body: bytes) -> None:
+    state["refresh"] = json.loads(body)["refresh"]
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "register": Scenario(201, lambda c, s, i: (
+        "POST", "/api/auth/register/",
+        {"email": f"bench-reg-{c['run']}-{next(c['seq'])}@bench.test", "password": PASSWORD, "password2": PASSWORD}, None)),
+    "login": Scenario(200, lambda c, s, i: (
+        "POST", "/api/auth/login/", {"email": PRINCIPALS["user"], "password": PASSWORD}, None)),
+    "refresh": Scenario(200, lambda c, s, i: (
+        "POST", "/api/auth/refresh/", {"refresh": s["refresh"]}, None), after=_set_refresh),
+    "me_get": Scenario(200, lambda c, s, i: ("GET", "/api/auth/me/", None, "user")),
+    "me_patch": Scenario(200, lambda c, s, i: ("PATCH", "/api/auth/me/", {"first_name": f"Bench{i % 10}"}, "user")),
+    "items_own": Scenario(200, lambda c, s, i: ("GET", "/api/mock/items/", None, "user")),
+    "items_all": Scenario(200, lambda c, s, i: ("GET", "/api/mock/items/", None, "manager")),
+    "item_update": Scenario(200, lambda c, s, i: (
+        "PUT", f"/api/mock/items/{c['item_id']}/", {"name": f"bench {i % 10}"}, "user")),
+    "permissions": Scenario(200, lambda c, s, i: ("GET", "/api/rbac/me/permissions/", None, "user")),
+    "forward_auth": Scenario(200, lambda c, s, i: (
+        "GET", f"/api/auth/forward/?element=items&action=read&owner={c['user_id']}", None, "user")),
+    "directory": Scenario(200, lambda c, s, i: ("GET", "/api/users/?limit=50", None, "admin")),
+    "rbac_roles": Scenario(200, lambda c, s, i: ("GET", "/api/rbac/roles/", None, "admin")),
+    "rbac_elements": Scenario(200, lambda c, s, i: ("GET", "/api/rbac/elements/", None, "admin")),
+    "rbac_rules": Scenario(200, lambda c, s, i: ("GET", "/api/rbac/rules/", None, "admin")),
+}
+
+# --- queries per request ---
+
+_queries: ContextVar[Optional[List[int]]] = ContextVar("bench_queries", default=None)
+
+
+def _count_queries(execute, sql, params, many, context):
+    counter = _queries.get()
+    if counter is not None:
+        counter[0] += 1
+    return execute(sql, params, many, context)
+
+
+def _instrument(connection=None, **kwargs) -> None:
+    for conn in [connection] if connection is not None else connections.all():
+        if _count_queries not in conn.execute_wrappers:
+            conn.execute_wrappers.append(_count_queries)
+
+
+# --- in-process drivers ---
+
+def _host() -> str:
+    hosts = [h for h in settings.ALLOWED_HOSTS if h and not h.startswith(".") and h != "*"]
+    return hosts[0] if hosts else "localhost"
+
+
+def _encode(body: Optional[dict]) -> bytes:
+    return json.dumps(body).encode("utf-8") if body is not None else b""
+
+
+def call_wsgi(app, method: str, path: str, body: Optional[dict], token: Optional[str],
+              headers: Optional[Dict[str, str]] = None) -> Tuple[int, bytes]:
+    data = _encode(body)
+    path, _, query = path.partition("?")
+    environ = {
+        "REQUEST_METHOD": method, "PATH_INFO": path, "SCRIPT_NAME": "", "QUERY_STRING": query,
+        "SERVER_NAME": _host(), "SERVER_PORT": "80", "SERVER_PROTOCOL": "HTTP/1.1",
+        "REMOTE_ADDR": "127.0.0.1", "HTTP_HOST": _host(), "HTTP_ACCEPT": "application/json",
+        "CONTENT_TYPE": "application/json", "CONTENT_LENGTH": str(len(data)),
+        "wsgi.version": (1, 0), "wsgi.url_scheme": "http", "wsgi.input": io.BytesIO(data),
+        "wsgi.errors": sys.stderr, "wsgi.multithread": True, "wsgi.multiprocess": False, "wsgi.run_once": False,
+    }
+    if token:
+        environ["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+    for name, value in (headers or {}).items():
+        environ[f"HTTP_{name.upper().replace('-', '_')}"] = value
+    status = [0]
+
+    def start_response(s, headers, exc_info=None):
+        status[0] = int(s.split()[0])
+
+    result = app(environ, start_response)
+    try:
+        content = b"".join(result)
+    finally:
+        close = getattr(result, "close", None)
+        if close:
+            close()
+    return status[0], content
+
+
+async def call_asgi(app, method: str, path: str, body: Optional[dict], token: Optional[str]) -> Tuple[int, bytes]:
+    data = _encode(body)
+    path, _, query = path.partition("?")
+    headers = [(b"host", _host().encode()), (b"accept", b"application/json"),
+               (b"content-type", b"application/json"), (b"content-length", str(len(data)).encode())]
+    if token:
+        headers.append((b"authorization", f"Bearer {token}".encode()))
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method, "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": query.encode(), "root_path": "",
+        "headers": headers, "client": ("127.0.0.1", 0), "server": (_host(), 80),
+    }
+    sent = False
+    status, chunks = [0], []
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": data, "more_body": False}
+        await asyncio.Future()  # never disconnects; cancelled once the response is sent
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status[0] = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status[0], b"".join(chunks)
+
+
+# --- runner ---
+
+def _summary(latencies: List[float], queries: List[int], errors: int, elapsed: float) -> Dict[str, Any]:
+    n = len(latencies)
+    return {
+        "requests": n,
+        "errors": errors,
+        "rps": round(n / elapsed, 1) if elapsed else 0.0,
+        **{f"{k}_ms": v for k, v in _pct(latencies).items()},
+        "queries_per_request": round(sum(queries) / n, 2) if n else 0.0,
+    }
+
+
+def _one(ctx, state, scenario: Scenario, i: int):
+    method, path, body, role = scenario.build(ctx, state, i)
+    return method, path, body, ctx["tokens"].get(role) if role else None
+
+
+def run_wsgi(app, ctx, scenario: Scenario, total: int, concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    queries: List[int] = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def worker(n: int, count: int):
+        state = ctx["states"][n]
+        lat, qs, err = [], [], 0
+        try:
+            # connect first: per-connection setup (PRAGMAs) is not a per-request query
+            for conn in connections.all():
+                conn.ensure_connection()
+            _instrument()
+            for i in range(count):
+                method, path, body, token = _one(ctx, state, scenario, i)
+                counter = [0]
+                reset = _queries.set(counter)
+                t0 = time.perf_counter()
+                try:
+                    code, content = call_wsgi(app, method, path, body, token)
+                finally:
+                    lat.append(time.perf_counter() - t0)
+                    _queries.reset(reset)
+                qs.append(counter[0])
+                if code != scenario.expect:
+                    err += 1
+                elif scenario.after:
+                    scenario.after(state, content)
+        finally:
+            connections.close_all()
+        with lock:
+            latencies.extend(lat)
+            queries.extend(qs)
+            errors[0] += err
+
+    shares = [total // concurrency + (1 if n < total % concurrency else 0) for n in range(concurrency)]
+    threads = [threading.Thread(target=worker, args=(n, c)) for n, c in enumerate(shares) if c]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return _summary(latencies, queries, errors[0], time.perf_counter() - t0)
+
+
+def run_asgi(app, ctx, scenario: Scenario, total: int, concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    queries: List[int] = []
+    errors = [0]
+
+    async def worker(n: int, count: int):
+        state = ctx["states"][n]
+        for i in range(count):
+            method, path, body, token = _one(ctx, state, scenario, i)
+            counter = [0]
+            _queries.set(counter)  # each task runs in its own context copy
+            t0 = time.perf_counter()
+            code, content = await call_asgi(app, method, path, body, token)
+            latencies.append(time.perf_counter() - t0)
+            queries.append(counter[0])
+            if code != scenario.expect:
+                errors[0] += 1
+            elif scenario.after:
+                scenario.after(state, content)
+
+    async def main():
+        shares = [total // concurrency + (1 if n < total % concurrency else 0) for n in range(concurrency)]
+        await asyncio.gather(*(worker(n, c) for n, c in enumerate(shares) if c))
+
+    t0 = time.perf_counter()
+    asyncio.run(main())
+    elapsed = time.perf_counter() - t0
+    return _summary(latencies, queries, errors[0], elapsed)
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float) -> List[str]:
+    """Regressions vs. a stored run: slower p95, lower throughput, more queries or new errors."""
+    out = []
+    for server, scenarios in results.items():
+        for name, cur in scenarios.items():
+            base = baseline.get(server, {}).get(name)
+            if not base:
+                continue
+            label = f"{server}.{name}"
+            if cur["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+                out.append(f"{label}: p95 {cur['p95_ms']}ms > baseline {base['p95_ms']}ms")
+            if cur["rps"] < base["rps"] * (1 - tolerance):
+                out.append(f"{label}: {cur['rps']} req/s < baseline {base['rps']} req/s")
+            if cur["queries_per_request"] > base["queries_per_request"] + 0.5:
+                out.append(f"{label}: {cur['queries_per_request']} queries/request > baseline {base['queries_per_request']}")
+            if cur["errors"] > base.get("errors", 0):
+                out.append(f"{label}: {cur['errors']} errors (baseline {base.get('errors', 0)})")
+    return out
+
+
+def _test_database() -> bool:
+    """True for Django's test databases and in-memory SQLite."""
+    name = str(connections["default"].settings_dict["NAME"])
+    return name.startswith("test_") or name == ":memory:" or "mode=memory" in name
+
+
+class Command(BaseCommand):
+    help = "Drive core.wsgi / core.asgi in-process for every API endpoint; JSON report, optional baseline comparison."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--server", choices=("wsgi", "asgi", "both"), default="wsgi")
+        parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated scenario names.")
+        parser.add_argument("--concurrency", type=int, default=8, help="Threads (wsgi) / tasks (asgi).")
+        parser.add_argument("--requests", type=int, default=400, help="Requests per scenario.")
+        parser.add_argument("--slow-requests", type=int, default=40, help=f"Requests for bcrypt-bound scenarios ({', '.join(SLOW)}).")
+        parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests per scenario first.")
+        parser.add_argument("--dataset", type=int, default=0, help="Ensure at least N synthetic users (seed_demo --users).")
+        parser.add_argument("--items-per-user", type=int, default=0,
+                            help="Mock items per synthetic user (mockbiz keeps items in this process's memory).")
+        parser.add_argument("--baseline", default=None, help="JSON from a previous run (--save-baseline) to compare against.")
+        parser.add_argument("--save-baseline", default=None, help="Write this run's results to a file.")
+        parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative p95/throughput drift.")
+        parser.add_argument("--with-limits", action="store_true",
+                            help="Keep adaptive concurrency limits on (503s then count as errors).")
+        parser.add_argument("--allow-any-database", action="store_true",
+                            help="Run even with DEBUG off against a non-test database (creates and removes "
+                                 "bench-*@bench.test principals, one with the admin role).")
+
+    def handle(self, *args, **opts):
+        names = [s.strip() for s in opts["scenarios"].split(",") if s.strip()]
+        unknown = [s for s in names if s not in SCENARIOS]
+        if unknown:
+            raise CommandError(f"unknown scenarios: {', '.join(unknown)} (choices: {', '.join(SCENARIOS)})")
+        if not (settings.DEBUG or _test_database() or opts["allow_any_database"]):
+            raise CommandError("refusing to create bench principals (one is an admin) with DEBUG off outside a "
+                               "test database; pass --allow-any-database to run anyway")
+        concurrency = max(1, opts["concurrency"])
+        baseline = None
+        if opts["baseline"]:
+            baseline = json.loads(Path(opts["baseline"]).read_text())
+            baseline = baseline.get("results", baseline)
+
+        self._dataset(opts["dataset"])
+        servers = ("wsgi", "asgi") if opts["server"] == "both" else (opts["server"],)
+
+        ctx: Dict[str, Any] = {}
+        connection_created.connect(_instrument, dispatch_uid="bench_api.queries")
+        # expected 4xx would otherwise be logged as warnings per request
+        req_log = logging.getLogger("django.request")
+        level = req_log.level
+        req_log.setLevel(logging.ERROR)
+        limiting = limits.CONCURRENCY_LIMITING
+        limits.CONCURRENCY_LIMITING = limiting and opts["with_limits"]  # measure the code, not the shedding
+        results: Dict[str, Dict[str, Any]] = {}
+        try:
+            ctx = self._context(concurrency, opts["items_per_user"])
+            for server in servers:
+                app = self._app(server)
+                run = run_wsgi if server == "wsgi" else run_asgi
+                results[server] = {}
+                for name in names:
+                    scenario = SCENARIOS[name]
+                    total = opts["slow_requests"] if name in SLOW else opts["requests"]
+                    if opts["warmup"]:
+                        run(app, ctx, scenario, min(opts["warmup"], total), 1)
+                    results[server][name] = r = run(app, ctx, scenario, total, concurrency)
+                    self.stderr.write(f"{server} {name}: {r['rps']} req/s p95={r['p95_ms']}ms "
+                                      f"q/req={r['queries_per_request']} errors={r['errors']}")
+        finally:
+            limits.CONCURRENCY_LIMITING = limiting
+            req_log.setLevel(level)
+            connection_created.disconnect(dispatch_uid="bench_api.queries")
+            # principals and registrations are per run: nothing with a known password outlives it
+            User.objects.filter(email__in=PRINCIPALS.values()).delete()
+            if ctx:
+                User.objects.filter(email__startswith=f"bench-reg-{ctx['run']}-").delete()
+
+        report = {
+            "config": {k: opts[k] for k in ("server", "concurrency", "requests", "slow_requests", "dataset", "items_per_user")},
+            "dataset": {"users": User.objects.count()},
+            "results": results,
+        }
+        if baseline is not None:
+            report["regressions"] = compare(results, baseline, opts["tolerance"])
+        if opts["save_baseline"]:
+            Path(opts["save_baseline"]).write_text(json.dumps(report, indent=2))
+        self.stdout.write(json.dumps(report, indent=2))
+        if report.get("regressions"):
+            raise CommandError(f"{len(report['regressions'])} regression(s) against {opts['baseline']}")
+
+    def _dataset(self, users: int) -> None:
+        # seed_demo numbers its users, so asking for N again only inserts the missing ones
+        if users > User.objects.filter(email__endswith="@load.test").count():
+            call_command("seed_demo", users=users, stdout=self.stderr)
+
+    def _context(self, concurrency: int, items_per_user: int = 0) -> Dict[str, Any]:
+        from accesscontrol.models import Role
+        from mockbiz.views import _items, _id_gen, _changed, _ensure_seed_for_user
+
+        call_command("seed_demo", stdout=io.StringIO())  # roles/elements/rules
+        users = {}
+        for role, email in PRINCIPALS.items():
+            u = User.objects.filter(email=email).first() or User.objects.create_user(email=email, password=PASSWORD)
+            Role.objects.get(name=role).users.add(u)
+            users[role] = u
+        _ensure_seed_for_user(users["user"].id)
+        if items_per_user:
+            for uid in User.objects.filter(email__endswith="@load.test").values_list("id", flat=True).iterator():
+                _items.extend({"id": next(_id_gen), "owner_id": uid, "name": f"Load item {k} (user {uid})"}
+                              for k in range(items_per_user))
+            _changed()
+        item_id = next(it["id"] for it in _items if it["owner_id"] == users["user"].id)
+        return {
+            "run": int(time.time()),
+            "seq": itertools.count(),  # unique registration emails across warmup/threads
+            "user_id": users["user"].id,
+            "tokens": {role: make_jwt(u.id) for role, u in users.items()},
+            "item_id": item_id,
+            # one refresh-token chain per worker (rotation is per token family)
+            "states": [{"n": n, "refresh": issue_refresh_token(users["user"])[0]} for n in range(concurrency)],
+        }
+
+    def _app(self, server: str):
+        if server == "wsgi":
+            from core.wsgi import application
+        else:
+            from core.asgi import application
+        return application
@@ -0,0 +1,110 @@
+from __future__ import annotations
+import json
+import time
+import threading
+from statistics import quantiles
+from typing import Dict, List
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+
+from core import db_profiles
+
+User = get_user_model()
+
+
+def _pct(samples: List[float]) -> Dict[str, float]:
+    if len(samples) < 2:
+        v = round(samples[0] * 1000, 2) if samples else 0.0
+        return {"p50": v, "p95": v, "p99": v}
+    q = quantiles(samples, n=100, method="inclusive")
+    return {"p50": round(q[49] * 1000, 2), "p95": round(q[94] * 1000, 2), "p99": round(q[98] * 1000, 2)}
+
+
+def _worker(email: str, password: str, refreshes: int, rounds: int, out: Dict[str, list], lock: threading.Lock):
+    c = Client()
+    login_t, refresh_t, errors = [], [], 0
+    try:
+        for _ in range(rounds):
+            t0 = time.perf_counter()
+            r = c.post("/api/auth/login/", {"email": email, "password": password}, content_type="application/json")
+            login_t.append(time.perf_counter() - t0)
+            if r.status_code != 200:
+                errors += 1
+                continue
+            token = r.json()["refresh"]
+            for _ in range(refreshes):
+                t0 = time.perf_counter()
+                r = c.post("/api/auth/refresh/", {"refresh": token}, content_type="application/json")
+                refresh_t.append(time.perf_counter() - t0)
+                if r.status_code != 200:
+                    errors += 1
+                    break
+                token = r.json()["refresh"]
+    except Exception:
+        errors += 1
+    finally:
+        connections.close_all()
+    with lock:
+        out["login"].extend(login_t)
+        out["refresh"].extend(refresh_t)
+        out["errors"].append(errors)
+
+
+class Command(BaseCommand):
+    help = "Compare login/refresh throughput across DB profiles (core/db_profiles.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--profiles", default=",".join(db_profiles.PROFILES), help="Comma-separated profile names.")
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--rounds", type=int, default=3, help="Logins per thread.")
+        parser.add_argument("--refreshes", type=int, default=20, help="Refresh rotations after each login.")
+        parser.add_argument("--password", default="Passw0rd!", help="Password shared by the benchmark users.")
+        parser.add_argument("--email-suffix", default="@load.test", help="Pick users whose email ends with this (seed_demo --users).")
+
+    def handle(self, *args, **opts):
+        names = [p.strip() for p in opts["profiles"].split(",") if p.strip()]
+        for name in names:
+            db_profiles.profile(name)  # validate early
+        emails = list(
+            User.objects.filter(is_active=True, email__endswith=opts["email_suffix"])
+            .order_by("id").values_list("email", flat=True)[:opts["threads"]]
+        )
+        if not emails:
+            raise CommandError(f"No active users matching *{opts['email_suffix']}; run seed_demo --users N first")
+
+        previous = db_profiles.active_profile()
+        results = {}
+        try:
+            for name in names:
+                db_profiles.activate(name)
+                out: Dict[str, list] = {"login": [], "refresh": [], "errors": []}
+                lock = threading.Lock()
+                threads = [
+                    threading.Thread(
+                        target=_worker,
+                        args=(emails[i % len(emails)], opts["password"], opts["refreshes"], opts["rounds"], out, lock),
+                    )
+                    for i in range(opts["threads"])
+                ]
+                t0 = time.perf_counter()
+                for t in threads:
+                    t.start()
+                for t in threads:
+                    t.join()
+                elapsed = time.perf_counter() - t0
+                ops = len(out["login"]) + len(out["refresh"])
+                results[name] = {
+                    "seconds": round(elapsed, 3),
+                    "ops_per_sec": round(ops / elapsed, 1) if elapsed else 0.0,
+                    "logins": len(out["login"]),
+                    "refreshes": len(out["refresh"]),
+                    "errors": sum(out["errors"]),
+                    "login_ms": _pct(out["login"]),
+                    "refresh_ms": _pct(out["refresh"]),
+                }
+                self.stderr.write(f"{name}: {results[name]['ops_per_sec']} ops/s, errors={results[name]['errors']}")
+        finally:
+            db_profiles.activate(previous)
+        self.stdout.write(json.dumps(results, indent=2))
@@ -0,0 +1,237 @@
+from __future__ import annotations
+import json
+import time
+import threading
+import itertools
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from authn.jwt import make_jwt
+from authn.services import issue_refresh_token
+from .bench_api import call_wsgi
+from .bench_db import _pct
+
+User = get_user_model()
+
+INVALID_TOKEN = "invalid.replay.token"
+
+
+def load(paths: List[str], limit: int = 0) -> List[Dict[str, Any]]:
+    """Envelopes from files or directories (incl. rotated traffic-*.jsonl.N), ordered by time."""
+    files: List[Path] = []
+    for p in map(Path, paths):
+        files.extend(sorted(p.glob("traffic-*.jsonl*")) if p.is_dir() else [p])
+    envs = []
+    for f in files:
+        with f.open() as fh:
+            envs.extend(json.loads(line) for line in fh if line.strip())
+    envs.sort(key=lambda e: e["ts"])
+    return envs[:limit] if limit else envs
+
+
+class Remapper:
+    """Maps recorded pseudonyms onto seeded users and live refresh tokens (thread-safe)."""
+
+    def __init__(self, pool: List[Tuple[int, str]], password: str, run: str):
+        self.pool = pool
+        self.password = password
+        self.run = run
+        self._lock = threading.Lock()
+        self._users: Dict[str, Tuple[int, str]] = {}
+        self._access: Dict[str, str] = {}
+        self._refresh: Dict[str, str] = {}
+        self._next = itertools.count()
+
+    def user(self, pseudonym: str) -> Tuple[int, str]:
+        with self._lock:
+            if pseudonym not in self._users:
+                self._users[pseudonym] = self.pool[next(self._next) % len(self.pool)]
+            return self._users[pseudonym]
+
+    def access(self, identity: Optional[str]) -> Optional[str]:
+        if identity is None:
+            return None
+        if identity == "invalid":
+            return INVALID_TOKEN
+        token = self._access.get(identity)
+        if token is None:
+            token = self._access[identity] = make_jwt(self.user(identity)[0])
+        return token
+
+    def refresh(self, pseudonym: str) -> str:
+        with self._lock:
+            token = self._refresh.get(pseudonym)
+        if token is None:
+            # chain started before the recording: start a fresh one for some seeded user
+            uid, _ = self.user(f"rt-owner:{pseudonym}")
+            token = issue_refresh_token(User(pk=uid))[0]
+            with self._lock:
+                token = self._refresh.setdefault(pseudonym, token)
+        return token
+
+    def issued(self, pseudonym: str, body: bytes) -> None:
+        try:
+            token = json.loads(body).get("refresh")
+        except (ValueError, AttributeError):
+            return
+        if isinstance(token, str):
+            with self._lock:
+                self._refresh[pseudonym] = token
+
+    def fill(self, value: Any, env: Dict[str, Any]) -> Any:
+        """Rebuild a concrete body from its recorded shape."""
+        if isinstance(value, dict):
+            if "<bytes>" in value:
+                return None
+            return {k: self.fill(v, env) for k, v in value.items()}
+        if isinstance(value, list):
+            items = [self.fill(v, env) for v in value if not (isinstance(v, str) and v.startswith("..."))]
+            more = next((int(v[3:]) for v in value if isinstance(v, str) and v.startswith("...")), 0)
+            return items + items[-1:] * max(0, more - len(items))
+        if not isinstance(value, str):
+            return value
+        if value == "<secret>":
+            return self.password if env["status"] < 400 else "wrong-password"
+        if value.startswith("rt:"):
+            return self.refresh(value)
+        if value.startswith("email:"):
+            if "register" in env["route"]:
+                return f"replay-{self.run}-{next(self._next)}@replay.test"
+            identity = env.get("identity")
+            return self.user(identity if identity and identity.startswith("u:") else value)[1]
+        if value.startswith("<str:"):
+            return "x" * int(value[5:-1])
+        return {"<int>": 1, "<float>": 1.0}.get(value, value)
+
+    def request(self, env: Dict[str, Any]) -> Tuple[str, Optional[dict], Optional[str], Dict[str, str]]:
+        query = {}
+        for k, v in env.get("query", {}).items():
+            if v.startswith("u:"):
+                v = str(self.user(v)[0])
+            elif v.startswith("<str:"):
+                v = "x" * int(v[5:-1])
+            query[k] = v
+        path = env["path"] + ("?" + urlencode(query) if query else "")
+        body = self.fill(env["body"], env) if "body" in env else None
+        headers = {}
+        if env.get("idempotency_key"):
+            headers["Idempotency-Key"] = f"{self.run}-{env['idempotency_key']}"
+        return path, body, self.access(env.get("identity")), headers
+
+
+def call_http(base: str, method: str, path: str, body: Optional[dict], token: Optional[str],
+              headers: Dict[str, str]) -> Tuple[int, bytes]:
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    req = urllib.request.Request(base.rstrip("/") + path, data=data, method=method)
+    req.add_header("Content-Type", "application/json")
+    req.add_header("Accept", "application/json")
+    if token:
+        req.add_header("Authorization", f"Bearer {token}")
+    for k, v in headers.items():
+        req.add_header(k, v)
+    try:
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            return resp.status, resp.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+class Command(BaseCommand):
+    help = "Replay recorded traffic (TRAFFIC_RECORD_DIR) against core.wsgi in-process or a running server."
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", help="Recording files or directories.")
+        parser.add_argument("--target", default="wsgi", help='"wsgi" (in-process) or a base URL like http://127.0.0.1:8000.')
+        parser.add_argument("--speed", type=float, default=1.0,
+                            help="Time compression: 1 = recorded inter-arrival times, 10 = 10x faster, 0 = no pauses.")
+        parser.add_argument("--concurrency", type=int, default=32, help="Max requests in flight.")
+        parser.add_argument("--limit", type=int, default=0, help="Replay only the first N envelopes.")
+        parser.add_argument("--email-suffix", default="@load.test", help="Seeded users to map identities onto (seed_demo --users).")
+        parser.add_argument("--password", default="Passw0rd!", help="Password of the seeded users.")
+        parser.add_argument("--output", default=None, help="Also write the JSON report here.")
+
+    def handle(self, *args, **opts):
+        envs = load(opts["paths"], opts["limit"])
+        if not envs:
+            raise CommandError("No envelopes found")
+        pool = list(User.objects.filter(is_active=True, email__endswith=opts["email_suffix"])
+                    .order_by("id").values_list("id", "email")[:100000])
+        if not pool:
+            raise CommandError(f"No active users matching *{opts['email_suffix']}; run seed_demo --users N first")
+        remap = Remapper(pool, opts["password"], run=str(int(time.time())))
+
+        if opts["target"] == "wsgi":
+            from core.wsgi import application
+
+            def send(method, path, body, token, headers):
+                return call_wsgi(application, method, path, body, token, headers)
+        elif opts["target"].startswith(("http://", "https://")):
+            def send(method, path, body, token, headers):
+                return call_http(opts["target"], method, path, body, token, headers)
+        else:
+            raise CommandError('--target must be "wsgi" or an http(s) URL')
+
+        per_route: Dict[str, Dict[str, list]] = {}
+        lags: List[float] = []
+        lock = threading.Lock()
+
+        def replay(env: Dict[str, Any], due: float):
+            lag = time.perf_counter() - due
+            try:
+                path, body, token, headers = remap.request(env)
+                t0 = time.perf_counter()
+                code, content = send(env["method"], path, body, token, headers)
+                elapsed = time.perf_counter() - t0
+                if env.get("issues") and code < 300:
+                    remap.issued(env["issues"], content)
+            except Exception as e:
+                code, elapsed = 0, 0.0
+                self.stderr.write(f"replay failed {env['method']} {env['path']}: {e}")
+            with lock:
+                r = per_route.setdefault(f"{env['method']} {env['route']}", {"ms": [], "recorded": [], "mismatch": []})
+                r["ms"].append(elapsed)
+                r["recorded"].append(env.get("ms", 0) / 1000)
+                r["mismatch"].append(code != env["status"])
+                lags.append(lag)
+
+        speed = opts["speed"]
+        ts0 = envs[0]["ts"]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, opts["concurrency"])) as pool_ex:
+            for env in envs:
+                due = start + ((env["ts"] - ts0) / speed if speed > 0 else 0.0)
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool_ex.submit(replay, env, due)
+        elapsed = time.perf_counter() - start
+        connections.close_all()
+
+        report = {
+            "requests": len(envs),
+            "seconds": round(elapsed, 3),
+            "rps": round(len(envs) / elapsed, 1) if elapsed else 0.0,
+            "recorded_seconds": round(envs[-1]["ts"] - ts0, 3),
+            "speed": speed,
+            "schedule_lag_ms": _pct(lags),
+            "routes": {
+                route: {
+                    "requests": len(r["ms"]),
+                    "status_mismatches": sum(r["mismatch"]),
+                    "replay_ms": _pct(r["ms"]),
+                    "recorded_ms": _pct(r["recorded"]),
+                }
+                for route, r in sorted(per_route.items(), key=lambda kv: -len(kv[1]["ms"]))
+            },
+        }
+        out = json.dumps(report, indent=2)
+        if opts["output"]:
+            Path(opts["output"]).write_text(out)
+        self.stdout.write(out)
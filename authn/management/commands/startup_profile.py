@@ -0,0 +1,195 @@
+from __future__ import annotations
+import os
+import re
+import sys
+import json
+import subprocess
+from pathlib import Path
+from statistics import median
+from typing import Any, Dict, List, Optional
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Boot steps of a worker, run in a fresh interpreter. Phase markers go to stderr, interleaved
+# with -X importtime output, so every top-level import can be charged to its phase.
+PROBE = r"""
+import sys, time, json
+marks = {}
+def mark(name, t0):
+    marks[name] = time.perf_counter() - t0
+    sys.stderr.write(f"#phase {name}\n"); sys.stderr.flush()
+t = time.perf_counter()
+import django
+from django.conf import settings
+settings.INSTALLED_APPS
+mark("settings", t); t = time.perf_counter()
+django.setup()
+mark("apps", t)
+if "apps" != sys.argv[1]:
+    t = time.perf_counter()
+    from django.core.wsgi import get_wsgi_application
+    get_wsgi_application()
+    mark("middleware", t); t = time.perf_counter()
+    from django.urls import get_resolver
+    get_resolver().url_patterns
+    mark("urls", t)
+print(json.dumps(marks))
+"""
+
+PHASES = ("interpreter", "settings", "apps", "middleware", "urls")
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+
+
+def _run(stage: str, importtime: bool) -> Dict[str, Any]:
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", PROBE, stage]
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get("DJANGO_SETTINGS_MODULE", "core.settings"))
+    t0 = _now()
+    proc = subprocess.run(cmd, capture_output=True, text=True, cwd=str(settings.BASE_DIR), env=env)
+    wall = _now() - t0
+    if proc.returncode != 0:
+        raise CommandError(f"startup probe failed:\n{proc.stderr[-2000:]}")
+    phases = json.loads(proc.stdout.strip().splitlines()[-1])
+    phases["interpreter"] = max(0.0, wall - sum(phases.values()))
+    return {"wall": wall, "phases": phases, "stderr": proc.stderr}
+
+
+def _now() -> float:
+    import time
+    return time.perf_counter()
+
+
+def parse(stderr: str) -> List[Dict[str, Any]]:
+    """-X importtime output -> top-level nodes {name, self, cum, phase, children} (microseconds)."""
+    pending: Dict[int, List[dict]] = {}
+    roots: List[dict] = []
+    for line in stderr.splitlines():
+        if line.startswith("#phase "):
+            phase = line[7:].strip()
+            for node in pending.pop(0, []):
+                node["phase"] = phase
+                roots.append(node)
+            continue
+        m = LINE.match(line)
+        if not m:
+            continue
+        level = len(m.group(3)) // 2
+        node = {"name": m.group(4), "self": int(m.group(1)), "cum": int(m.group(2)),
+                "children": pending.pop(level + 1, [])}
+        pending.setdefault(level, []).append(node)
+    for node in pending.pop(0, []):
+        node["phase"] = "interpreter"
+        roots.append(node)
+    return roots
+
+
+def _walk(nodes: List[dict], parent: Optional[str] = None):
+    for node in nodes:
+        yield node, parent
+        yield from _walk(node["children"], node["name"])
+
+
+def _pkg(name: str) -> str:
+    return name.split(".", 1)[0]
+
+
+def local_apps() -> List[str]:
+    base = str(settings.BASE_DIR)
+    from django.apps import apps
+    return sorted({_pkg(a.name) for a in apps.get_app_configs() if a.path.startswith(base)} | {"core"})
+
+
+def by_app(roots: List[dict], apps: List[str]) -> Dict[str, Dict[str, float]]:
+    """Cumulative import cost first triggered by each local app (incl. the libraries it pulls in)."""
+    out = {a: {"ms": 0.0, "self_ms": 0.0, "modules": 0} for a in apps}
+    for node, parent in _walk(roots):
+        pkg = _pkg(node["name"])
+        if pkg not in out:
+            continue
+        out[pkg]["self_ms"] += node["self"] / 1000
+        out[pkg]["modules"] += 1
+        if parent is None or _pkg(parent) != pkg:
+            out[pkg]["ms"] += node["cum"] / 1000
+    return {a: {k: round(v, 2) if isinstance(v, float) else v for k, v in r.items()}
+            for a, r in sorted(out.items(), key=lambda kv: -kv[1]["ms"])}
+
+
+def by_package(roots: List[dict], top: int) -> Dict[str, float]:
+    """Own import time per top-level package (django, rest_framework, jwt, ...)."""
+    totals: Dict[str, float] = {}
+    for node, _ in _walk(roots):
+        totals[_pkg(node["name"])] = totals.get(_pkg(node["name"]), 0.0) + node["self"] / 1000
+    return {k: round(v, 2) for k, v in sorted(totals.items(), key=lambda kv: -kv[1])[:top]}
+
+
+def render_tree(roots: List[dict], min_ms: float, depth: int) -> List[str]:
+    lines: List[str] = []
+
+    def emit(nodes: List[dict], level: int):
+        for node in sorted(nodes, key=lambda n: -n["cum"]):
+            if node["cum"] / 1000 < min_ms:
+                continue
+            tag = f"  [{node['phase']}]" if level == 0 else ""
+            lines.append(f"{node['cum'] / 1000:9.1f} ms {'  ' * level}{node['name']}{tag}")
+            if level + 1 < depth:
+                emit(node["children"], level + 1)
+
+    emit(roots, 0)
+    return lines
+
+
+class Command(BaseCommand):
+    help = "Profile cold start of a worker in a fresh interpreter: phase timings, import tree, cost per app."
+    requires_system_checks = []  # measures a fresh interpreter; checks here would only add noise
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stage", choices=("apps", "wsgi"), default="wsgi",
+                            help='"apps" stops after django.setup() (management commands), "wsgi" also loads middleware and URLconf.')
+        parser.add_argument("--runs", type=int, default=5, help="Cold starts to time (median reported).")
+        parser.add_argument("--min-ms", type=float, default=2.0, help="Hide tree nodes cheaper than this.")
+        parser.add_argument("--depth", type=int, default=4, help="Tree depth shown.")
+        parser.add_argument("--top", type=int, default=15, help="Packages listed by own import time.")
+        parser.add_argument("--json", action="store_true", help="Print the JSON report instead of text.")
+        parser.add_argument("--output", default=None, help="Write the JSON report to this file.")
+        parser.add_argument("--baseline", default=None, help="JSON from a previous --output run to diff against.")
+
+    def handle(self, *args, **opts):
+        runs = [_run(opts["stage"], importtime=False) for _ in range(max(1, opts["runs"]))]
+        roots = parse(_run(opts["stage"], importtime=True)["stderr"])
+        phases = {p: round(median(r["phases"].get(p, 0.0) for r in runs) * 1000, 1)
+                  for p in PHASES if p in runs[0]["phases"]}
+        report = {
+            "stage": opts["stage"],
+            "runs": len(runs),
+            "wall_ms": round(median(r["wall"] for r in runs) * 1000, 1),
+            "phases_ms": phases,
+            "by_app": by_app(roots, local_apps()),
+            "by_package": by_package(roots, opts["top"]),
+        }
+        if opts["baseline"]:
+            base = json.loads(Path(opts["baseline"]).read_text())
+            report["delta_ms"] = {
+                "wall": round(report["wall_ms"] - base["wall_ms"], 1),
+                **{p: round(v - base["phases_ms"].get(p, 0.0), 1) for p, v in phases.items()},
+            }
+        if opts["output"]:
+            Path(opts["output"]).write_text(json.dumps(report, indent=2))
+        if opts["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        w = self.stdout.write
+        w(f"cold start ({report['stage']}, median of {report['runs']}): {report['wall_ms']} ms")
+        for p, v in phases.items():
+            delta = report.get("delta_ms", {}).get(p)
+            w(f"  {p:<12} {v:8.1f} ms" + (f"  ({delta:+.1f})" if delta is not None else ""))
+        if "delta_ms" in report:
+            w(f"  {'total':<12} {report['delta_ms']['wall']:+8.1f} ms vs {opts['baseline']}")
+        w("\nimport cost triggered per app (ms, own ms, modules):")
+        for app, r in report["by_app"].items():
+            w(f"  {app:<14} {r['ms']:8.1f} {r['self_ms']:8.1f} {r['modules']:5d}")
+        w("\nown import time per package (ms):")
+        for pkg, ms in report["by_package"].items():
+            w(f"  {pkg:<22} {ms:8.1f}")
+        w(f"\nimport tree (>= {opts['min_ms']} ms, depth {opts['depth']}):")
+        for line in render_tree(roots, opts["min_ms"], opts["depth"]):
+            w(line)
@@ -1,9 +1,13 @@
 # authn/middleware.py
 from __future__ import annotations
+import time
 import logging
 from django.contrib.auth import get_user_model
 from django.utils.deprecation import MiddlewareMixin
 from .jwt import verify_jwt, JWT_SECRET, JWT_ALG  # we will log alg/secret length for sanity
+from .coherency import sync
+from .services import get_user
+from . import traffic, profiling
 
 logger = logging.getLogger("authn.middleware")
 User = get_user_model()
@@ -20,13 +24,39 @@ def _user_from_token(token: str):
     payload = verify_jwt(token)
     if not payload:
         return None, None
-    sub = payload.get("sub")
-    try:
-        user = User.objects.get(pk=int(sub))
-    except (User.DoesNotExist, ValueError, TypeError):
+    user = get_user(payload.get("sub"))
+    if user is None:
         return payload, None
     return payload, (user if user.is_active else None)
 
+class CacheCoherencyMiddleware(MiddlewareMixin):
+    """Throttled check of the cache versions table; drops stale in-process cache namespaces."""
+    def process_request(self, request):
+        sync()
+        return None
+
+class TrafficRecorderMiddleware(MiddlewareMixin):
+    """Opt-in (TRAFFIC_RECORD_DIR): sanitized request envelopes for `manage.py replay_traffic`."""
+    def process_request(self, request):
+        if not traffic.sampled():
+            return None
+        request._traffic_started = (time.time(), time.perf_counter())
+        # read before the view consumes the stream; oversized bodies are recorded by size only
+        length = int(request.META.get("CONTENT_LENGTH") or 0)
+        request._traffic_body = request.body if length <= traffic.MAX_BODY_BYTES else None
+        return None
+
+    def process_response(self, request, response):
+        started = getattr(request, "_traffic_started", None)
+        if started is None:
+            return response
+        try:
+            traffic.write(traffic.envelope(request, response, started[0], time.perf_counter() - started[1],
+                                           request._traffic_body))
+        except Exception:
+            logger.exception("traffic.record_failed path=%s", request.path)
+        return response
+
 class JWTAuthMiddleware(MiddlewareMixin):
     """
     - Accepts 'Authorization: Bearer <token>' (scheme is case-insensitive).
@@ -88,3 +118,31 @@ class JWTAuthMiddleware(MiddlewareMixin):
         logger.info("[JWT MW] %s %s -> request.user set to id=%s email=%s",
                     method, path, getattr(user, "id", None), getattr(user, "email", None))
         return None
+
+def _is_admin(user) -> bool:
+    from accesscontrol.permissions import has_role
+    if not (user and getattr(user, "is_authenticated", False)):
+        return False
+    return bool(getattr(user, "is_superuser", False)) or has_role(user, "admin")
+
+class RequestProfilerMiddleware(MiddlewareMixin):
+    """
+    Samples the view's stacks (authn/profiling.py) for admin requests with 'X-Profile: 1'
+    and for a PROFILE_SAMPLE_RATE fraction of traffic. Must come after JWTAuthMiddleware.
+    """
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        forced = request.META.get("HTTP_X_PROFILE") == "1" and _is_admin(getattr(request, "user", None))
+        if not (forced or profiling.sampled()):
+            return None
+        match = request.resolver_match
+        route = f"{request.method} /{match.route}" if match and match.route else f"{request.method} {request.path}"
+        request._profile = (profiling.sampler.start(route), forced)
+        return None
+
+    def process_response(self, request, response):
+        session, forced = getattr(request, "_profile", (None, False))
+        if session is not None:
+            profiling.sampler.stop(session)
+            if forced:
+                response["X-Profile-Samples"] = str(session.samples)
+        return response
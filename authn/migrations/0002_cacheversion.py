@@ -0,0 +1,27 @@
+# Generated by Django 5.1.2 on 2026-10-19 11:24
+
+from django.db import migrations, models
+
+
+def seed_namespaces(apps, schema_editor):
+    CacheVersion = apps.get_model("authn", "CacheVersion")
+    for ns in ("users", "tokens", "rbac"):
+        CacheVersion.objects.get_or_create(namespace=ns)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authn', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheVersion',
+            fields=[
+                ('namespace', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_namespaces, migrations.RunPython.noop),
+    ]
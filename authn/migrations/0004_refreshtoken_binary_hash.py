@@ -0,0 +1,69 @@
+# Store refresh-token hashes as 32-byte digests instead of 64-char hex.
+
+from django.db import migrations, models
+
+BATCH = 2000
+
+
+def hex_to_digest(apps, schema_editor):
+    RefreshToken = apps.get_model("authn", "RefreshToken")
+    db = schema_editor.connection.alias
+    batch = []
+    for rt in RefreshToken.objects.using(db).only("id", "token_hash").iterator(chunk_size=BATCH):
+        rt.token_digest = bytes.fromhex(rt.token_hash[:64])
+        batch.append(rt)
+        if len(batch) >= BATCH:
+            RefreshToken.objects.using(db).bulk_update(batch, ["token_digest"])
+            batch = []
+    if batch:
+        RefreshToken.objects.using(db).bulk_update(batch, ["token_digest"])
+
+
+def digest_to_hex(apps, schema_editor):
+    RefreshToken = apps.get_model("authn", "RefreshToken")
+    db = schema_editor.connection.alias
+    batch = []
+    for rt in RefreshToken.objects.using(db).only("id", "token_digest").iterator(chunk_size=BATCH):
+        rt.token_hash = bytes(rt.token_digest).hex()
+        batch.append(rt)
+        if len(batch) >= BATCH:
+            RefreshToken.objects.using(db).bulk_update(batch, ["token_hash"])
+            batch = []
+    if batch:
+        RefreshToken.objects.using(db).bulk_update(batch, ["token_hash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authn', '0003_idempotencyrecord'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='refreshtoken',
+            name='token_digest',
+            field=models.BinaryField(max_length=32, null=True),
+        ),
+        # the reverse path needs the old column back (nullable) before filling it
+        migrations.AlterField(
+            model_name='refreshtoken',
+            name='token_hash',
+            field=models.CharField(max_length=128, null=True, unique=True),
+        ),
+        migrations.RunPython(hex_to_digest, digest_to_hex),
+        migrations.RemoveField(
+            model_name='refreshtoken',
+            name='token_hash',
+        ),
+        migrations.RenameField(
+            model_name='refreshtoken',
+            old_name='token_digest',
+            new_name='token_hash',
+        ),
+        migrations.AlterField(
+            model_name='refreshtoken',
+            name='token_hash',
+            field=models.BinaryField(max_length=32, unique=True),
+        ),
+    ]
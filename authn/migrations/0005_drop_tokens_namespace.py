@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+def drop_tokens(apps, schema_editor):
+    # nothing caches refresh tokens in-process any more
+    apps.get_model("authn", "CacheVersion").objects.filter(namespace="tokens").delete()
+
+
+def restore_tokens(apps, schema_editor):
+    apps.get_model("authn", "CacheVersion").objects.get_or_create(namespace="tokens")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authn', '0004_refreshtoken_binary_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_tokens, restore_tokens),
+    ]
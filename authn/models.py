@@ -8,13 +8,13 @@ from django.utils import timezone
 class RefreshToken(models.Model):
     """
     Secure server-stored refresh token (rotation-based).
-    We store only a SHA-256 hash of the token. The raw token is returned to the client once.
+    We store only the raw 32-byte SHA-256 digest of the token. The raw token is returned to the client once.
     """
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="refresh_tokens"
     )
-    token_hash = models.CharField(max_length=128, unique=True)  # hex-encoded sha256 (64), padded
+    token_hash = models.BinaryField(max_length=32, unique=True)  # sha256 digest (bytes, not hex)
     created_at = models.DateTimeField(auto_now_add=True)
     expires_at = models.DateTimeField()
     revoked_at = models.DateTimeField(null=True, blank=True)
@@ -37,4 +37,35 @@ class RefreshToken(models.Model):
 
     def __str__(self) -> str:
         status = "active" if self.is_active else "inactive"
-        return f"RT({self.user_id}, {self.family}, {status})"
\ No newline at end of file
+        return f"RT({self.user_id}, {self.family}, {status})"
+
+
+class CacheVersion(models.Model):
+    """
+    One row per in-process cache namespace ("users", "rbac").
+    Writers bump the version in their transaction; workers poll the table and
+    drop their local entries for namespaces whose version moved.
+    """
+    namespace = models.CharField(max_length=32, primary_key=True)
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f"{self.namespace}@{self.version}"
+
+
+class IdempotencyRecord(models.Model):
+    """
+    Shared Idempotency-Key store (IDEMPOTENCY_STORE=db).
+    status NULL = the first request is still running on some worker.
+    Empty body = done, but the response held credentials and was not stored.
+    """
+    key = models.CharField(max_length=64, primary_key=True)  # sha256(caller, endpoint, key)
+    fingerprint = models.CharField(max_length=64)            # HMAC-SHA256 of the request body
+    status = models.PositiveSmallIntegerField(null=True, blank=True)
+    body = models.TextField(blank=True)
+    headers = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self) -> str:
+        return f"Idem({self.key[:12]}, {self.status or 'pending'})"
@@ -0,0 +1,163 @@
+"""
+On-demand statistical profiler for single requests.
+
+A request is profiled when an admin sends `X-Profile: 1`, or for a PROFILE_SAMPLE_RATE
+fraction of all requests. One sampler thread per process walks the stacks of the threads
+currently serving profiled requests every PROFILE_INTERVAL_MS (sys._current_frames) and
+aggregates them per route. Aggregates are written as collapsed stacks
+(`frame;frame;frame count`) to `<PROFILE_DIR>/<route>.<pid>.collapsed`, the input format
+of flamegraph.pl / speedscope / inferno.
+
+Overhead is bounded: at most PROFILE_MAX_CONCURRENT requests are profiled at once, each
+for at most PROFILE_MAX_SAMPLES samples; a route keeps at most PROFILE_MAX_STACKS distinct
+stacks (the rest are counted under "[other]"). The sampler sleeps while nothing is profiled.
+"""
+from __future__ import annotations
+import os
+import re
+import sys
+import time
+import atexit
+import random
+import tempfile
+import threading
+from collections import Counter
+from typing import Dict, Optional
+import logging
+log = logging.getLogger("authn.profiling")
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "app-profiles"))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_MAX_CONCURRENT = int(os.getenv("PROFILE_MAX_CONCURRENT", "2"))
+PROFILE_MAX_SAMPLES = int(os.getenv("PROFILE_MAX_SAMPLES", "2000"))
+PROFILE_MAX_STACKS = int(os.getenv("PROFILE_MAX_STACKS", "5000"))
+PROFILE_MAX_DEPTH = 128
+PROFILE_FLUSH_SECONDS = float(os.getenv("PROFILE_FLUSH_SECONDS", "10"))
+
+OTHER = "[other]"
+
+
+class Session:
+    __slots__ = ("route", "stacks", "samples", "thread_id")
+
+    def __init__(self, route: str, thread_id: int):
+        self.route = route
+        self.thread_id = thread_id
+        self.stacks: Counter = Counter()
+        self.samples = 0
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def collapse(frame) -> str:
+    names = []
+    while frame is not None and len(names) < PROFILE_MAX_DEPTH:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class Sampler:
+    def __init__(self, interval: float = PROFILE_INTERVAL_MS / 1000, max_concurrent: int = PROFILE_MAX_CONCURRENT):
+        self.interval = interval
+        self.max_concurrent = max_concurrent
+        self._lock = threading.Lock()
+        self._active: Dict[int, Session] = {}
+        self._routes: Dict[str, Counter] = {}
+        self._dirty: set = set()
+        self._flushed_at = time.monotonic()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    def start(self, route: str) -> Optional[Session]:
+        """Begin sampling the calling thread; None when the concurrency cap is reached."""
+        tid = threading.get_ident()
+        with self._lock:
+            if len(self._active) >= self.max_concurrent or tid in self._active:
+                return None
+            session = self._active[tid] = Session(route, tid)
+        self._ensure_thread()
+        self._wake.set()
+        return session
+
+    def stop(self, session: Session) -> None:
+        with self._lock:
+            self._active.pop(session.thread_id, None)
+            if not self._active:
+                self._wake.clear()
+            agg = self._routes.setdefault(session.route, Counter())
+            for stack, n in session.stacks.items():
+                if stack in agg or len(agg) < PROFILE_MAX_STACKS:
+                    agg[stack] += n
+                else:
+                    agg[OTHER] += n
+            self._dirty.add(session.route)
+            due = time.monotonic() - self._flushed_at >= PROFILE_FLUSH_SECONDS
+        if due:
+            self.flush()
+
+    def _ensure_thread(self) -> None:
+        # same lazy, fork-aware start as the audit writer
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait()
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for tid, session in self._active.items():
+                    frame = frames.get(tid)
+                    if frame is not None and session.samples < PROFILE_MAX_SAMPLES:
+                        session.stacks[collapse(frame)] += 1
+                        session.samples += 1
+            del frames
+
+    def flush(self) -> None:
+        """Rewrite the collapsed-stack file of every route that got new samples."""
+        with self._lock:
+            routes = {r: dict(self._routes[r]) for r in self._dirty}
+            self._dirty.clear()
+            self._flushed_at = time.monotonic()
+        if not routes:
+            return
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        for route, stacks in routes.items():
+            path = os.path.join(PROFILE_DIR, f"{route_slug(route)}.{os.getpid()}.collapsed")
+            tmp = path + ".tmp"
+            try:
+                with open(tmp, "w") as fh:
+                    for stack, n in sorted(stacks.items(), key=lambda kv: -kv[1]):
+                        fh.write(f"{stack} {n}\n")
+                os.replace(tmp, path)
+            except OSError as e:
+                log.warning("profile.flush_failed route=%s err=%s", route, e)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+            self._dirty.clear()
+
+
+def route_slug(route: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", route).strip("_") or "root"
+
+
+def sampled() -> bool:
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+sampler = Sampler()
+atexit.register(sampler.flush)
@@ -4,19 +4,46 @@ import uuid
 import secrets
 import hashlib
 from datetime import timedelta
-from typing import Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 from django.utils import timezone
 from django.http import HttpRequest
 from django.contrib.auth import get_user_model
+from core.db_router import use_primary
 from .models import RefreshToken
+from .coherency import LocalCache, USERS
+from .jwt import verify_jwt_many
 
 User = get_user_model()
 
 REFRESH_TOKEN_BYTES = int(os.getenv("REFRESH_TOKEN_BYTES", "32"))  # ~256 bits
 REFRESH_TOKEN_DAYS = int(os.getenv("REFRESH_TOKEN_DAYS", "14"))
 
-def _hash_token(raw: str) -> str:
-    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+# user rows by pk (invalidated through authn.coherency when any User changes)
+_principals = LocalCache(
+    USERS,
+    maxsize=int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("PRINCIPAL_CACHE_SECONDS", "30")),
+)
+_USER_FIELDS = [f.attname for f in User._meta.concrete_fields]
+
+def get_user(user_id) -> Optional[User]:
+    """User by pk via the principal cache; returns a fresh instance on every call."""
+    try:
+        pk = int(user_id)
+    except (TypeError, ValueError):
+        return None
+    # single flight per pk: a burst after a user change costs one query per worker
+    row = _principals.get_or_load(pk, lambda: User.objects.filter(pk=pk).values_list(*_USER_FIELDS).first())
+    if row is None:
+        return None
+    return User.from_db(User.objects.db, _USER_FIELDS, row)
+
+def forget_user(user_id) -> None:
+    """Drop one principal from this worker's cache (changes that don't need a USERS bump)."""
+    _principals.delete(int(user_id))
+
+def _hash_token(raw: str) -> bytes:
+    return hashlib.sha256(raw.encode("utf-8")).digest()
 
 def _client_context(request: Optional[HttpRequest]) -> tuple[str, Optional[str]]:
     if not request:
@@ -44,7 +71,9 @@ def get_refresh_row(raw_token: str) -> Optional[RefreshToken]:
     if not raw_token:
         return None
     token_hash = _hash_token(raw_token)
-    return RefreshToken.objects.filter(token_hash=token_hash).first()
+    # rotation/revocation decisions must not see replica lag
+    with use_primary():
+        return RefreshToken.objects.select_related("user").filter(token_hash=token_hash).first()
 
 def revoke_refresh(rt: RefreshToken) -> None:
     if rt.revoked_at is None:
@@ -58,4 +87,50 @@ def rotate_refresh(rt: RefreshToken, request: Optional[HttpRequest] = None) -> T
     new_raw, new_rt = issue_refresh_token(rt.user, request=request, family=rt.family)
     rt.replaced_by = new_rt
     rt.save(update_fields=["replaced_by"])
-    return new_raw, new_rt
\ No newline at end of file
+    return new_raw, new_rt
+
+def introspect_tokens(tokens: List[str]) -> List[Dict[str, Any]]:
+    """
+    Batch access-token introspection (same order as `tokens`):
+    one signature check per distinct token, one users query, one roles query.
+    Roles include inherited ones (RoleClosure), like permission checks do.
+    """
+    from accesscontrol.models import RoleClosure
+
+    distinct = list(dict.fromkeys(tokens))
+    payloads = dict(zip(distinct, verify_jwt_many(distinct)))
+    ids = set()
+    for p in payloads.values():
+        try:
+            if p:
+                ids.add(int(p.get("sub")))
+        except (TypeError, ValueError):
+            pass
+    users = User.objects.only("id", "email", "is_active").in_bulk(ids) if ids else {}
+    roles: Dict[int, List[str]] = {}
+    if users:
+        for uid, name in (
+            RoleClosure.objects.filter(role__users__in=users.keys())
+            .values_list("role__users", "included__name").distinct().order_by("included__name")
+        ):
+            roles.setdefault(uid, []).append(name)
+
+    out: List[Dict[str, Any]] = []
+    for token in tokens:
+        p = payloads[token]
+        try:
+            user = users.get(int(p.get("sub"))) if p else None
+        except (TypeError, ValueError):
+            user = None
+        if user is None or not user.is_active:
+            out.append({"active": False})
+            continue
+        out.append({
+            "active": True,
+            "sub": user.id,
+            "email": user.email,
+            "exp": p.get("exp"),
+            "iat": p.get("iat"),
+            "roles": roles.get(user.id, []),
+        })
+    return out
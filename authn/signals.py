@@ -0,0 +1,62 @@
+from __future__ import annotations
+from functools import partial
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+
+from accesscontrol.models import Role, BusinessElement, AccessRule
+from .coherency import bump, USERS, RBAC
+from .services import forget_user
+
+# NB: QuerySet.update()/bulk_create() bypass these; such callers bump() explicitly.
+
+# what a cached principal is trusted for: authentication, forward-auth headers, introspection
+AUTH_FIELDS = ("password", "email", "is_active", "is_staff", "is_superuser")
+
+
+def _user_saving(sender, instance, update_fields=None, using=None, **kwargs):
+    if instance.pk is not None and update_fields is None:
+        # full save: remember the stored auth fields to see whether they change
+        instance._auth_fields_before = (
+            sender._base_manager.using(using).filter(pk=instance.pk).values_list(*AUTH_FIELDS).first())
+
+
+def _user_saved(sender, instance, created=False, update_fields=None, using=None, **kwargs):
+    if created:  # brand-new rows cannot be cached anywhere yet
+        return
+    if update_fields is not None:
+        changed = not set(AUTH_FIELDS).isdisjoint(update_fields)
+    else:
+        before = instance.__dict__.pop("_auth_fields_before", None)
+        changed = before != tuple(getattr(instance, f) for f in AUTH_FIELDS)
+    if changed:
+        bump(USERS, using=using)
+    else:
+        # profile-only edit: dropped here, other workers refresh within PRINCIPAL_CACHE_SECONDS
+        transaction.on_commit(partial(forget_user, instance.pk), using=using)
+
+
+def _user_deleted(sender, instance, **kwargs):
+    bump(USERS, using=kwargs.get("using"))
+
+
+def _rbac_changed(sender, instance, **kwargs):
+    bump(RBAC, using=kwargs.get("using"))
+
+
+def _membership_changed(sender, instance, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        bump(RBAC, using=kwargs.get("using"))
+
+
+def connect() -> None:
+    User = get_user_model()
+    pre_save.connect(_user_saving, sender=User, dispatch_uid="coherency.user.pre_save")
+    post_save.connect(_user_saved, sender=User, dispatch_uid="coherency.user.save")
+    post_delete.connect(_user_deleted, sender=User, dispatch_uid="coherency.user.delete")
+    # refresh tokens are always read from the DB (no token cache): no bump per rotation
+    for model in (Role, BusinessElement, AccessRule):
+        post_save.connect(_rbac_changed, sender=model, dispatch_uid=f"coherency.{model.__name__}.save")
+        post_delete.connect(_rbac_changed, sender=model, dispatch_uid=f"coherency.{model.__name__}.delete")
+    m2m_changed.connect(_membership_changed, sender=Role.users.through, dispatch_uid="coherency.role_users")
+    m2m_changed.connect(_membership_changed, sender=Role.inherits.through, dispatch_uid="coherency.role_inherits")
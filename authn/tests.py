@@ -1,3 +1,213 @@
-from django.test import TestCase
+import threading
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
 
-# Create your tests here.
+from accesscontrol.models import Role
+from . import concurrency
+from .coherency import LocalCache
+from .concurrency import Limiter, concurrency_limited
+from .jwt import make_jwt
+from .services import introspect_tokens
+
+
+class BlockingLoad:
+    """load() callable that blocks until released and counts its calls."""
+
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        return self.value
+
+
+def in_thread(fn, *args):
+    out = {}
+    t = threading.Thread(target=lambda: out.setdefault("value", fn(*args)))
+    t.start()
+    return t, out
+
+
+class GetOrLoadTests(SimpleTestCase):
+    def test_concurrent_misses_share_one_load(self):
+        cache = LocalCache("test", ttl=30.0)
+        load = BlockingLoad("v")
+        leader, first = in_thread(cache.get_or_load, "k", load)
+        self.assertTrue(load.started.wait(5))
+        followers = [in_thread(cache.get_or_load, "k", load) for _ in range(8)]
+        load.release.set()
+        for t, _ in [(leader, first)] + followers:
+            t.join(5)
+        self.assertEqual(load.calls, 1)
+        self.assertEqual([out["value"] for _, out in followers], ["v"] * 8)
+        self.assertEqual(cache.get("k"), "v")
+
+    def test_recently_stale_value_served_during_reload(self):
+        cache = LocalCache("test", ttl=30.0, stale=60.0)
+        cache.set("k", "old")
+        cache.invalidate()
+        self.assertIsNone(cache.get("k"))
+        load = BlockingLoad("new")
+        leader, _ = in_thread(cache.get_or_load, "k", load)
+        self.assertTrue(load.started.wait(5))
+        self.assertEqual(cache.get_or_load("k", lambda: self.fail("second load")), "old")
+        load.release.set()
+        leader.join(5)
+        self.assertEqual(cache.get("k"), "new")
+
+    def test_no_stale_window_waits_for_the_load(self):
+        cache = LocalCache("test", ttl=30.0, stale=0.0)
+        cache.set("k", "old")
+        cache.invalidate()
+        load = BlockingLoad("new")
+        leader, _ = in_thread(cache.get_or_load, "k", load)
+        self.assertTrue(load.started.wait(5))
+        follower, out = in_thread(cache.get_or_load, "k", load)
+        follower.join(0.2)
+        self.assertTrue(follower.is_alive())
+        load.release.set()
+        for t in (leader, follower):
+            t.join(5)
+        self.assertEqual(out["value"], "new")
+        self.assertEqual(load.calls, 1)
+
+    def test_invalidation_during_load_leaves_result_stale(self):
+        cache = LocalCache("test", ttl=30.0)
+
+        def load():
+            cache.invalidate()
+            return "v"
+
+        self.assertEqual(cache.get_or_load("k", load), "v")
+        self.assertIsNone(cache.get("k"))
+
+    def test_failed_load_is_not_shared(self):
+        cache = LocalCache("test", ttl=30.0, stale=0.0)
+        started, release = threading.Event(), threading.Event()
+
+        def failing():
+            started.set()
+            release.wait(5)
+            raise RuntimeError("db down")
+
+        leader, _ = in_thread(lambda: self.assertRaises(RuntimeError, cache.get_or_load, "k", failing))
+        self.assertTrue(started.wait(5))
+        follower, out = in_thread(cache.get_or_load, "k", lambda: "own")
+        release.set()
+        for t in (leader, follower):
+            t.join(5)
+        self.assertEqual(out["value"], "own")
+
+
+class IntrospectTokensTests(TestCase):
+    def test_roles_include_inherited_ones(self):
+        guest, user, manager = (Role.objects.create(name=n) for n in ("guest", "user", "manager"))
+        manager.inherits.add(user)
+        user.inherits.add(guest)
+        alice = get_user_model().objects.create_user(email="alice@example.com", password="x")
+        bob = get_user_model().objects.create_user(email="bob@example.com", password="x")
+        manager.users.add(alice)
+        user.users.add(alice, bob)
+        with self.assertNumQueries(2):
+            a, b, nobody = introspect_tokens([make_jwt(alice.id), make_jwt(bob.id), "garbage"])
+        self.assertEqual(a["roles"], ["guest", "manager", "user"])
+        self.assertEqual(b["roles"], ["guest", "user"])
+        self.assertEqual(nobody, {"active": False})
+
+
+class LimiterTests(SimpleTestCase):
+    CPU = 0.002
+
+    def limiter(self, initial=20, io_floor=0.010):
+        lim = Limiter("auth.login", initial=initial, min_limit=2, max_limit=128, tolerance=1.5)
+        lim._probe_in = 10 ** 6  # no floor resets unless a test asks for one
+        lim._io_floor = io_floor
+        return lim
+
+    def sample(self, lim, io, n=1, failed=False):
+        # the limit is in use: every sample arrives with `limit` requests in flight
+        for _ in range(n):
+            used = int(lim.limit)
+            lim._update(io + self.CPU, self.CPU, used, failed, used)
+
+    def test_shrinks_under_contention(self):
+        lim = self.limiter(initial=20)
+        self.sample(lim, io=0.100, n=30)  # 10x the uncontended IO time
+        self.assertLess(lim.limit, 10)
+        self.assertGreaterEqual(lim.limit, lim.min_limit)
+
+    def test_grows_while_uncontended(self):
+        lim = self.limiter(initial=8)
+        self.sample(lim, io=0.010, n=30)
+        self.assertGreater(lim.limit, 16)
+        self.assertLessEqual(lim.limit, lim.max_limit)
+
+    def test_idle_limit_is_left_alone(self):
+        lim = self.limiter(initial=20)
+        for _ in range(30):
+            lim._update(0.100 + self.CPU, self.CPU, 1, False, 1)  # slow, but the limit is not in use
+        self.assertEqual(lim.limit, 20)
+
+    def test_failures_shrink(self):
+        lim = self.limiter(initial=20)
+        self.sample(lim, io=0.010, failed=True)
+        self.assertAlmostEqual(lim.limit, 18)
+
+    def test_io_floor_tracks_the_minimum(self):
+        lim = self.limiter(io_floor=0.050)
+        self.sample(lim, io=0.020)
+        self.assertAlmostEqual(lim._io_floor, 0.020)
+        self.sample(lim, io=0.040)
+        self.assertAlmostEqual(lim._io_floor, 0.020)
+
+    def test_probe_resets_the_floor_without_lowering_the_limit(self):
+        lim = self.limiter(initial=20, io_floor=0.010)
+        lim._probe_in = 1
+        self.sample(lim, io=0.050)  # the database got slower
+        self.assertAlmostEqual(lim._io_floor, 0.050)
+        self.assertGreater(lim.limit, 15)
+        self.assertGreater(lim._probe_in, 0)
+        self.sample(lim, io=0.050, n=30)  # now within tolerance: no longer shrinking
+        self.assertGreater(lim.limit, 20)
+
+    def test_try_acquire_sheds_over_the_limit(self):
+        lim = self.limiter(initial=2)
+        self.assertEqual([lim.try_acquire(), lim.try_acquire(), lim.try_acquire()], [1, 2, 0])
+        self.assertEqual((lim.inflight, lim.shed), (2, 1))
+        lim.release(0.012, self.CPU, 2)
+        self.assertEqual(lim.try_acquire(), 2)
+
+
+class ConcurrencyLimitedTests(SimpleTestCase):
+    def test_unknown_name_is_rejected_at_decoration(self):
+        with self.assertRaises(ImproperlyConfigured):
+            concurrency_limited("no.such.limiter")
+
+    def test_over_the_limit_gets_503_with_retry_after(self):
+        lim = Limiter("auth.login", initial=2, min_limit=2)
+        lim._wall, lim._ideal = 2.5, 0.01  # recent latency: Retry-After is its ceiling
+
+        @concurrency_limited("auth.login", methods=["POST"])
+        class View:
+            def dispatch(self, request):
+                return HttpResponse("ok")
+
+        rf = RequestFactory()
+        with mock.patch.object(concurrency, "CONCURRENCY_LIMITING", True), \
+                mock.patch.object(concurrency, "limiter", return_value=lim):
+            self.assertEqual(View().dispatch(rf.post("/")).status_code, 200)
+            lim.inflight = 2  # two requests still running
+            resp = View().dispatch(rf.post("/"))
+            self.assertEqual(resp.status_code, 503)
+            self.assertEqual(resp["Retry-After"], str(lim.retry_after()))
+            self.assertGreaterEqual(int(resp["Retry-After"]), 2)
+            self.assertEqual(View().dispatch(rf.get("/")).status_code, 200)  # GET is not limited
+        self.assertEqual(lim.shed, 1)
@@ -0,0 +1,154 @@
+"""
+Traffic recording for offline load replay (`manage.py replay_traffic`).
+
+With TRAFFIC_RECORD_DIR set, `TrafficRecorderMiddleware` appends one sanitized envelope
+per request to `<dir>/traffic-<pid>.jsonl` (rotated at TRAFFIC_RECORD_MAX_MB, keeping
+TRAFFIC_RECORD_BACKUPS files). Envelopes hold no credentials or personal data:
+
+- user identity, refresh tokens and Idempotency-Keys become keyed pseudonyms (HMAC with
+  SECRET_KEY), so replay can map them consistently onto seeded users and live tokens;
+- JSON bodies keep their keys and value types, strings are replaced by their length;
+- responses that hand out a refresh token record its pseudonym under "issues".
+"""
+from __future__ import annotations
+import os
+import hmac
+import json
+import random
+import hashlib
+import logging
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl
+from django.conf import settings
+
+TRAFFIC_RECORD_DIR = os.getenv("TRAFFIC_RECORD_DIR", "")
+TRAFFIC_RECORD_SAMPLE = float(os.getenv("TRAFFIC_RECORD_SAMPLE", "1"))
+TRAFFIC_RECORD_MAX_MB = int(os.getenv("TRAFFIC_RECORD_MAX_MB", "64"))
+TRAFFIC_RECORD_BACKUPS = int(os.getenv("TRAFFIC_RECORD_BACKUPS", "5"))
+MAX_BODY_BYTES = 64 * 1024
+
+# fields with meaning for replay; everything else is reduced to its shape
+CREDENTIAL_FIELDS = frozenset({"password", "password2"})
+TOKEN_FIELDS = frozenset({"refresh"})
+QUERY_KEEP = frozenset({"element", "action", "fmt", "order", "fields", "limit", "kind"})
+QUERY_USERS = frozenset({"owner", "user"})  # user ids -> pseudonyms, remapped on replay
+
+_writer: Optional[logging.Logger] = None
+_writer_pid: Optional[int] = None
+
+
+def pseudonym(kind: str, value: Any) -> str:
+    digest = hmac.new(settings.SECRET_KEY.encode(), f"{kind}:{value}".encode(), hashlib.sha256)
+    return f"{kind}:{digest.hexdigest()[:16]}"
+
+
+def shape(value: Any) -> Any:
+    """Replace scalars by type markers, keep container structure (lists truncated to 3)."""
+    if isinstance(value, dict):
+        return {k: _field(k, v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [shape(v) for v in value[:3]] + ([f"...{len(value)}"] if len(value) > 3 else [])
+    if isinstance(value, str):
+        return f"<str:{len(value)}>"
+    if isinstance(value, bool) or value is None:
+        return value
+    return f"<{type(value).__name__}>"
+
+
+def _field(key: str, value: Any) -> Any:
+    if key in CREDENTIAL_FIELDS:
+        return "<secret>"
+    if key in TOKEN_FIELDS and isinstance(value, str):
+        return pseudonym("rt", value)
+    if key == "email" and isinstance(value, str):
+        return pseudonym("email", value.strip().lower())
+    return shape(value)
+
+
+def _query(qs: str) -> Dict[str, str]:
+    out = {}
+    for k, v in parse_qsl(qs, keep_blank_values=True):
+        if k in QUERY_KEEP:
+            out[k] = v
+        elif k in QUERY_USERS and v.isdigit():
+            out[k] = pseudonym("u", int(v))
+        else:
+            out[k] = f"<str:{len(v)}>"
+    return out
+
+
+def _logger() -> logging.Logger:
+    global _writer, _writer_pid
+    if _writer is None or _writer_pid != os.getpid():
+        os.makedirs(TRAFFIC_RECORD_DIR, exist_ok=True)
+        handler = RotatingFileHandler(
+            os.path.join(TRAFFIC_RECORD_DIR, f"traffic-{os.getpid()}.jsonl"),
+            maxBytes=TRAFFIC_RECORD_MAX_MB * 1024 * 1024,
+            backupCount=TRAFFIC_RECORD_BACKUPS,
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        writer = logging.getLogger(f"authn.traffic.{os.getpid()}")
+        writer.handlers[:] = [handler]
+        writer.propagate = False
+        writer.setLevel(logging.INFO)
+        _writer, _writer_pid = writer, os.getpid()
+    return _writer
+
+
+def envelope(request, response, started: float, duration: float, body: Optional[bytes]) -> Dict[str, Any]:
+    user = getattr(request, "user", None)
+    data = _response_json(response)
+    if user is not None and getattr(user, "is_authenticated", False):
+        identity = pseudonym("u", user.pk)
+    elif isinstance(data.get("user"), dict) and data["user"].get("id"):
+        identity = pseudonym("u", data["user"]["id"])  # successful login
+    else:
+        identity = "invalid" if request.META.get("HTTP_AUTHORIZATION") else None
+    match = getattr(request, "resolver_match", None)
+    env: Dict[str, Any] = {
+        "ts": round(started, 6),
+        "method": request.method,
+        "path": request.path,
+        "route": f"/{match.route}" if match and match.route else request.path,
+        "query": _query(request.META.get("QUERY_STRING", "")),
+        "identity": identity,
+        "status": response.status_code,
+        "ms": round(duration * 1000, 3),
+    }
+    if request.META.get("HTTP_IDEMPOTENCY_KEY"):
+        env["idempotency_key"] = pseudonym("idem", request.META["HTTP_IDEMPOTENCY_KEY"])
+    if body is None:
+        env["body"] = {"<bytes>": int(request.META.get("CONTENT_LENGTH") or 0)}
+    elif body:
+        if "json" not in request.META.get("CONTENT_TYPE", ""):
+            env["body"] = {"<bytes>": len(body)}
+        else:
+            try:
+                env["body"] = shape(json.loads(body))
+            except ValueError:
+                env["body"] = {"<bytes>": len(body)}
+    if isinstance(data.get("refresh"), str):
+        env["issues"] = pseudonym("rt", data["refresh"])
+    return env
+
+
+def _response_json(response) -> Dict[str, Any]:
+    """Body of token-issuing responses (login/refresh); {} for everything else."""
+    if response.streaming or response.status_code >= 300:
+        return {}
+    if not response.get("Content-Type", "").startswith("application/json") or b'"refresh"' not in response.content:
+        return {}
+    try:
+        data = json.loads(response.content)
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def sampled() -> bool:
+    return TRAFFIC_RECORD_SAMPLE >= 1 or random.random() < TRAFFIC_RECORD_SAMPLE
+
+
+def write(env: Dict[str, Any]) -> None:
+    _logger().info(json.dumps(env, separators=(",", ":")))
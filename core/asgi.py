@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_asgi_application()
+
+if os.getenv("WARMUP_ON_BOOT", "0") == "1":
+    # the ASGI handler shares URLconf, DRF settings, imports and the middleware code;
+    # drive the synthetic requests through a WSGI handler (sync, no event loop at import)
+    from core.warmup import warmup
+    warmup()
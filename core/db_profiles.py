@@ -0,0 +1,85 @@
+"""
+Database performance profiles.
+
+A profile controls connection persistence (CONN_MAX_AGE + health checks; psycopg2 has
+no driver-side pool, so persistent per-worker connections are the pool) and the PRAGMAs
+applied to every new SQLite connection through `connection_created`.
+
+Select with DB_PROFILE (default "tuned"); `manage.py bench_db` compares them.
+
+journal_mode is stored in the database file itself, so WAL is opt-in (SQLITE_WAL=1).
+Without it the profiles only set per-connection PRAGMAs, and the file is left as it is.
+"""
+from __future__ import annotations
+import os
+from typing import Any, Dict
+
+SQLITE_WAL = os.getenv("SQLITE_WAL", "0") == "1"
+
+PROFILES: Dict[str, Dict[str, Any]] = {
+    # Django defaults: new connection per request, rollback journal, full fsync
+    "default": {
+        "conn_max_age": 0,
+        "health_checks": False,
+        # with SQLITE_WAL, switch the file back so bench_db compares like with like
+        "sqlite_pragmas": {**({"journal_mode": "DELETE"} if SQLITE_WAL else {}), "synchronous": "FULL"},
+    },
+    # persistent connections (+ WAL with SQLITE_WAL=1: readers never block the writer)
+    "tuned": {
+        "conn_max_age": 60,
+        "health_checks": True,
+        "sqlite_pragmas": {
+            **({"journal_mode": "WAL", "synchronous": "NORMAL"} if SQLITE_WAL else {}),  # NORMAL is only safe with WAL
+            "busy_timeout": 5000,      # ms to wait for the write lock instead of failing
+            "mmap_size": 256 * 1024 * 1024,
+            "temp_store": "MEMORY",
+            "cache_size": -20000,      # ~20 MB page cache per connection
+        },
+    },
+}
+
+_active = os.getenv("DB_PROFILE", "tuned")
+
+
+def active_profile() -> str:
+    return _active
+
+
+def profile(name: str) -> Dict[str, Any]:
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"unknown DB profile {name!r} (choices: {', '.join(PROFILES)})") from None
+
+
+def connection_settings(name: str) -> Dict[str, Any]:
+    """Keys to merge into a settings.DATABASES entry."""
+    p = profile(name)
+    return {"CONN_MAX_AGE": p["conn_max_age"], "CONN_HEALTH_CHECKS": p["health_checks"]}
+
+
+def _apply_sqlite_pragmas(sender, connection, **kwargs) -> None:
+    if connection.vendor != "sqlite":
+        return
+    pragmas = PROFILES.get(_active, {}).get("sqlite_pragmas", {})
+    if not pragmas:
+        return
+    with connection.cursor() as cur:
+        for key, value in pragmas.items():
+            cur.execute(f"PRAGMA {key} = {value}")
+
+
+def install() -> None:
+    from django.db.backends.signals import connection_created
+    connection_created.connect(_apply_sqlite_pragmas, dispatch_uid="db_profiles.sqlite_pragmas")
+
+
+def activate(name: str) -> None:
+    """Switch profile at runtime (used by the benchmark); affects connections opened afterwards."""
+    global _active
+    from django.db import connections
+    extra = connection_settings(name)
+    _active = name
+    for conn in connections.all():
+        conn.close()
+        conn.settings_dict.update(extra)
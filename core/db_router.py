@@ -0,0 +1,67 @@
+"""
+Read/write split for the auth and RBAC apps.
+
+Active only when settings.DATABASES has a "replica" alias (see DB_REPLICA_* /
+SQLITE_REPLICA_PATH). Reads of accounts/accesscontrol/authn models go to the replica
+unless the current request must stay consistent:
+  - it already wrote something (read-your-writes for the rest of the request),
+  - it runs inside transaction.atomic() on the primary,
+  - the code asked for it with `use_primary()` (e.g. refresh-token rotation).
+"""
+from __future__ import annotations
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.signals import request_started, request_finished
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA = "replica"
+REPLICA_APPS = frozenset({"accounts", "accesscontrol", "authn"})
+
+_pinned: ContextVar[bool] = ContextVar("db_pinned_primary", default=False)
+
+
+def pin_primary() -> None:
+    """Send every remaining read of this request/context to the primary."""
+    _pinned.set(True)
+
+
+def _reset(**kwargs) -> None:
+    _pinned.set(False)
+
+
+@contextmanager
+def use_primary():
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+request_started.connect(_reset, dispatch_uid="db_router.reset.start")
+request_finished.connect(_reset, dispatch_uid="db_router.reset.finish")
+
+
+def replica_enabled() -> bool:
+    return REPLICA in settings.DATABASES
+
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in REPLICA_APPS or not replica_enabled():
+            return None
+        if _pinned.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        pin_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, REPLICA, None}
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # the replica is a copy of the primary, never migrated directly
+        return db != REPLICA
@@ -0,0 +1,329 @@
+"""
+Process-shared metrics in a memory-mapped file.
+
+Every worker process owns one slot of METRICS_SLOTS in METRICS_PATH and only ever
+writes to it (a per-process lock serializes its own threads); `/metrics` sums all slots
+without locking or talking to the other workers. A slot left by a dead worker is taken
+over together with its values, so aggregated counters never go backwards.
+
+    [header 4 KiB][element names: ELEMENTS x 64 B][slot 0][slot 1]...
+    slot = u64 words: pid, counters, denials per element, histograms (buckets.., +Inf, sum_us, count),
+           limiters (limit, in flight, shed)
+
+Limiter limits / in-flight counts are per-process gauges: `/metrics` sums them over live workers only.
+
+The schema is fixed in this module and its hash is part of the file name, so workers
+still running an older layout during a rolling deploy keep their own file. Without
+fcntl (non-POSIX platforms) each process keeps private in-memory counters instead.
+"""
+from __future__ import annotations
+import os
+import mmap
+import time
+import zlib
+import struct
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+from django.http import HttpResponse
+import logging
+log = logging.getLogger("core.metrics")
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: no shared file, per-process counters
+    fcntl = None
+
+METRICS_PATH = os.getenv("METRICS_PATH", os.path.join(tempfile.gettempdir(), "app-metrics.bin"))
+METRICS_SLOTS = int(os.getenv("METRICS_SLOTS", "64"))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+COUNTERS: Tuple[Tuple[str, str], ...] = (
+    ("auth_login_success_total", "Successful logins."),
+    ("auth_login_failure_total", "Failed logins."),
+    ("auth_refresh_rotations_total", "Refresh tokens rotated."),
+    ("auth_refresh_failures_total", "Refresh attempts with unknown, expired or revoked tokens."),
+    ("rbac_checks_total", "Permission checks."),
+    ("rbac_denials_total", "Permission checks that were denied."),
+)
+HISTOGRAMS: Tuple[Tuple[str, str, Tuple[float, ...]], ...] = (
+    ("auth_password_hash_seconds", "Password hash/verify time (bcrypt).",
+     (0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0)),
+)
+# adaptive concurrency limiters (authn.concurrency) with exported state
+LIMITERS: Tuple[str, ...] = ("auth.login", "auth.register", "auth.refresh", "rbac.write")
+ELEMENTS = 256       # distinct element slugs with their own denial counter
+OTHER_ELEMENT = "(other)"  # denials on slugs that are not BusinessElements (not a valid slug itself)
+NAME_BYTES = 64
+
+MAGIC = b"MTR1"
+HEADER = struct.Struct("=4sIIIII")  # magic, slots, words per slot, counters, elements, schema hash
+HEADER_BYTES = 4096
+NAMES_OFFSET = HEADER_BYTES
+SLOTS_OFFSET = NAMES_OFFSET + ELEMENTS * NAME_BYTES
+
+_COUNTER_INDEX = {name: 1 + i for i, (name, _) in enumerate(COUNTERS)}
+_ELEMENTS_BASE = 1 + len(COUNTERS)
+_HIST_INDEX: Dict[str, Tuple[int, Tuple[float, ...]]] = {}
+_words = _ELEMENTS_BASE + ELEMENTS
+for _name, _, _buckets in HISTOGRAMS:
+    _HIST_INDEX[_name] = (_words, _buckets)
+    _words += len(_buckets) + 3  # buckets, +Inf, sum (microseconds), count
+_LIMITER_INDEX: Dict[str, int] = {}
+for _name in LIMITERS:
+    _LIMITER_INDEX[_name] = _words
+    _words += 3  # limit, in flight, shed total
+WORDS_PER_SLOT = _words
+_SCHEMA = zlib.crc32(repr((COUNTERS, HISTOGRAMS, LIMITERS, ELEMENTS, NAME_BYTES)).encode())
+
+
+def layout_path(path: str, slots: int) -> str:
+    """METRICS_PATH with the layout in the name: app-metrics.bin -> app-metrics.<schema>x<slots>.bin"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{_SCHEMA:08x}x{slots}{ext}"
+
+
+class SharedMetrics:
+    def __init__(self, path: str = METRICS_PATH, slots: int = METRICS_SLOTS):
+        self.path = layout_path(path, slots)
+        self.slots = slots
+        self.size = SLOTS_OFFSET + slots * WORDS_PER_SLOT * 8
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._mm: Optional[mmap.mmap] = None
+        self._words: Optional[memoryview] = None
+        self._base: Optional[int] = None  # first word of this process's slot; None = no slot
+        self._elements: Dict[str, Optional[int]] = {}
+
+    # --- file / slot management ---
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """Exclusive lock on the file across processes (nothing to share without fcntl)."""
+        if fcntl is None:
+            yield
+            return
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)  # drops the lock
+
+    def _open(self) -> None:
+        expected = HEADER.pack(MAGIC, self.slots, WORDS_PER_SLOT, len(COUNTERS), ELEMENTS, _SCHEMA)
+        if fcntl is None:
+            self._mm = mmap.mmap(-1, self.size)
+            self._mm[:HEADER.size] = expected
+        else:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with self._file_lock():
+                fd = os.open(self.path, os.O_RDWR)
+                try:
+                    size = os.fstat(fd).st_size
+                    if size != self.size or os.pread(fd, HEADER.size, 0) != expected:
+                        # new file, or one not written by this layout (the name pins it): start from zero
+                        if size:
+                            log.warning("metrics.reset path=%s", self.path)
+                        os.ftruncate(fd, 0)
+                        os.ftruncate(fd, self.size)
+                        os.pwrite(fd, expected, 0)
+                    self._mm = mmap.mmap(fd, self.size, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+                finally:
+                    os.close(fd)
+        self._words = memoryview(self._mm)[SLOTS_OFFSET:].cast("Q")
+        self._elements = {}
+        self._base = None
+
+    def _ensure(self) -> bool:
+        """Map the file and own a slot (again after fork); False if no slot is free."""
+        pid = os.getpid()
+        if self._pid == pid:
+            return self._base is not None
+        with self._lock:
+            if self._pid == pid:
+                return self._base is not None
+            self._open()
+            with self._file_lock():
+                self._base = self._claim(pid)
+            self._pid = pid
+            if self._base is None:
+                log.warning("metrics.no_free_slot slots=%s", self.slots)
+            return self._base is not None
+
+    def _claim(self, pid: int) -> Optional[int]:
+        words = self._words
+        for slot in range(self.slots):
+            base = slot * WORDS_PER_SLOT
+            owner = words[base]
+            if owner == 0 or owner == pid or not _alive(owner):
+                words[base] = pid  # a dead worker's totals are kept, so sums stay monotonic
+                for start in _LIMITER_INDEX.values():
+                    words[base + start] = words[base + start + 1] = 0  # ...but not its gauges
+                return base
+        return None
+
+    def _element_index(self, slug: str) -> Optional[int]:
+        # callers pass known element slugs only (see accesscontrol.services), so this stays bounded
+        if slug in self._elements:
+            return self._elements[slug]
+        raw = slug.encode("utf-8")[:NAME_BYTES - 1]
+        idx: Optional[int] = None
+        with self._file_lock():
+            for i in range(ELEMENTS):
+                off = NAMES_OFFSET + i * NAME_BYTES
+                n = self._mm[off]
+                if n == 0:
+                    self._mm[off + 1:off + 1 + len(raw)] = raw
+                    self._mm[off] = len(raw)  # length last: readers skip half-written names
+                    idx = i
+                    break
+                if self._mm[off + 1:off + 1 + n] == raw:
+                    idx = i
+                    break
+        self._elements[slug] = idx  # None too: a full table is not rescanned for this slug
+        return idx
+
+    # --- writers (own slot only) ---
+
+    def inc(self, name: str, value: int = 1) -> None:
+        if not self._ensure():
+            return
+        i = self._base + _COUNTER_INDEX[name]
+        with self._lock:
+            self._words[i] += value
+
+    def deny(self, element: str) -> None:
+        if not self._ensure():
+            return
+        idx = self._element_index(element)
+        with self._lock:
+            self._words[self._base + _COUNTER_INDEX["rbac_denials_total"]] += 1
+            if idx is not None:
+                self._words[self._base + _ELEMENTS_BASE + idx] += 1
+
+    def observe(self, name: str, seconds: float) -> None:
+        if not self._ensure():
+            return
+        start, buckets = _HIST_INDEX[name]
+        i = self._base + start
+        b = next((k for k, le in enumerate(buckets) if seconds <= le), len(buckets))
+        with self._lock:
+            w = self._words
+            w[i + b] += 1
+            w[i + len(buckets) + 1] += int(seconds * 1_000_000)
+            w[i + len(buckets) + 2] += 1
+
+    def limiter(self, name: str, limit: int, inflight: int, shed: int = 0) -> None:
+        """Current state of a concurrency limiter in this process (unknown names are ignored)."""
+        start = _LIMITER_INDEX.get(name)
+        if start is None or not self._ensure():
+            return
+        i = self._base + start
+        with self._lock:
+            w = self._words
+            w[i] = limit
+            w[i + 1] = inflight
+            w[i + 2] += shed
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0)
+
+    # --- reader (any process, lock-free) ---
+
+    def totals(self) -> Dict[str, object]:
+        self._ensure()
+        w = self._words
+        live = [s * WORDS_PER_SLOT for s in range(self.slots) if w[s * WORDS_PER_SLOT]]
+
+        def total(offset: int) -> int:
+            return sum(w[base + offset] for base in live)
+
+        out: Dict[str, object] = {name: total(i) for name, i in _COUNTER_INDEX.items()}
+        denials: Dict[str, int] = {}
+        for i in range(ELEMENTS):
+            off = NAMES_OFFSET + i * NAME_BYTES
+            n = self._mm[off]
+            if n:
+                denials[self._mm[off + 1:off + 1 + n].decode("utf-8", "replace")] = total(_ELEMENTS_BASE + i)
+        out["rbac_denials_by_element"] = denials
+        for name, (start, buckets) in _HIST_INDEX.items():
+            counts = [total(start + k) for k in range(len(buckets) + 1)]
+            out[name] = {
+                "buckets": list(zip(buckets + (float("inf"),), counts)),
+                "sum": total(start + len(buckets) + 1) / 1_000_000,
+                "count": total(start + len(buckets) + 2),
+            }
+        alive = [base for base in live if _alive(w[base])]
+        out["limiters"] = {
+            name: {
+                "limit": sum(w[base + start] for base in alive),
+                "inflight": sum(w[base + start + 1] for base in alive),
+                "shed": total(start + 2),
+            }
+            for name, start in _LIMITER_INDEX.items()
+        }
+        out["workers"] = len(alive)
+        return out
+
+
+def _alive(pid: int) -> bool:
+    if fcntl is None or pid == os.getpid():
+        return pid == os.getpid()  # private counters; os.kill(pid, 0) is CTRL_C_EVENT on Windows
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def render(totals: Dict[str, object]) -> str:
+    """Prometheus text exposition format."""
+    lines: List[str] = []
+    for name, help_text in COUNTERS:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter", f"{name} {totals[name]}"]
+    lines += ["# HELP rbac_element_denials_total Denied permission checks per element.",
+              "# TYPE rbac_element_denials_total counter"]
+    for element, n in sorted(totals["rbac_denials_by_element"].items()):
+        lines.append(f'rbac_element_denials_total{{element="{_escape(element)}"}} {n}')
+    for name, help_text, _ in HISTOGRAMS:
+        h = totals[name]
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        cumulative = 0
+        for le, n in h["buckets"]:
+            cumulative += n
+            lines.append(f'{name}_bucket{{le="{"+Inf" if le == float("inf") else le}"}} {cumulative}')
+        lines += [f"{name}_sum {h['sum']}", f"{name}_count {h['count']}"]
+    for metric, field, kind, help_text in (
+        ("app_concurrency_limit", "limit", "gauge", "Adaptive concurrency limit, summed over live workers."),
+        ("app_concurrency_inflight", "inflight", "gauge", "Requests admitted by the limiter and still running."),
+        ("app_concurrency_shed_total", "shed", "counter", "Requests rejected with 503 by the limiter."),
+    ):
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+        for name, state in totals["limiters"].items():
+            lines.append(f'{metric}{{limiter="{name}"}} {state[field]}')
+    lines += ["# HELP app_workers Live worker processes reporting metrics.", "# TYPE app_workers gauge",
+              f"app_workers {totals['workers']}"]
+    return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics = SharedMetrics()
+
+
+def metrics_view(request):
+    """GET /metrics (Prometheus). With METRICS_TOKEN set, requires `Authorization: Bearer <token>`."""
+    if METRICS_TOKEN and request.META.get("HTTP_AUTHORIZATION", "") != f"Bearer {METRICS_TOKEN}":
+        return HttpResponse(status=401)
+    return HttpResponse(render(metrics.totals()), content_type="text/plain; version=0.0.4; charset=utf-8")
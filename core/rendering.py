@@ -0,0 +1,76 @@
+"""
+Fast JSON path for hot read endpoints.
+
+`compile_serializer` turns the read shape of a ModelSerializer into a generated
+`obj -> dict` function once, instead of walking DRF fields on every request.
+`json_response` encodes with one prebuilt encoder and skips DRF's renderer whenever the
+negotiated renderer is plain JSON; it can also keep the encoded bytes in a LocalCache
+under a key that changes with the resource. Bodies and headers are byte-identical to
+`Response(data)` rendered by JSONRenderer; the browsable API and `; indent=` media types
+fall back to it.
+"""
+from __future__ import annotations
+from typing import Any, Callable, Dict, Hashable, Optional
+from django.http import HttpResponse
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from authn.coherency import LocalCache
+
+# same options JSONRenderer passes to json.dumps (UNICODE_JSON / STRICT_JSON / COMPACT_JSON)
+_encoder = JSONEncoder(
+    ensure_ascii=JSONRenderer.ensure_ascii,
+    allow_nan=not JSONRenderer.strict,
+    separators=(",", ":") if JSONRenderer.compact else (", ", ": "),
+)
+_CONVERTERS = {serializers.IntegerField: "int", serializers.BooleanField: "bool"}
+
+
+def dumps(data: Any) -> bytes:
+    """JSONRenderer.render(data) without the per-call encoder setup."""
+    return _encoder.encode(data).replace("\u2028", "\\u2028").replace("\u2029", "\\u2029").encode()
+
+
+def compile_serializer(serializer_class) -> Callable[[Any], Dict[str, Any]]:
+    """Generated equivalent of `serializer_class(obj).data` for plain model attributes."""
+    env: Dict[str, Any] = {}
+    body, items = [], []
+    for i, (name, field) in enumerate(serializer_class().fields.items()):
+        if field.write_only:
+            continue
+        if len(field.source_attrs) == 1 and field.source_attrs[0].isidentifier():
+            body.append(f"    v{i} = obj.{field.source_attrs[0]}")
+        else:
+            env[f"get{i}"] = field.get_attribute
+            body.append(f"    v{i} = get{i}(obj)")
+        if isinstance(field, serializers.CharField):
+            conv = "str"
+        elif type(field) in _CONVERTERS:
+            conv = _CONVERTERS[type(field)]
+        else:
+            env[f"rep{i}"] = field.to_representation
+            conv = f"rep{i}"
+        items.append(f"{name!r}: None if v{i} is None else {conv}(v{i})")
+    src = "def to_dict(obj):\n" + "\n".join(body) + "\n    return {" + ", ".join(items) + "}\n"
+    exec(compile(src, f"<compiled {serializer_class.__name__}>", "exec"), env)
+    return env["to_dict"]
+
+
+def _plain_json(request) -> bool:
+    renderer = getattr(request, "accepted_renderer", None)
+    return type(renderer) is JSONRenderer and "indent" not in (request.accepted_media_type or "")
+
+
+def json_response(request, data: Any, status: int = 200, *,
+                  cache: Optional[LocalCache] = None, key: Optional[Hashable] = None) -> HttpResponse:
+    """`Response(data, status)` for a DRF view; `data` may be a callable, only called when needed."""
+    if not _plain_json(request):
+        return Response(data() if callable(data) else data, status=status)
+    body = cache.get(key) if cache is not None else None
+    if body is None:
+        body = dumps(data() if callable(data) else data)
+        if cache is not None:
+            cache.set(key, body)
+    return HttpResponse(body, status=status, content_type=request.accepted_media_type)
@@ -3,13 +3,16 @@ Django settings for core project.
 """
 from pathlib import Path
 import os
-from dotenv import load_dotenv
+from corsheaders.defaults import default_headers
+from core import db_profiles
 
 # Base path
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-# Load local env vars (doesn't override real env, e.g. in Docker)
-load_dotenv(dotenv_path=BASE_DIR / ".env", override=False)
+# Load local env vars (doesn't override real env, e.g. in Docker); no .env -> dotenv is never imported
+if (BASE_DIR / ".env").is_file():
+    from dotenv import load_dotenv
+    load_dotenv(dotenv_path=BASE_DIR / ".env", override=False)
 
 # --- Core config from env ---
 SECRET_KEY = os.getenv("SECRET_KEY", "dev")
@@ -30,6 +33,7 @@ INSTALLED_APPS = [
     "accesscontrol",
     "authn",
     "mockbiz",
+    "audit",
 ]
 
 # --- Middleware (CORS before CommonMiddleware; our JWT last) ---
@@ -42,9 +46,15 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",  # keep for admin
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "authn.middleware.CacheCoherencyMiddleware",  # drops stale in-process caches
     "authn.middleware.JWTAuthMiddleware",       # <-- our custom identification
+    "authn.middleware.RequestProfilerMiddleware",  # admin 'X-Profile: 1' / PROFILE_SAMPLE_RATE
 ]
 
+# opt-in traffic recording for replay_traffic (outermost, so timings cover the whole stack)
+if os.getenv("TRAFFIC_RECORD_DIR"):
+    MIDDLEWARE.insert(0, "authn.middleware.TrafficRecorderMiddleware")
+
 ROOT_URLCONF = "core.urls"
 
 TEMPLATES = [
@@ -86,6 +96,30 @@ else:
         }
     }
 
+# --- Optional read replica (auth/RBAC reads; see core/db_router.py) ---
+# SQLite: SQLITE_REPLICA_PATH=/path/to/copy.sqlite3; Postgres: DB_REPLICA_HOST (+ DB_REPLICA_PORT)
+SQLITE_REPLICA_PATH = os.getenv("SQLITE_REPLICA_PATH", "")
+DB_REPLICA_HOST = os.getenv("DB_REPLICA_HOST", "")
+if USE_SQLITE and SQLITE_REPLICA_PATH:
+    DATABASES["replica"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": SQLITE_REPLICA_PATH,
+        "TEST": {"MIRROR": "default"},
+    }
+elif not USE_SQLITE and DB_REPLICA_HOST:
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": DB_REPLICA_HOST,
+        "PORT": os.getenv("DB_REPLICA_PORT", DATABASES["default"]["PORT"]),
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_ROUTERS = ["core.db_router.ReadReplicaRouter"] if "replica" in DATABASES else []
+
+# --- Connection persistence / SQLite PRAGMAs (DB_PROFILE=default|tuned, see core/db_profiles.py) ---
+DB_PROFILE = db_profiles.active_profile()
+for _db in DATABASES.values():
+    _db.update(db_profiles.connection_settings(DB_PROFILE))
+
 # --- Auth / DRF ---
 AUTH_USER_MODEL = "accounts.User"
 
@@ -98,7 +132,7 @@ REST_FRAMEWORK = {
 
 # Store passwords with bcrypt (as per task hint)
 PASSWORD_HASHERS = [
-    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "authn.hashers.TimedBCryptSHA256PasswordHasher",  # bcrypt_sha256 + timing in core.metrics
     "django.contrib.auth.hashers.PBKDF2PasswordHasher",  # fallback
 ]
 
@@ -114,9 +148,12 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 
 # --- Misc ---
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+TEST_RUNNER = "core.testing.TestRunner"  # audit writes synchronously under test
 
 # --- CORS (open for testing; tighten later) ---
 CORS_ALLOW_ALL_ORIGINS = True
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key")
+CORS_EXPOSE_HEADERS = ("idempotent-replayed",)
 
 
 LOGGING = {
@@ -136,4 +173,8 @@ LOGGING = {
 
 
 REFRESH_TOKEN_BYTES = int(os.getenv("REFRESH_TOKEN_BYTES", "32"))
-REFRESH_TOKEN_DAYS = int(os.getenv("REFRESH_TOKEN_DAYS", "14"))
\ No newline at end of file
+REFRESH_TOKEN_DAYS = int(os.getenv("REFRESH_TOKEN_DAYS", "14"))
+
+# --- RBAC snapshot (python manage.py compile_rbac); empty = evaluate from the DB ---
+RBAC_SNAPSHOT_PATH = os.getenv("RBAC_SNAPSHOT_PATH", "")
+RBAC_SNAPSHOT_CHECK_SECONDS = float(os.getenv("RBAC_SNAPSHOT_CHECK_SECONDS", "2"))
@@ -0,0 +1,17 @@
+"""Test runner (settings.TEST_RUNNER)."""
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """Audit events are written in the calling thread, inside each test's transaction,
+    instead of by the writer thread racing the test database."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        from audit.services import buffer
+        buffer.synchronous = True
+
+    def teardown_test_environment(self, **kwargs):
+        from audit.services import buffer
+        buffer.synchronous = False
+        super().teardown_test_environment(**kwargs)
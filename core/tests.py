@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+import unittest
+from django.test import SimpleTestCase
+
+from .metrics import SharedMetrics, ELEMENTS, WORDS_PER_SLOT, _COUNTER_INDEX, _LIMITER_INDEX, layout_path
+
+DEAD_PID = 2 ** 22 + 12345  # above the default pid_max
+
+
+class SharedMetricsTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.base = os.path.join(self.dir, "metrics.bin")
+
+    def metrics(self, slots=4):
+        return SharedMetrics(path=self.base, slots=slots)
+
+    def test_deny_after_element_table_is_full(self):
+        m = self.metrics(slots=2)
+        for i in range(ELEMENTS):
+            m.deny(f"el-{i}")
+        m.deny("one-too-many")
+        m.deny("one-too-many")
+        totals = m.totals()
+        self.assertEqual(totals["rbac_denials_total"], ELEMENTS + 2)
+        self.assertEqual(len(totals["rbac_denials_by_element"]), ELEMENTS)
+        self.assertNotIn("one-too-many", totals["rbac_denials_by_element"])
+
+    def test_layout_is_part_of_the_file_name(self):
+        self.assertNotEqual(layout_path(self.base, 4), layout_path(self.base, 8))
+        self.metrics(slots=4).inc("rbac_checks_total")
+        self.metrics(slots=8).inc("rbac_checks_total", 5)
+        self.assertEqual(sorted(os.listdir(self.dir)),
+                         sorted(os.path.basename(layout_path(self.base, n)) for n in (4, 8)))
+        self.assertEqual(self.metrics(slots=4).totals()["rbac_checks_total"], 1)
+
+    def test_dead_workers_slot_is_taken_over_with_its_totals(self):
+        m = self.metrics()
+        m.inc("auth_login_success_total")  # maps the file and claims slot 0
+        w = m._words
+        w[0] = DEAD_PID  # pretend slot 0 belonged to a worker that died
+        w[_COUNTER_INDEX["auth_login_success_total"]] = 7
+        w[_LIMITER_INDEX["auth.login"]] = 9  # its limit gauge
+
+        other = self.metrics()
+        other.inc("auth_login_success_total")
+        self.assertEqual(other._base, 0)
+        totals = other.totals()
+        self.assertEqual(totals["auth_login_success_total"], 8)
+        self.assertEqual(totals["limiters"]["auth.login"]["limit"], 0)
+        self.assertEqual(totals["workers"], 1)
+
+    @unittest.skipUnless(hasattr(os, "fork"), "needs fork")
+    def test_totals_sum_every_workers_slot(self):
+        m = self.metrics()
+        m.inc("rbac_checks_total", 2)
+        m.limiter("auth.login", 8, 1)
+        pid = os.fork()
+        if pid == 0:  # child: a second worker with its own slot
+            try:
+                m.inc("rbac_checks_total", 3)
+                m.limiter("auth.login", 4, 2, shed=1)
+                os._exit(0 if m._base == WORDS_PER_SLOT else 1)
+            finally:
+                os._exit(2)
+        _, code = os.waitpid(pid, 0)
+        self.assertEqual(os.waitstatus_to_exitcode(code), 0)
+        totals = m.totals()
+        self.assertEqual(totals["rbac_checks_total"], 5)
+        # the child is gone: its counters stay, its gauges no longer count
+        self.assertEqual(totals["limiters"]["auth.login"], {"limit": 8, "inflight": 1, "shed": 1})
+        self.assertEqual(totals["workers"], 1)
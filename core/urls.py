@@ -16,10 +16,14 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from core.metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path("api/auth/", include("accounts.urls")),
+    path("api/users/", include("accounts.users_urls")),
     path("api/rbac/", include("accesscontrol.urls")),
     path("api/mock/", include("mockbiz.urls")),
+    path("api/audit/", include("audit.urls")),
+    path("metrics", metrics_view, name="metrics"),
 ]
@@ -0,0 +1,181 @@
+"""
+Worker warmup: pay the one-off costs (DB connect, bcrypt load, DRF settings,
+URL resolver, first queries, middleware chain) before the first real request.
+
+Runs from core.wsgi / core.asgi when WARMUP_ON_BOOT=1, or via `manage.py prewarm`.
+Synthetic requests are read-only GETs without credentials (401/403/405 are expected).
+DB connections stay open afterwards, so don't enable it in a pre-forking master
+(e.g. gunicorn --preload); run it in each worker instead.
+"""
+from __future__ import annotations
+import io
+import re
+import sys
+import time
+import logging
+from typing import Callable, Dict, Iterator, List
+
+log = logging.getLogger("core.warmup")
+
+_REGEX_META = re.compile(r"[\\(\[\]?*+{}|]")
+
+
+def _step(report: Dict[str, float], name: str, fn: Callable[[], object]) -> None:
+    t0 = time.perf_counter()
+    try:
+        fn()
+    except Exception as e:  # warmup must never prevent the worker from starting
+        log.warning("warmup.%s failed: %r", name, e)
+    report[name] = round((time.perf_counter() - t0) * 1000, 2)
+
+
+def warm_database() -> None:
+    from django.db import connections
+    for alias in connections:
+        conn = connections[alias]
+        conn.ensure_connection()
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+            cur.fetchone()
+
+
+def warm_hashers() -> None:
+    from django.contrib.auth.hashers import get_hashers
+    for hasher in get_hashers():
+        load = getattr(hasher, "_load_library", None)
+        if load and getattr(hasher, "library", None):
+            load()
+
+
+def warm_jwt() -> None:
+    from authn.jwt import verify_jwt
+    verify_jwt("warmup")  # PyJWT is imported lazily by authn.jwt; pay for it here
+
+
+def warm_drf() -> None:
+    from rest_framework.settings import api_settings
+    for name in (
+        "DEFAULT_AUTHENTICATION_CLASSES",
+        "DEFAULT_PERMISSION_CLASSES",
+        "DEFAULT_RENDERER_CLASSES",
+        "DEFAULT_PARSER_CLASSES",
+        "DEFAULT_CONTENT_NEGOTIATION_CLASS",
+        "DEFAULT_THROTTLE_CLASSES",
+    ):
+        getattr(api_settings, name)
+
+
+def warm_permissions() -> None:
+    from django.contrib.auth import get_user_model
+    from accesscontrol.models import AccessRule
+    from accesscontrol.snapshot import current_snapshot
+    from authn.coherency import sync
+
+    sync(force=True)  # baseline cache versions for this worker
+    current_snapshot()
+    # first ORM queries compile the SQL for the hot models
+    get_user_model().objects.filter(pk=0).values_list("id").first()
+    list(AccessRule.objects.filter(role__users__id=0, element__slug="").values_list("id")[:1])
+
+
+def _iter_paths(patterns, prefix: str = "") -> Iterator[str]:
+    for p in patterns:
+        route = str(p.pattern)
+        if route.startswith("^"):
+            route = route[1:]
+        if route.endswith("$"):
+            route = route[:-1]
+        if "<" in route or _REGEX_META.search(route):
+            continue  # needs arguments
+        if hasattr(p, "url_patterns"):
+            yield from _iter_paths(p.url_patterns, prefix + route)
+        else:
+            yield "/" + prefix + route
+
+
+def warm_urls() -> List[str]:
+    from django.urls import get_resolver
+    resolver = get_resolver()
+    resolver.reverse_dict  # populates reverse/namespace dicts
+    return [p for p in dict.fromkeys(_iter_paths(resolver.url_patterns)) if not p.startswith("/admin")]
+
+
+def _environ(path: str, host: str) -> Dict[str, object]:
+    return {
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": path,
+        "SCRIPT_NAME": "",
+        "QUERY_STRING": "",
+        "SERVER_NAME": host,
+        "SERVER_PORT": "80",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "REMOTE_ADDR": "127.0.0.1",
+        "HTTP_HOST": host,
+        "HTTP_ACCEPT": "application/json",
+        "HTTP_X_WARMUP": "1",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": "http",
+        "wsgi.input": io.BytesIO(b""),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+
+
+def warm_requests(handler, paths: List[str]) -> Dict[str, int]:
+    from django.conf import settings
+    hosts = [h for h in settings.ALLOWED_HOSTS if h and not h.startswith(".") and h != "*"]
+    host = hosts[0] if hosts else "localhost"
+    out: Dict[str, int] = {}
+
+    # 401/403/405 are expected; keep them out of django.request warnings
+    req_log = logging.getLogger("django.request")
+    level = req_log.level
+    req_log.setLevel(logging.ERROR)
+    try:
+        for path in paths:
+            status = [""]
+
+            def start_response(s, headers, exc_info=None):
+                status[0] = s
+
+            body = handler(_environ(path, host), start_response)
+            try:
+                for _ in body:
+                    pass
+            finally:
+                close = getattr(body, "close", None)
+                if close:
+                    close()
+            out[path] = int(status[0].split()[0]) if status[0] else 0
+    finally:
+        req_log.setLevel(level)
+    return out
+
+
+def warmup(handler=None) -> Dict[str, object]:
+    """Run every warmup step; `handler` is a WSGI callable (a fresh one is built if omitted)."""
+    t0 = time.perf_counter()
+    report: Dict[str, object] = {}
+    timings: Dict[str, float] = {}
+    _step(timings, "database", warm_database)
+    _step(timings, "hashers", warm_hashers)
+    _step(timings, "jwt", warm_jwt)
+    _step(timings, "drf", warm_drf)
+    _step(timings, "permissions", warm_permissions)
+
+    paths: List[str] = []
+    _step(timings, "urls", lambda: paths.extend(warm_urls()))
+
+    statuses: Dict[str, int] = {}
+    if handler is None:
+        from django.core.handlers.wsgi import WSGIHandler
+        handler = WSGIHandler()
+    _step(timings, "requests", lambda: statuses.update(warm_requests(handler, paths)))
+
+    report["steps_ms"] = timings
+    report["requests"] = statuses
+    report["total_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+    log.info("warmup.done total_ms=%s steps=%s", report["total_ms"], timings)
+    return report
@@ -14,3 +14,11 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_wsgi_application()
+
+# forward-auth path is answered before Django's handler (see authn/gateway.py)
+from authn.gateway import ForwardAuthWSGI  # noqa: E402
+application = ForwardAuthWSGI(application)
+
+if os.getenv("WARMUP_ON_BOOT", "0") == "1":
+    from core.warmup import warmup
+    warmup(application)
@@ -7,17 +7,29 @@ from rest_framework.response import Response
 from rest_framework import status
 
 from accesscontrol.services import has_permission
+from authn.coherency import LocalCache
+from authn.idempotency import idempotent
+from core.rendering import json_response
 import logging
 log = logging.getLogger("mockbiz.views")
 # Ephemeral in-memory items (id, owner_id, name)
 _items: List[Dict] = []
 _id_gen = count(1)
+# bumped on every change to _items; encoded listings are cached per (scope, revision)
+_revisions = count(1)
+_rev = 0
+_listing_json = LocalCache("items", maxsize=1000, ttl=300)
+
+def _changed():
+    global _rev
+    _rev = next(_revisions)
 
 def _ensure_seed_for_user(user_id: int):
     # Create a couple of items for a user if none exist
     if not any(it["owner_id"] == user_id for it in _items):
         _items.append({"id": next(_id_gen), "owner_id": user_id, "name": f"Item A (user {user_id})"})
         _items.append({"id": next(_id_gen), "owner_id": user_id, "name": f"Item B (user {user_id})"})
+        _changed()
 
 def _get_user_from_request(request):
     """
@@ -42,7 +54,7 @@ class ItemsView(APIView):
             log.info("items.get.unauth")
             return Response({"detail": "Unauthorized"}, status=status.HTTP_401_UNAUTHORIZED)
 
-        allowed_all = has_permission(user, "items", "read", None)
+        allowed_all = has_permission(user, "items", "read", None, probe=True)
         if not allowed_all:
             # maybe allowed only for own items?
             allowed_own = has_permission(user, "items", "read", owner_id=user.id)
@@ -50,15 +62,16 @@ class ItemsView(APIView):
                 log.info("items.get.forbidden user_id=%s", user.id)
                 return Response({"detail": "Forbidden"}, status=status.HTTP_403_FORBIDDEN)
             _ensure_seed_for_user(user.id)
-            mine = [it for it in _items if it["owner_id"] == user.id]
-            return Response(mine)
+            return json_response(request, lambda: [it for it in _items if it["owner_id"] == user.id],
+                                 cache=_listing_json, key=(user.id, _rev))
 
         # read_all
         if not _items:
             # seed a couple of different owners just for demo
             _ensure_seed_for_user(user.id)
-        return Response(_items)
+        return json_response(request, _items, cache=_listing_json, key=("all", _rev))
 
+    @idempotent("mock.items.create")
     def post(self, request):
         user = _get_user_from_request(request)
         if not (user and getattr(user, "is_authenticated", False)):
@@ -69,6 +82,7 @@ class ItemsView(APIView):
         name = request.data.get("name") or f"New Item by {user.id}"
         obj = {"id": next(_id_gen), "owner_id": user.id, "name": name}
         _items.append(obj)
+        _changed()
         return Response(obj, status=status.HTTP_201_CREATED)
 
 class ItemDetailView(APIView):
@@ -93,6 +107,7 @@ class ItemDetailView(APIView):
         if not has_permission(user, "items", "update", owner_id=owner_id):
             return Response({"detail": "Forbidden"}, status=status.HTTP_403_FORBIDDEN)
         it["name"] = request.data.get("name") or it["name"]
+        _changed()
         return Response(it)
 
     def delete(self, request, item_id: int):
@@ -106,4 +121,5 @@ class ItemDetailView(APIView):
         if not has_permission(user, "items", "delete", owner_id=owner_id):
             return Response({"detail": "Forbidden"}, status=status.HTTP_403_FORBIDDEN)
         _items.remove(it)
+        _changed()
         return Response(status=status.HTTP_204_NO_CONTENT)